@@ -4,7 +4,7 @@ import os
 import datetime
 import logging
 
-from fastapi import FastAPI, Request, Depends, Form
+from fastapi import FastAPI, HTTPException, Request, Depends, Form, Query
 from fastapi.responses import JSONResponse, RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
@@ -13,10 +13,22 @@ from starlette.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
 # Import ORM models and database utilities
+from llm.admission import admit, begin_turn, end_turn, set_flow
+from llm.admission import snapshot as admission_metrics
 from llm.llm_agent import generate_gm_response
-from llm.llm_config import get_llm_config
+from llm.llm_config import get_tier_configs
+from llm.llm_metrics import action_check_snapshot
+from llm.llm_metrics import snapshot as llm_tier_metrics
+from llm.opening_pool import snapshot as opening_pool_metrics
+from llm.refinement import refinement_status
+from llm.speculation import forget_speculation
+from llm.speculation import snapshot as speculation_metrics
+from llm.turn_budget import snapshot as turn_budget_metrics
 from llm.agents import get_agents
-from models.character_models import Background, Character, Class, Race
+from llm.game_session import forget_session
+from llm.retrieval import forget_game
+from llm.turn_memory import forget_turns
+from models.character_models import Character
 from models.character_models import populate_defaults as populate_character_defaults
 from models.game_preferences_models import (
     GamePreferences,
@@ -29,15 +41,39 @@ from models.game_preferences_models import populate_defaults as populate_game_de
 from models.save_game_models import SavedGame, ConversationPair
 from models.user_models import User
 from db.database import engine, SessionLocal, Base
+from services.character_snapshot import get_character_snapshot, invalidate_character
+from services.identity import (
+    DEFAULT_USERNAME,
+    UserPrincipal,
+    identity_token,
+    resolve_principal,
+)
+from services.listings import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    list_characters,
+    list_saved_games,
+)
+from services.reference_data import get_reference_data, invalidate_reference_data
+from services.session_store import ServerSideSessionMiddleware, get_session_backend
 
 # Load environment variables
 load_dotenv()
 
 app = FastAPI()
 
-# Secret key for session management
-app_secret_key = os.getenv("SECRET_KEY", "default_secret_key")
-app.add_middleware(SessionMiddleware, secret_key=app_secret_key)  # type: ignore
+# Session management: 'sqlite' or 'memory' keep the session server-side and only
+# put an opaque ID in the cookie; 'cookie' keeps the legacy signed-cookie session.
+session_backend_name = os.getenv("SESSION_BACKEND", "sqlite")
+if session_backend_name == "cookie":
+    app_secret_key = os.getenv("SECRET_KEY", "default_secret_key")
+    app.add_middleware(SessionMiddleware, secret_key=app_secret_key)  # type: ignore
+else:
+    app.add_middleware(
+        ServerSideSessionMiddleware,  # type: ignore
+        backend=get_session_backend(session_backend_name),
+        https_only=os.getenv("SESSION_HTTPS_ONLY", "false").lower() == "true",
+    )
 
 # Set up static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -53,11 +89,13 @@ def get_db():
         db_session.close()
 
 
-# Dependency to get the current user (simplified for this example)
-def get_current_user(db: Session = Depends(get_db)):
-    # In a real application, you would retrieve the user from the session or token
-    user = db.query(User).filter_by(username="default_user").first()
-    return user
+# Dependency to get the current user principal; cached, so no query on the hot path
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> UserPrincipal:
+    principal = resolve_principal(db, identity_token(request.session))
+    if principal is None:
+        # Handlers read user.id unchecked
+        raise HTTPException(status_code=401, detail="No user is logged in.")
+    return principal
 
 
 # Logging Configuration
@@ -70,12 +108,13 @@ with engine.begin() as conn:
     with SessionLocal() as session:
         populate_character_defaults(session)  # Pass the session
         populate_game_defaults(session)
+        invalidate_reference_data()
 
         # Create a default user if not exists
-        default_user = session.query(User).filter_by(username="default_user").first()
+        default_user = session.query(User).filter_by(username=DEFAULT_USERNAME).first()
         if not default_user:
             default_user = User(
-                username="default_user", email="default_user@example.com"
+                username=DEFAULT_USERNAME, email="default_user@example.com"
             )
             session.add(default_user)
             session.commit()
@@ -148,12 +187,26 @@ async def interact(
     provider = request.session.get("llm_provider", "openai")
     model = request.session.get("llm_model", "gpt-4")
     try:
-        # Get the unified LLM configuration
-        llm_config = get_llm_config(provider, model)  # noqa
+        # One configuration per tier: narration on the selected model,
+        # validation and classification on the provider's small model
+        llm_config = get_tier_configs(provider, model)  # noqa
     except (EnvironmentError, ValueError) as e:
         logger.error(f"LLM Configuration Error: {e}")
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
 
+    # Turn the turn away now rather than queue it behind calls that would
+    # leave it to time out
+    retry_after = admit(llm_config.values())
+    if retry_after is not None:
+        return JSONResponse(
+            {
+                "status": "error",
+                "message": "The game master is busy. Please try again shortly.",
+            },
+            status_code=503,
+            headers={"Retry-After": str(retry_after)},
+        )
+
     # Create agent instances with the fetched configurations
     agents = get_agents(llm_config)
     dm_agent = agents.get("DMAgent")
@@ -166,15 +219,29 @@ async def interact(
             status_code=500,
         )
 
-    # Call the GM response generator with the saved_game_id and database session
-    gm_response = await generate_gm_response(
-        user_input=user_input,
-        user_preferences=user_preferences,
-        current_character=current_character,
-        agents=agents,
-        saved_game_id=saved_game_id,
-        db=db,
-    )
+    if not begin_turn(saved_game_id):
+        return JSONResponse(
+            {
+                "status": "error",
+                "message": "Your previous action is still being answered.",
+            },
+            status_code=429,
+            headers={"Retry-After": "1"},
+        )
+    # The turn's LLM calls are fair-queued against other players' and games'
+    set_flow(identity_token(request.session), saved_game_id)
+    try:
+        # Call the GM response generator with the saved_game_id and database session
+        gm_response = await generate_gm_response(
+            user_input=user_input,
+            user_preferences=user_preferences,
+            current_character=current_character,
+            agents=agents,
+            saved_game_id=saved_game_id,
+            db=db,
+        )
+    finally:
+        end_turn(saved_game_id)
 
     gm_response_text = (
         gm_response.get("response", "Unknown response")
@@ -182,7 +249,40 @@ async def interact(
         else "Unknown response"
     )
 
-    return JSONResponse({"gm_response": gm_response_text})
+    payload = {"gm_response": gm_response_text}
+    if isinstance(gm_response, dict) and gm_response.get("revision_pending"):
+        # The draft is being validated; the client polls for the final text
+        payload.update(turn=gm_response["turn"], revision_pending=True)
+    return JSONResponse(payload)
+
+
+@app.get("/turn_revision/{order}")
+async def turn_revision(order: int, request: Request, db: Session = Depends(get_db)):
+    saved_game_id = request.session.get("saved_game_id")
+    if not saved_game_id:
+        return JSONResponse(
+            {"status": "error", "message": "No game started!"}, status_code=400
+        )
+    status = refinement_status(saved_game_id, order)
+    if status is not None:
+        return JSONResponse(status)
+    # Not refined by this worker, or finished long ago: the saved turn holds
+    # the latest text, and whether a refinement elsewhere may still change it
+    pair = (
+        db.query(ConversationPair)
+        .filter_by(game_id=saved_game_id, order=order)
+        .first()
+    )
+    if pair is None:
+        return JSONResponse(
+            {"status": "error", "message": "Turn not found."}, status_code=404
+        )
+    return JSONResponse(
+        {
+            "status": "pending" if pair.revision_pending else "done",
+            "gm_response": pair.gm_response,
+        }
+    )
 
 
 # Modify the /new_game route
@@ -190,7 +290,7 @@ async def interact(
 async def new_game(
     request: Request,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserPrincipal = Depends(get_current_user),
 ):
     current_character = request.session.get("current_character")
 
@@ -256,16 +356,14 @@ async def submit_contact(
 
 @app.get("/character_creation", response_class=HTMLResponse)
 async def character_creation(request: Request, db: Session = Depends(get_db)):
-    races = db.query(Race).all()
-    classes = db.query(Class).all()
-    backgrounds = db.query(Background).all()
+    reference_data = get_reference_data(db)
     return templates.TemplateResponse(
         "character_creation.html",
         {
             "request": request,
-            "races": races,
-            "classes": classes,
-            "backgrounds": backgrounds,
+            "races": reference_data.races,
+            "classes": reference_data.classes,
+            "backgrounds": reference_data.backgrounds,
         },
     )
 
@@ -277,11 +375,10 @@ async def save_character(request: Request, db: Session = Depends(get_db)):
     if not all(character_data.get(field) for field in required_fields):
         return JSONResponse({"message": "All fields are required!"}, status_code=400)
 
-    race = db.query(Race).filter_by(name=character_data["race"]).first()
-    character_class = db.query(Class).filter_by(name=character_data["class"]).first()
-    background = (
-        db.query(Background).filter_by(name=character_data["background"]).first()
-    )
+    reference_data = get_reference_data(db)
+    race = reference_data.races.by_name.get(character_data["race"])
+    character_class = reference_data.classes.by_name.get(character_data["class"])
+    background = reference_data.backgrounds.by_name.get(character_data["background"])
 
     if not race or not character_class or not background:
         return JSONResponse(
@@ -308,36 +405,45 @@ async def save_character(request: Request, db: Session = Depends(get_db)):
     )
 
     db.add(new_character)
+    db.flush()  # Assign the ID without a reload after commit
+    new_character_id = new_character.id
     db.commit()
 
-    request.session["current_character"] = {
-        "id": new_character.id,
-        "name": new_character.name,
-        "race": new_character.race.name,
-        "class": new_character.character_class.name,
-        "background": new_character.background.name,
-        "level": new_character.level,
-        "experience_points": new_character.experience_points,
-        "strength": new_character.strength,
-        "dexterity": new_character.dexterity,
-        "constitution": new_character.constitution,
-        "intelligence": new_character.intelligence,
-        "wisdom": new_character.wisdom,
-        "charisma": new_character.charisma,
-        "max_hit_points": new_character.max_hit_points,
-        "current_hit_points": new_character.current_hit_points,
-        "armor_class": new_character.armor_class,
-        "speed": new_character.speed,
-    }
+    snapshot = get_character_snapshot(db, new_character_id)
+    request.session["current_character"] = snapshot.to_session_dict()
 
     return JSONResponse({"message": "Character saved successfully!"}, status_code=201)
 
 
 @app.get("/manage_characters", response_class=HTMLResponse)
-async def manage_characters(request: Request, db: Session = Depends(get_db)):
-    characters = db.query(Character).all()
+async def manage_characters(
+    request: Request,
+    db: Session = Depends(get_db),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    name: str = Query(""),
+    race: str = Query(""),
+    character_class: str = Query("", alias="class"),
+):
+    reference_data = get_reference_data(db)
+    characters_page = list_characters(
+        db,
+        page=page,
+        per_page=per_page,
+        name=name.strip(),
+        race=race,
+        character_class=character_class,
+    )
     return templates.TemplateResponse(
-        "manage_characters.html", {"request": request, "characters": characters}
+        "manage_characters.html",
+        {
+            "request": request,
+            "characters": characters_page.items,
+            "pagination": characters_page,
+            "filters": {"name": name, "race": race, "class": character_class},
+            "races": reference_data.races,
+            "classes": reference_data.classes,
+        },
     )
 
 
@@ -345,37 +451,19 @@ async def manage_characters(request: Request, db: Session = Depends(get_db)):
 async def select_character(
     character_id: int, request: Request, db: Session = Depends(get_db)
 ):
-    character = db.query(Character).get(character_id)
-    if not character:
+    snapshot = get_character_snapshot(db, character_id)
+    if not snapshot:
         return JSONResponse(
             {"status": "error", "message": "Character not found"}, status_code=404
         )
 
-    selected_character = {
-        "id": character.id,
-        "name": character.name,
-        "race": character.race.name,
-        "class": character.character_class.name,
-        "background": character.background.name,
-        "level": character.level,
-        "experience_points": character.experience_points,
-        "strength": character.strength,
-        "dexterity": character.dexterity,
-        "constitution": character.constitution,
-        "intelligence": character.intelligence,
-        "wisdom": character.wisdom,
-        "charisma": character.charisma,
-        "max_hit_points": character.max_hit_points,
-        "current_hit_points": character.current_hit_points,
-        "armor_class": character.armor_class,
-        "speed": character.speed,
-    }
+    selected_character = snapshot.to_session_dict()
     request.session["current_character"] = selected_character
 
     return JSONResponse(
         {
             "status": "success",
-            "message": f"Character '{character.name}' loaded successfully",
+            "message": f"Character '{snapshot.name}' loaded successfully",
             "character": selected_character,
         }
     )
@@ -393,6 +481,7 @@ async def delete_character(
 
     db.delete(character)
     db.commit()
+    invalidate_character(character_id)
 
     # Remove character from session if it's the current one
     if request.session.get("current_character", {}).get("id") == character_id:
@@ -410,7 +499,7 @@ async def delete_character(
 async def game_preferences(
     request: Request,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserPrincipal = Depends(get_current_user),
 ):
     preferences = db.query(GamePreferences).filter_by(user_id=user.id).first()
 
@@ -432,7 +521,7 @@ async def game_preferences(
 async def submit_preferences(
     request: Request,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserPrincipal = Depends(get_current_user),
 ):
     preferences_data = await request.json()
 
@@ -476,7 +565,7 @@ async def load_game(
     game_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserPrincipal = Depends(get_current_user),
 ):
     saved_game = db.query(SavedGame).filter_by(id=game_id, user_id=user.id).first()
     if not saved_game:
@@ -487,27 +576,9 @@ async def load_game(
     # Store saved_game_id in session
     request.session["saved_game_id"] = saved_game.id
 
-    character = db.query(Character).get(saved_game.character_id)
-    if character:
-        request.session["current_character"] = {
-            "id": character.id,
-            "name": character.name,
-            "race": character.race.name,
-            "class": character.character_class.name,
-            "background": character.background.name,
-            "level": character.level,
-            "experience_points": character.experience_points,
-            "strength": character.strength,
-            "dexterity": character.dexterity,
-            "constitution": character.constitution,
-            "intelligence": character.intelligence,
-            "wisdom": character.wisdom,
-            "charisma": character.charisma,
-            "max_hit_points": character.max_hit_points,
-            "current_hit_points": character.current_hit_points,
-            "armor_class": character.armor_class,
-            "speed": character.speed,
-        }
+    snapshot = get_character_snapshot(db, saved_game.character_id)
+    if snapshot:
+        request.session["current_character"] = snapshot.to_session_dict()
     else:
         return JSONResponse(
             {
@@ -522,9 +593,6 @@ async def load_game(
     )
 
 
-from fastapi import Query  # noqa: E402
-
-
 @app.delete("/delete_character/{character_id}")
 async def delete_character(  # noqa: F811
     character_id: int,
@@ -553,12 +621,22 @@ async def delete_character(  # noqa: F811
             }
         )
 
-    # If confirmed, delete saved games and character
-    if saved_games_count > 0:
-        db.query(SavedGame).filter(SavedGame.character_id == character_id).delete()  # type: ignore
+    # If confirmed, delete saved games and character. The games go through the
+    # ORM so their turns and world state are deleted with them
+    saved_games = (
+        db.query(SavedGame).filter(SavedGame.character_id == character_id).all()  # type: ignore
+    )
+    for saved_game in saved_games:
+        db.delete(saved_game)
 
     db.delete(character)
     db.commit()
+    invalidate_character(character_id)
+    for saved_game in saved_games:
+        forget_game(saved_game.id)
+        forget_turns(saved_game.id)
+        forget_session(saved_game.id)
+        forget_speculation(saved_game.id)
 
     # Remove character from session if it's the current one
     if request.session.get("current_character", {}).get("id") == character_id:
@@ -574,7 +652,7 @@ async def delete_character(  # noqa: F811
 
 @app.delete("/delete_game/{game_id}")
 async def delete_game(
-    game_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+    game_id: int, db: Session = Depends(get_db), user: UserPrincipal = Depends(get_current_user)
 ):
     saved_game = db.query(SavedGame).filter_by(id=game_id, user_id=user.id).first()
     if not saved_game:
@@ -584,6 +662,10 @@ async def delete_game(
 
     db.delete(saved_game)
     db.commit()
+    forget_game(game_id)
+    forget_turns(game_id)
+    forget_session(game_id)
+    forget_speculation(game_id)
     return JSONResponse(
         {"status": "success", "message": "Game deleted successfully!"}, status_code=200
     )
@@ -593,7 +675,7 @@ async def delete_game(
 async def check_game_exists(
     game_name: str,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserPrincipal = Depends(get_current_user),
 ):
     exists = (
         db.query(SavedGame).filter_by(user_id=user.id, game_name=game_name).first()
@@ -614,11 +696,22 @@ async def check_character_name(name: str, db: Session = Depends(get_db)):
 async def manage_games(
     request: Request,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserPrincipal = Depends(get_current_user),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    name: str = Query(""),
 ):
-    saved_games = db.query(SavedGame).filter_by(user_id=user.id).all()
+    games_page = list_saved_games(
+        db, user.id, page=page, per_page=per_page, name=name.strip()
+    )
     return templates.TemplateResponse(
-        "manage_games.html", {"request": request, "saved_games": saved_games}
+        "manage_games.html",
+        {
+            "request": request,
+            "saved_games": games_page.items,
+            "pagination": games_page,
+            "filters": {"name": name},
+        },
     )
 
 
@@ -688,6 +781,21 @@ async def post_llm_config(request: Request):
     )
 
 
+@app.get("/metrics", response_class=JSONResponse)
+async def metrics():
+    # Each block is described by its module's snapshot()
+    return JSONResponse(
+        {
+            "llm_tiers": llm_tier_metrics(),
+            "turn_budget": turn_budget_metrics(),
+            "speculation": speculation_metrics(),
+            "parallel_action_check": action_check_snapshot(),
+            "opening_pool": opening_pool_metrics(),
+            "admission": admission_metrics(),
+        }
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,132 @@
+# benchmarks/ingest_throughput.py
+"""
+Compares per-chunk and batched embedding/writes when ingesting PDF text.
+
+Builds a synthetic, rulebook-shaped corpus of ``--pages`` pages, chunks it
+with ``chunk_pages`` and writes it into a throwaway Chroma collection twice:
+once with one ``collection.add`` per chunk, as ingestion used to do, and once
+through ``write_chunks`` with the configured batch sizes. PDF extraction is
+left out so the numbers isolate embedding and writes.
+
+Usage:
+    python -m benchmarks.ingest_throughput [--pages 500] [--embed-batch 64]
+        [--write-batch 256] [--model all-MiniLM-L6-v2]
+"""
+
+import argparse
+import random
+import tempfile
+import textwrap
+import time
+
+import chromadb
+from chromadb.utils import embedding_functions
+
+from llm.chunking import chunk_pages
+from llm.pdf_processing import EMBED_BATCH_SIZE, WRITE_BATCH_SIZE, write_chunks
+
+WORDS = (
+    "dragon tavern sword shield goblin wizard spell dungeon treasure rogue "
+    "cleric paladin ranger bard forest castle king queen potion scroll trap "
+    "initiative saving throw advantage armor class hit points damage attack "
+    "perception stealth arcana history insight persuasion deception"
+).split()
+
+PAGE_CHARS = 2000
+LINE_CHARS = 90
+
+
+def synthetic_pages(n_pages, seed=7):
+    """Rulebook-shaped pages: a heading every few pages, wrapped paragraphs."""
+    rng = random.Random(seed)
+    for page_number in range(1, n_pages + 1):
+        lines = []
+        if page_number % 4 == 1:
+            title = rng.choice(WORDS).title()
+            lines.append(f"Chapter {page_number // 4 + 1}: {title}")
+        length = 0
+        while length < PAGE_CHARS:
+            sentences = [
+                " ".join(rng.choices(WORDS, k=rng.randint(8, 20))).capitalize() + "."
+                for _ in range(rng.randint(3, 6))
+            ]
+            paragraph = textwrap.wrap(" ".join(sentences), LINE_CHARS)
+            lines.extend(paragraph + [""])
+            length += sum(len(line) for line in paragraph)
+        yield page_number, "\n".join(lines)
+
+
+def corpus_chunks(n_pages):
+    return [
+        (f"bench.pdf-{idx}", chunk.text, chunk.metadata("bench.pdf"))
+        for idx, chunk in enumerate(chunk_pages(synthetic_pages(n_pages)))
+    ]
+
+
+def run_per_chunk(collection, chunks):
+    for chunk_id, document, metadata in chunks:
+        collection.add(documents=[document], metadatas=[metadata], ids=[chunk_id])
+
+
+def timed(name, fn, n_chunks, n_pages):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {name:<28} {elapsed:8.2f} s  {n_chunks / elapsed:8.1f} chunks/sec  "
+        f"{n_pages / elapsed:8.1f} pages/sec"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--embed-batch", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--write-batch", type=int, default=WRITE_BATCH_SIZE)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+        model_name=args.model
+    )
+    # Load the model once up front so neither path pays for it
+    embedding_function(["warm up"])
+
+    chunks = corpus_chunks(args.pages)
+    print(f"{args.pages} pages, {len(chunks)} chunks, model {args.model}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        client = chromadb.PersistentClient(path=tmp_dir)
+        per_chunk = client.create_collection(
+            "per_chunk", embedding_function=embedding_function
+        )
+        batched = client.create_collection(
+            "batched", embedding_function=embedding_function
+        )
+
+        baseline = timed(
+            "per-chunk add",
+            lambda: run_per_chunk(per_chunk, chunks),
+            len(chunks),
+            args.pages,
+        )
+        optimized = timed(
+            f"batched ({args.embed_batch}/{args.write_batch})",
+            lambda: write_chunks(
+                batched,
+                embedding_function,
+                chunks,
+                embed_batch_size=args.embed_batch,
+                write_batch_size=args.write_batch,
+            ),
+            len(chunks),
+            args.pages,
+        )
+        assert per_chunk.count() == batched.count() == len(chunks)
+
+    print(f"  speedup {baseline / optimized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
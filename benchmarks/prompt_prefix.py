@@ -0,0 +1,189 @@
+# benchmarks/prompt_prefix.py
+"""
+Measures how much of each prompt a provider's prefix cache can reuse.
+
+Replays ``--turns`` turns of a synthetic campaign through the four calls a
+turn makes (action validation, narration, storyline and options validation)
+in three layouts: the legacy single message (intro, context, per-turn
+material, then the instructions), the stable-prefix messages from
+``llm/prompts.py``, and the same with the narration call sent as the game's
+chat session (``STORYLINE_MODE=messages``). For each call it reports the
+share of prompt tokens that match a prompt the model recently processed, with
+one cache slot and with four (Ollama's ``OLLAMA_NUM_PARALLEL``), which is what
+Ollama's KV cache and OpenAI's prompt caching can skip.
+
+With ``--ollama``, the same prompts are also sent to a local Ollama server
+and the mean ``prompt_eval_duration`` per call is reported for each layout.
+
+Usage:
+    python -m benchmarks.prompt_prefix [--turns 20]
+        [--ollama http://localhost:11434] [--model llama3.1:8b]
+"""
+
+import argparse
+import random
+import statistics
+
+import requests
+
+from llm.chunking import approximate_token_count
+from llm.prompts import (
+    continue_campaign_prompt,
+    continue_campaign_session_prompt,
+    validate_options_prompt,
+    validate_player_action_prompt,
+    validate_storyline_prompt,
+)
+
+WORDS = (
+    "the lantern flickers across damp stone while a hooded merchant counts coins "
+    "beside the river gate and distant bells echo over the market square where "
+    "guards argue about the missing caravan and smoke drifts from the forge"
+).split()
+
+CONTEXT = """User Preferences:
+    - Game Style: narrative
+    - Tone: serious
+    - Difficulty: medium
+    - Theme: fantasy
+
+    Character Core Details:
+    - Name: Elira
+    - Race: Elf
+    - Class: Wizard
+    - Background: Sage
+    - Level: 3
+    """
+
+
+def sentence(rng, n=24):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def turn_calls(rng, history, user_input, session):
+    """The prompts one turn sends, in order, with a synthetic GM draft."""
+    storyline = "\n".join(f"User: {u}\nGM: {g}" for u, g in history[-6:])
+    draft = " ".join(sentence(rng) for _ in range(6))
+    reference = "\n".join(
+        f"- [PHB, Spells, p. {page}] {sentence(rng)}" for page in (211, 240)
+    )
+    if session:
+        narration = continue_campaign_session_prompt(
+            CONTEXT, history, user_input, reference
+        )
+    else:
+        narration = continue_campaign_prompt(CONTEXT, storyline, user_input, reference)
+    return [
+        validate_player_action_prompt(CONTEXT, storyline, user_input, reference),
+        narration,
+        validate_storyline_prompt(CONTEXT, storyline, draft, reference),
+        validate_options_prompt(CONTEXT, draft, reference),
+    ], draft
+
+
+def legacy_layout(messages):
+    """Rebuilds the old single-message layout from the stable one."""
+    intro, _, rest = messages[0]["content"].partition("\n\n**Instructions:**")
+    body = "\n\n".join(m["content"] for m in messages[1:])
+    return [
+        {
+            "role": "user",
+            "content": f"{intro}\n\n{body}\n\n**Instructions:**{rest}",
+        }
+    ]
+
+
+def render(messages):
+    return "".join(f"<|{m['role']}|>\n{m['content']}\n" for m in messages)
+
+
+def common_prefix(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return a[:n]
+
+
+def simulate(turns, session=False, seed=5):
+    rng = random.Random(seed)
+    history = []
+    calls = []
+    for _ in range(turns):
+        user_input = sentence(rng, 8)
+        prompts, draft = turn_calls(rng, history, user_input, session)
+        calls.extend(prompts)
+        history.append((user_input, draft))
+    return calls
+
+
+def reuse_stats(calls, slots):
+    """
+    Reusable share of prompt tokens when the server keeps the KV state of the
+    last ``slots`` prompts and resumes from the longest matching prefix
+    (Ollama's parallel slots; OpenAI's cache behaves like many slots).
+    """
+    cached = []
+    shares, totals = [], 0
+    for messages in calls:
+        text = render(messages)
+        total = approximate_token_count(text)
+        prefix = max((common_prefix(text, c) for c in cached), key=len, default="")
+        shares.append(approximate_token_count(prefix) / total)
+        totals += total
+        cached = (cached + [text])[-slots:]
+    return statistics.mean(shares), totals / len(calls)
+
+
+def ollama_eval(url, model, calls):
+    durations, counts = [], []
+    session = requests.Session()
+    for messages in calls:
+        response = session.post(
+            f"{url.rstrip('/')}/api/chat",
+            json={
+                "model": model,
+                "messages": messages,
+                "stream": False,
+                "options": {"num_predict": 1},
+            },
+            timeout=600,
+        )
+        response.raise_for_status()
+        body = response.json()
+        durations.append(body.get("prompt_eval_duration", 0) / 1e6)
+        counts.append(body.get("prompt_eval_count", 0))
+    # The first call of a run fills the cache from scratch
+    return statistics.mean(durations[1:]), statistics.mean(counts[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--ollama", default=None, help="Ollama base URL")
+    parser.add_argument("--model", default="llama3.1:8b")
+    args = parser.parse_args()
+
+    stable = simulate(args.turns)
+    legacy = [legacy_layout(messages) for messages in stable]
+    session = simulate(args.turns, session=True)
+    layouts = (("legacy", legacy), ("stable", stable), ("session", session))
+
+    print(f"{args.turns} turns, {len(stable)} calls")
+    print(f"{'layout':<10}{'tokens/call':>14}{'reusable, 1 slot':>18}{'4 slots':>10}")
+    for name, calls in layouts:
+        one, tokens = reuse_stats(calls, 1)
+        four, _ = reuse_stats(calls, 4)
+        print(f"{name:<10}{tokens:>14.0f}{one:>18.0%}{four:>10.0%}")
+
+    if args.ollama:
+        print(f"\nOllama {args.model} at {args.ollama}")
+        print(f"{'layout':<10}{'prompt eval ms':>16}{'evaluated tokens':>18}")
+        for name, calls in layouts:
+            ms, evaluated = ollama_eval(args.ollama, args.model, calls)
+            print(f"{name:<10}{ms:>16.1f}{evaluated:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/query_budget.py
+"""
+Query-count harness: fails if a route issues more SQL statements than its budget.
+
+Seeds a throwaway database with ``--rows`` characters and saved games, drives
+the real routes through Starlette's TestClient and counts every statement the
+engine executes per request, including lazy loads triggered while rendering
+templates. Budgets are fixed numbers, so an N+1 regression shows up as a
+failure no matter how many rows exist.
+
+Run from the repository root (templates and static files are resolved
+relative to it):
+    python -m benchmarks.query_budget [--rows 1000]
+
+Exits with status 1 if any route exceeds its budget.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+# (method, path, maximum number of SQL statements)
+ROUTE_BUDGETS = [
+    ("GET", "/manage_characters", 2),
+    ("GET", "/manage_characters?page=7&per_page=100", 2),
+    ("GET", "/manage_characters?name=Hero&race=Elf&class=Wizard", 2),
+    ("GET", "/manage_games", 2),
+    ("GET", "/manage_games?page=3&per_page=100&name=Campaign", 2),
+    ("GET", "/character_creation", 0),
+    ("GET", "/select_character/{character_id}", 2),
+    ("POST", "/load_game/{game_id}", 3),
+]
+
+
+def seed(session_factory, rows):
+    from models.character_models import Background, Character, Class, Race
+    from models.save_game_models import SavedGame
+    from models.user_models import User
+
+    with session_factory() as db:
+        race_ids = [race_id for (race_id,) in db.query(Race.id)]
+        class_ids = [class_id for (class_id,) in db.query(Class.id)]
+        background_ids = [bg_id for (bg_id,) in db.query(Background.id)]
+        user_id = db.query(User.id).filter_by(username="default_user").scalar()
+
+        characters = [
+            Character(
+                name=f"Hero {i}",
+                race_id=race_ids[i % len(race_ids)],
+                class_id=class_ids[i % len(class_ids)],
+                background_id=background_ids[i % len(background_ids)],
+                strength=10,
+                dexterity=10,
+                constitution=10,
+                intelligence=10,
+                wisdom=10,
+                charisma=10,
+            )
+            for i in range(rows)
+        ]
+        db.add_all(characters)
+        db.flush()
+        db.add_all(
+            [
+                SavedGame(
+                    game_name=f"Campaign {i}",
+                    user_id=user_id,
+                    character_id=characters[i].id,
+                )
+                for i in range(rows)
+            ]
+        )
+        db.commit()
+        return characters[0].id, db.query(SavedGame.id).first()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="query_budget_")
+    # Must be set before the app (and db.database) are imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'budget.db')}"
+    os.environ["SESSION_BACKEND"] = "memory"
+
+    from sqlalchemy import event
+    from starlette.testclient import TestClient
+
+    from app import app
+    from db.database import SessionLocal, engine
+
+    character_id, game_id = seed(SessionLocal, args.rows)
+    client = TestClient(app)
+    # Reference data and the user principal are cached per worker; budgets
+    # apply to warm requests
+    client.get("/character_creation")
+    client.get("/manage_games")
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *rest: statements.append(statement),
+    )
+
+    failures = 0
+    print(f"{'route':<58} {'sql':>4} {'budget':>7}")
+    for method, path, budget in ROUTE_BUDGETS:
+        path = path.format(character_id=character_id, game_id=game_id)
+        statements.clear()
+        response = client.request(method, path)
+        count = len(statements)
+        ok = response.status_code < 400 and count <= budget
+        failures += not ok
+        status = "ok" if ok else f"FAIL (HTTP {response.status_code})"
+        print(f"{method + ' ' + path:<58} {count:>4} {budget:>7}  {status}")
+        if count > budget:
+            for statement in statements:
+                print("    " + " ".join(statement.split())[:120])
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
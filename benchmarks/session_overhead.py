@@ -0,0 +1,159 @@
+# benchmarks/session_overhead.py
+"""
+Measures per-request session middleware overhead and session bytes on the wire.
+
+Compares Starlette's signed-cookie ``SessionMiddleware`` with the server-side
+memory and SQLite backends, using a session shaped like the one the game keeps
+(current character, preferences, LLM settings and saved game ID).
+
+Usage:
+    python -m benchmarks.session_overhead [--requests 2000]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from services.session_store import (
+    MemorySessionBackend,
+    ServerSideSessionMiddleware,
+    SQLiteSessionBackend,
+)
+
+SAMPLE_SESSION = {
+    "current_character": {
+        "id": 42,
+        "name": "Thalia Windrunner",
+        "race": "Half-Elf",
+        "class": "Ranger",
+        "background": "Outlander",
+        "level": 5,
+        "experience_points": 6500,
+        "strength": 12,
+        "dexterity": 17,
+        "constitution": 14,
+        "intelligence": 10,
+        "wisdom": 15,
+        "charisma": 11,
+        "max_hit_points": 44,
+        "current_hit_points": 38,
+        "armor_class": 15,
+        "speed": 30,
+    },
+    "user_preferences": {
+        "gameStyle": "exploration",
+        "tone": "serious",
+        "difficulty": "medium",
+        "theme": "fantasy",
+    },
+    "llm_provider": "ollama",
+    "llm_model": "llama3.1:latest",
+    "saved_game_id": 1234,
+}
+
+
+async def seed(request):
+    request.session.update(SAMPLE_SESSION)
+    return JSONResponse({"ok": True})
+
+
+async def read_only(request):
+    # Mirrors /interact: reads the whole session, writes nothing
+    return JSONResponse({"name": request.session["current_character"]["name"]})
+
+
+async def write(request):
+    # Mirrors /load_game: rewrites part of the session
+    request.session["saved_game_id"] = request.session.get("saved_game_id", 0) + 1
+    return JSONResponse({"ok": True})
+
+
+def build_app(middleware):
+    routes = [
+        Route("/seed", seed),
+        Route("/read", read_only),
+        Route("/write", write),
+    ]
+    return Starlette(routes=routes, middleware=middleware)
+
+
+def run_case(name, middleware, n_requests):
+    client = TestClient(build_app(middleware))
+    client.get("/seed")
+
+    results = {}
+    for path in ("/read", "/write"):
+        timings = []
+        request_bytes = response_bytes = 0
+        for _ in range(n_requests):
+            cookie_header = "; ".join(f"{k}={v}" for k, v in client.cookies.items())
+            start = time.perf_counter()
+            response = client.get(path)
+            timings.append(time.perf_counter() - start)
+            request_bytes += len(cookie_header)
+            response_bytes += sum(
+                len(v) for k, v in response.headers.multi_items() if k == "set-cookie"
+            )
+        results[path] = (
+            statistics.mean(timings) * 1e6,
+            statistics.quantiles(timings, n=100)[98] * 1e6,
+            request_bytes / n_requests,
+            response_bytes / n_requests,
+        )
+
+    print(f"\n{name}")
+    for path, (mean_us, p99_us, req_b, resp_b) in results.items():
+        print(
+            f"  {path:<7} mean {mean_us:8.1f} us  p99 {p99_us:8.1f} us  "
+            f"cookie {req_b:6.0f} B/req  set-cookie {resp_b:6.0f} B/resp"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = {
+            "no session middleware (baseline)": [],
+            "signed cookie (SessionMiddleware)": [
+                Middleware(SessionMiddleware, secret_key="benchmark-secret")
+            ],
+            "server-side memory": [
+                Middleware(ServerSideSessionMiddleware, backend=MemorySessionBackend())
+            ],
+            "server-side sqlite": [
+                Middleware(
+                    ServerSideSessionMiddleware,
+                    backend=SQLiteSessionBackend(os.path.join(tmp_dir, "s.db")),
+                )
+            ],
+        }
+        for name, middleware in cases.items():
+            if not middleware:
+                # The baseline routes need a session to exist, so time a bare route
+                client = TestClient(
+                    Starlette(routes=[Route("/", lambda r: JSONResponse({}))])
+                )
+                timings = []
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    client.get("/")
+                    timings.append(time.perf_counter() - start)
+                print(f"\n{name}\n  mean {statistics.mean(timings) * 1e6:8.1f} us")
+                continue
+            run_case(name, middleware, args.requests)
+
+
+if __name__ == "__main__":
+    main()
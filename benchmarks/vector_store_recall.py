@@ -0,0 +1,120 @@
+# benchmarks/vector_store_recall.py
+"""
+Compares recall and query latency of the vector store backends on the same data.
+
+Generates ``--vectors`` clustered, normalized embeddings (MiniLM-sized by
+default) and ``--queries`` perturbed copies of stored vectors, loads them into
+Chroma, the NumPy store and the int8-quantized NumPy store, and reports
+recall@k against exact brute-force search, p50/p95 query latency, build time
+and on-disk size. Queries go through the ``VectorStore`` interface, as
+retrieval does.
+
+Usage:
+    python -m benchmarks.vector_store_recall [--vectors 20000] [--dim 384]
+        [--queries 200] [--top-k 10]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from llm.vector_store import ChromaVectorStore, NumpyVectorStore
+
+# Chroma rejects larger single writes
+WRITE_BATCH = 5000
+
+
+def synthetic_embeddings(n, dim, n_clusters=64, seed=11):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = centers[rng.integers(n_clusters, size=n)] + 0.6 * rng.normal(
+        size=(n, dim)
+    )
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(
+        np.float32
+    )
+
+
+def synthetic_queries(vectors, n, seed=12):
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(len(vectors), size=n)]
+    queries = picks + 0.3 * rng.normal(size=picks.shape) / np.sqrt(vectors.shape[1])
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(
+        np.float32
+    )
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def run_backend(name, store, path, vectors, queries, truth, top_k):
+    ids = [str(i) for i in range(len(vectors))]
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), WRITE_BATCH):
+        batch = slice(offset, offset + WRITE_BATCH)
+        store.upsert(
+            ids=ids[batch],
+            documents=[f"chunk {i}" for i in ids[batch]],
+            metadatas=[{"source": "bench"} for _ in ids[batch]],
+            embeddings=vectors[batch].tolist()
+            if isinstance(store, ChromaVectorStore)
+            else vectors[batch],
+        )
+    store.persist()
+    build_seconds = time.perf_counter() - start
+
+    store.query(queries[0], top_k)  # Warm caches / page in the matrix
+    timings, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = store.query(query, top_k)
+        timings.append(time.perf_counter() - start)
+        found = {int(hit.id) for hit in hits}
+        recalls.append(len(found & set(expected.tolist())) / top_k)
+
+    quantiles = statistics.quantiles(timings, n=100)
+    print(
+        f"  {name:<12} recall@{top_k} {statistics.mean(recalls):6.3f}  "
+        f"p50 {quantiles[49] * 1e3:7.2f} ms  p95 {quantiles[94] * 1e3:7.2f} ms  "
+        f"build {build_seconds:6.1f} s  disk {directory_size(path) / 2**20:7.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.vectors, args.dim)
+    queries = synthetic_queries(vectors, args.queries)
+    # Exact cosine top-k as ground truth
+    scores = queries @ vectors.T
+    truth = np.argsort(-scores, axis=1)[:, : args.top_k]
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backends = {
+            "chroma": lambda path: ChromaVectorStore(path, "bench"),
+            "numpy": lambda path: NumpyVectorStore(path, "bench"),
+            "numpy-int8": lambda path: NumpyVectorStore(path, "bench", quantize=True),
+        }
+        for name, factory in backends.items():
+            path = os.path.join(tmp_dir, name)
+            os.makedirs(path)
+            run_backend(name, factory(path), path, vectors, queries, truth, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
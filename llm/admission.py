@@ -0,0 +1,396 @@
+# llm/admission.py
+"""
+Admission control for LLM calls.
+
+Every call holds a slot of its model and of its provider's backend while the
+request is in flight; calls beyond the limits wait in line. A single Ollama
+instance serves all its models, so its provider limit is what protects it;
+per-model limits keep one model of a hosted provider within its rate limits.
+
+Turns are admitted before any work starts: when a backend or model already
+has ``LLM_MAX_QUEUE`` calls waiting, ``/interact`` answers at once with 503
+and a ``Retry-After`` estimate instead of queueing a turn that would time
+out. A game that sends a turn while its previous one is still running gets
+429.
+
+Waiting calls are not served first come, first served. Each call belongs to
+a lane: classification calls of a player's turn, the other calls of a turn,
+and background work (speculative drafts, progressive refinement, the
+opening pool and world-state extraction), served in that order; a
+background call that has waited ``BACKGROUND_MAX_WAIT_S`` goes ahead of the
+turns' calls so it cannot starve. Within a lane the calls are fair-queued
+by (user, game): each call's cost is the share of a 1024-token answer its
+tier may produce, every user gets an equal share of the slots, split
+between the user's games that are waiting, and the call with the earliest
+virtual finish time goes next. A player replaying turns quickly or a batch
+of games run by one user therefore only delays their own calls.
+"""
+
+import asyncio
+import itertools
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from llm.llm_config import CLASSIFICATION, NARRATION, TIER_SAMPLING, config_provider
+
+load_dotenv()
+
+# ============================
+# Constants
+# ============================
+
+# Calls in flight per provider backend unless <PROVIDER>_MAX_CONCURRENCY is set
+DEFAULT_PROVIDER_CONCURRENCY = {"ollama": 2, "openai": 16}
+FALLBACK_CONCURRENCY = 4
+# Per-model limits as "model=limit" pairs, e.g. "gpt-4=4,llama3.2:latest=1"
+MODEL_MAX_CONCURRENCY = os.getenv("MODEL_MAX_CONCURRENCY", "")
+# Calls allowed to wait per backend or model before new turns are turned away
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+
+# Seconds a background call waits before it is served as a turn's call
+BACKGROUND_MAX_WAIT_S = float(os.getenv("BACKGROUND_MAX_WAIT_S", "60"))
+
+# Lanes, served in this order
+LANE_CLASSIFICATION = 0
+LANE_TURN = 1
+LANE_BACKGROUND = 2
+LANE_NAMES = {
+    LANE_CLASSIFICATION: "classification",
+    LANE_TURN: "turn",
+    LANE_BACKGROUND: "background",
+}
+
+# Assumed seconds a call holds its slot until one has finished
+DEFAULT_HOLD_S = 5.0
+# Latest waits and slot hold times kept per limit
+WAIT_WINDOW = 500
+
+_lock = threading.Lock()
+_limits: Dict[Tuple[str, Hashable], "Limit"] = {}
+_turns: Set[int] = set()
+_rejections = Counter()
+
+# The (user, game) the current turn's calls are queued under, and whether
+# they are background work; tasks inherit both from the code that made them
+_flow: ContextVar[Tuple[Hashable, Optional[int]]] = ContextVar(
+    "llm_flow", default=(None, None)
+)
+_background: ContextVar[bool] = ContextVar("llm_background", default=False)
+
+
+def _model_limits() -> Dict[str, int]:
+    limits = {}
+    for pair in MODEL_MAX_CONCURRENCY.split(","):
+        model, _, limit = pair.strip().rpartition("=")
+        if model and limit.isdigit():
+            limits[model] = int(limit)
+    return limits
+
+
+def provider_concurrency(provider: str) -> int:
+    override = os.getenv(f"{provider.upper()}_MAX_CONCURRENCY")
+    if override and override.isdigit():
+        return int(override)
+    return DEFAULT_PROVIDER_CONCURRENCY.get(provider, FALLBACK_CONCURRENCY)
+
+
+# ============================
+# Limits
+# ============================
+
+
+class Waiter:
+    """A call waiting for a slot, with its place in the fair queue."""
+
+    def __init__(
+        self,
+        lane: int,
+        flow: Tuple[Hashable, Optional[int]],
+        start: float,
+        finish: float,
+        sequence: int,
+        future: "asyncio.Future",
+    ):
+        self.lane = lane
+        self.flow = flow
+        self.start = start
+        self.finish = finish
+        self.sequence = sequence
+        self.future = future
+        self.enqueued = time.monotonic()
+
+    def order(self, now: float) -> Tuple[int, float, int]:
+        if (
+            self.lane == LANE_BACKGROUND
+            and now - self.enqueued >= BACKGROUND_MAX_WAIT_S
+        ):
+            # Virtual times of different lanes do not compare: go first
+            return LANE_TURN, float("-inf"), self.sequence
+        return self.lane, self.finish, self.sequence
+
+
+class Limit:
+    """A concurrency limit with the calls holding and fair-queued for it."""
+
+    def __init__(self, limit: int):
+        self.limit = max(limit, 1)
+        self.active = 0
+        self.calls = 0
+        self.waits = deque(maxlen=WAIT_WINDOW)
+        self.holds = deque(maxlen=WAIT_WINDOW)
+        self.lane_waits = {lane: deque(maxlen=WAIT_WINDOW) for lane in LANE_NAMES}
+        self._waiters: List[Waiter] = []
+        # Per lane: the virtual time, and the virtual finish time of each
+        # flow's latest queued call
+        self._virtual_time = {lane: 0.0 for lane in LANE_NAMES}
+        self._finish: Dict[int, Dict[Tuple[Hashable, Optional[int]], float]] = {
+            lane: {} for lane in LANE_NAMES
+        }
+        self._sequence = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def waiting_in(self, lane: int) -> int:
+        return sum(1 for waiter in self._waiters if waiter.lane == lane)
+
+    def _weight(self, lane: int, flow: Tuple[Hashable, Optional[int]]) -> float:
+        # A user's share is split between their games with calls waiting
+        games = {
+            waiter.flow
+            for waiter in self._waiters
+            if waiter.lane == lane and waiter.flow[0] == flow[0]
+        }
+        games.add(flow)
+        return 1.0 / len(games)
+
+    async def acquire(self, lane: int, cost: float) -> None:
+        start_time = time.perf_counter()
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+        else:
+            flow = _flow.get()
+            finishes = self._finish[lane]
+            start = max(self._virtual_time[lane], finishes.get(flow, 0.0))
+            finish = start + cost / self._weight(lane, flow)
+            finishes[flow] = finish
+            waiter = Waiter(
+                lane,
+                flow,
+                start,
+                finish,
+                next(self._sequence),
+                asyncio.get_running_loop().create_future(),
+            )
+            self._waiters.append(waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.future.cancelled():
+                    # Granted a slot just as it was cancelled: hand it on
+                    self.active -= 1
+                    self._grant()
+                raise
+        waited = time.perf_counter() - start_time
+        self.calls += 1
+        self.waits.append(waited)
+        self.lane_waits[lane].append(waited)
+
+    def release(self, held_s: float) -> None:
+        self.active -= 1
+        self.holds.append(held_s)
+        self._grant()
+
+    def _grant(self) -> None:
+        now = time.monotonic()
+        while self.active < self.limit and self._waiters:
+            waiter = min(self._waiters, key=lambda waiter: waiter.order(now))
+            self._waiters.remove(waiter)
+            if waiter.future.done():
+                continue
+            self.active += 1
+            lane = waiter.lane
+            self._virtual_time[lane] = max(self._virtual_time[lane], waiter.start)
+            waiter.future.set_result(None)
+            # Flows whose calls have all been served start afresh
+            self._finish[lane] = {
+                flow: finish
+                for flow, finish in self._finish[lane].items()
+                if finish > self._virtual_time[lane]
+            }
+
+    def turns_waiting(self) -> int:
+        # Background calls wait behind turns, so they do not turn turns away
+        return self.waiting - self.waiting_in(LANE_BACKGROUND)
+
+    def full(self) -> bool:
+        return self.turns_waiting() >= LLM_MAX_QUEUE
+
+    def retry_after(self) -> int:
+        """:return: Seconds until the turns' calls now waiting should have started"""
+        holds = sorted(self.holds)
+        hold_s = holds[len(holds) // 2] if holds else DEFAULT_HOLD_S
+        return max(1, math.ceil((self.turns_waiting() + 1) / self.limit * hold_s))
+
+    def to_dict(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def percentile(ordered: List[float], p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "calls": self.calls,
+            "wait_p50_s": percentile(waits, 0.5),
+            "wait_p95_s": percentile(waits, 0.95),
+            "lanes": {
+                name: {
+                    "queue_depth": self.waiting_in(lane),
+                    "wait_p50_s": percentile(sorted(self.lane_waits[lane]), 0.5),
+                    "wait_p99_s": percentile(sorted(self.lane_waits[lane]), 0.99),
+                }
+                for lane, name in LANE_NAMES.items()
+            },
+        }
+
+
+def _limit(kind: str, key: Hashable) -> Limit:
+    with _lock:
+        limit = _limits.get((kind, key))
+        if limit is None:
+            if kind == "provider":
+                size = provider_concurrency(key)
+            else:
+                size = _model_limits().get(key[1], provider_concurrency(key[0]))
+            limit = _limits[(kind, key)] = Limit(size)
+        return limit
+
+
+def _call_limits(provider: str, model: str) -> Tuple[Limit, Limit]:
+    # A model without its own limit shares its provider's
+    model_limit = _limit("model", (provider, model))
+    return model_limit, _limit("provider", provider)
+
+
+def call_lane(tier: str) -> int:
+    """:return: The lane of a call of the given tier made in this context"""
+    if _background.get():
+        return LANE_BACKGROUND
+    return LANE_CLASSIFICATION if tier == CLASSIFICATION else LANE_TURN
+
+
+def call_cost(tier: str) -> float:
+    """:return: The share of a 1024-token answer a call of the tier may write"""
+    return TIER_SAMPLING.get(tier, TIER_SAMPLING[NARRATION])["max_tokens"] / 1024
+
+
+def set_flow(user: Hashable, saved_game_id: Optional[int]) -> None:
+    """Queues the LLM calls of the current turn under its user and game."""
+    _flow.set((user, saved_game_id))
+
+
+def mark_background() -> None:
+    """
+    Moves the LLM calls of the current task, and of the tasks it creates, to
+    the background lane. Call it at the start of a background task.
+    """
+    _background.set(True)
+
+
+@asynccontextmanager
+async def llm_slot(provider: str, model: str, tier: str = NARRATION):
+    """
+    Holds a slot of the model and of its provider's backend for one call,
+    waiting for both in that order so a call waiting on a busy model does
+    not keep the backend from the provider's other models.
+    """
+    lane, cost = call_lane(tier), call_cost(tier)
+    held = []
+    start = None
+    try:
+        for limit in _call_limits(provider, model):
+            await limit.acquire(lane, cost)
+            held.append(limit)
+        start = time.perf_counter()
+        yield
+    finally:
+        held_s = time.perf_counter() - start if start is not None else 0.0
+        for limit in reversed(held):
+            limit.release(held_s)
+
+
+# ============================
+# Turn Admission
+# ============================
+
+
+def admit(configs: Iterable[Dict[str, Any]]) -> Optional[int]:
+    """
+    Decides whether a turn that calls the given models may start.
+
+    :param configs: The LLM configurations the turn's agents use
+    :return: None to admit the turn, or the seconds to suggest in a
+        ``Retry-After`` header
+    """
+    retry_after = None
+    for config in configs:
+        for entry in config.get("config_list", []):
+            provider = config_provider(entry)
+            for limit in _call_limits(provider, entry.get("model", "unknown")):
+                if limit.full():
+                    retry_after = max(retry_after or 0, limit.retry_after())
+    if retry_after is not None:
+        _rejections["overloaded"] += 1
+    return retry_after
+
+
+def begin_turn(saved_game_id: int) -> bool:
+    """
+    Marks a game's turn as running.
+
+    :return: False if the game already has a turn running
+    """
+    if saved_game_id in _turns:
+        _rejections["turn_in_flight"] += 1
+        return False
+    _turns.add(saved_game_id)
+    return True
+
+
+def end_turn(saved_game_id: int) -> None:
+    _turns.discard(saved_game_id)
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    :return: Slots in use, queue depth and wait times per provider backend
+        and per model, overall and per lane, turns running, and turns turned
+        away by reason
+    """
+    with _lock:
+        limits = list(_limits.items())
+    report: Dict[str, Any] = {"providers": {}, "models": {}}
+    for (kind, key), limit in sorted(limits, key=lambda item: str(item[0])):
+        if kind == "provider":
+            report["providers"][key] = limit.to_dict()
+        else:
+            report["models"][f"{key[0]}/{key[1]}"] = limit.to_dict()
+    report["max_queue"] = LLM_MAX_QUEUE
+    report["turns_running"] = len(_turns)
+    report["rejected"] = dict(_rejections)
+    return report
@@ -2,12 +2,15 @@
 
 import logging
 import os
+from functools import lru_cache
 from typing import Dict, Any
 
-import chromadb
 from autogen import ConversableAgent
 from autogen.agentchat.contrib.retrieve_user_proxy_agent import RetrieveUserProxyAgent
-from chromadb.utils import embedding_functions
+
+from llm.embedding_cache import CachedEmbeddingFunction
+from llm.embedding_service import EMBEDDING_MODEL
+from llm.llm_config import CLASSIFICATION, NARRATION, TIERS, VALIDATION
 
 # Import configurations based on LLM provider
 
@@ -30,15 +33,10 @@ CHROMA_DB_PATH_ST = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "chromadb_st")
 )
 
-# Initialize ChromaDB clients
-chroma_client_dm = chromadb.PersistentClient(path=CHROMA_DB_PATH_DM)
-chroma_client_st = chromadb.PersistentClient(path=CHROMA_DB_PATH_ST)
-
-# Initialize embedding function for retrieval
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name=EMBEDDING_MODEL
-)
+# Initialize embedding function for retrieval; repeated queries and ingested
+# chunks are served from the on-disk embedding cache, misses go to the shared
+# embedding service
+embedding_function = CachedEmbeddingFunction(EMBEDDING_MODEL)
 
 
 # ============================
@@ -46,6 +44,24 @@ embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
 # ============================
 
 
+@lru_cache(maxsize=None)
+def get_chroma_client(agent_type: str):
+    """
+    Opens the ChromaDB client for an agent type on first use, so importing this
+    module (and the app) does not start Chroma.
+
+    :param agent_type: Type of the agent ('dm' or 'st')
+    :return: chromadb PersistentClient
+    """
+    import chromadb
+
+    if agent_type == "dm":
+        return chromadb.PersistentClient(path=CHROMA_DB_PATH_DM)
+    if agent_type == "st":
+        return chromadb.PersistentClient(path=CHROMA_DB_PATH_ST)
+    raise ValueError(f"Unknown agent type: {agent_type}")
+
+
 def create_ragproxyagent(agent_type: str) -> RetrieveUserProxyAgent:
     """
     Factory function to create a RetrieveUserProxyAgent based on the agent type.
@@ -54,10 +70,10 @@ def create_ragproxyagent(agent_type: str) -> RetrieveUserProxyAgent:
     :return: Configured RetrieveUserProxyAgent instance
     """
     if agent_type == "dm":
-        client = chroma_client_dm
+        client = get_chroma_client("dm")
         docs_path = ["../resources/dm_resources"]
     elif agent_type == "st":
-        client = chroma_client_st
+        client = get_chroma_client("st")
         docs_path = ["../resources/st_resources"]
     else:
         raise ValueError(f"Unknown agent type: {agent_type}")
@@ -69,7 +85,7 @@ def create_ragproxyagent(agent_type: str) -> RetrieveUserProxyAgent:
             "task": "qa",
             "docs_path": docs_path,
             "client": client,
-            "embedding_model": "all-mpnet-base-v2",
+            "embedding_function": embedding_function,
             "get_or_create": True,
         },
         code_execution_config=False,
@@ -102,16 +118,20 @@ def create_dm_agent(llm_config: Dict[str, Any]) -> ConversableAgent:
     return dm_agent
 
 
-def create_storyteller_agent(llm_config: Dict[str, Any]) -> ConversableAgent:
+def create_storyteller_agent(
+    llm_config: Dict[str, Any], name: str = "StorytellerAgent"
+) -> ConversableAgent:
     """
     Factory function to create a Storyteller ConversableAgent.
 
     :param llm_config: Configuration dictionary for the LLM
+    :param name: Agent name; validator and classifier agents are storytellers
+        on their own tier's model
     :return: Configured ConversableAgent instance for Storyteller
     """
 
     storyteller_agent = ConversableAgent(
-        name="StorytellerAgent",
+        name=name,
         system_message=(
             "You are a Storytelling Expert for a campaign in the world's Most Popular role playing game (5th Edition)."
         ),
@@ -132,13 +152,25 @@ def get_agents(llm_config: Dict[str, Any]) -> Dict[str, ConversableAgent]:
     """
     Retrieves agent instances based on the specified LLM configuration.
 
-    :param llm_config: The LLM configuration dictionary
+    :param llm_config: The LLM configuration dictionary, or one per tier as
+        returned by ``get_tier_configs``
     :return: Dictionary of agent instances
     """
+    # A single configuration serves every tier
+    if "config_list" in llm_config:
+        tier_configs = {tier: llm_config for tier in TIERS}
+    else:
+        tier_configs = llm_config
     try:
         # Create agent instances with the fetched configurations
-        dm_agent = create_dm_agent(llm_config)
-        storyteller_agent = create_storyteller_agent(llm_config)
+        dm_agent = create_dm_agent(tier_configs[NARRATION])
+        storyteller_agent = create_storyteller_agent(tier_configs[NARRATION])
+        validator_agent = create_storyteller_agent(
+            tier_configs[VALIDATION], name="ValidatorAgent"
+        )
+        classifier_agent = create_storyteller_agent(
+            tier_configs[CLASSIFICATION], name="ClassifierAgent"
+        )
     except Exception as e:
         logger.error(f"Error creating agents: {e}")
         raise
@@ -147,4 +179,6 @@ def get_agents(llm_config: Dict[str, Any]) -> Dict[str, ConversableAgent]:
     return {
         "DMAgent": dm_agent,
         "StorytellerAgent": storyteller_agent,
+        "ValidatorAgent": validator_agent,
+        "ClassifierAgent": classifier_agent,
     }
@@ -0,0 +1,251 @@
+# llm/chunking.py
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ============================
+# Constants
+# ============================
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; leave headroom for the
+# estimate below undercounting rare words
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP_TOKENS = 40
+# Bump whenever chunk_pages splits the same pages differently, so ingestion
+# re-chunks files indexed by an older version
+CHUNKER_VERSION = 1
+
+HEADING_MAX_CHARS = 80
+
+# Words and punctuation marks, a close (slightly low) estimate of word pieces
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Sentence end followed by whitespace and something that can start a sentence
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+
+# "Chapter 3", "Part II: Rules", "4.2 Grappling", ...
+_NUMBERED_HEADING_RE = re.compile(
+    r"^(chapter|part|appendix|section)\s+[\w.]+\b|^\d+(\.\d+)*\s+[A-Z]", re.IGNORECASE
+)
+
+_TERMINAL_PUNCTUATION = ".!?:;,"
+
+PARAGRAPH_SEP = "\n\n"
+SENTENCE_SEP = " "
+
+
+def approximate_token_count(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+# ============================
+# Data Classes
+# ============================
+
+
+@dataclass(frozen=True, slots=True)
+class Block:
+    """A heading or paragraph of a PDF, tagged with the pages it spans."""
+
+    text: str
+    page: int
+    page_end: int
+    is_heading: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    text: str
+    page_start: int
+    page_end: int
+    section: Optional[str]
+    tokens: int
+
+    def metadata(self, source: str) -> Dict[str, object]:
+        # Chroma rejects None metadata values
+        return {
+            "source": source,
+            "page": self.page_start,
+            "page_end": self.page_end,
+            "section": self.section or "",
+        }
+
+
+# ============================
+# Block Detection
+# ============================
+
+
+def is_heading(line: str) -> bool:
+    """
+    Heuristic heading test for text extracted from rulebook PDFs: short lines
+    without terminal punctuation that are upper case, title case or numbered.
+    """
+    line = line.strip()
+    if not line or len(line) > HEADING_MAX_CHARS or line[-1] in _TERMINAL_PUNCTUATION:
+        return False
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) < 3:
+        return False
+    if _NUMBERED_HEADING_RE.match(line):
+        return True
+    if all(c.isupper() for c in letters):
+        return True
+    words = [w for w in line.split() if w[0].isalpha()]
+    # Title case, allowing short lowercase joiners ("Sleight of Hand")
+    return len(words) <= 8 and all(w[0].isupper() or len(w) <= 3 for w in words)
+
+
+def iter_blocks(pages: Iterable[Tuple[int, str]]) -> Iterator[Block]:
+    """
+    Groups the lines of consecutive pages into headings and paragraphs.
+
+    Paragraphs end at blank lines, headings, or a line that finishes a
+    sentence while being noticeably shorter than the page's longest line.
+    A paragraph that runs off the bottom of a page continues on the next one.
+
+    :param pages: (1-based page number, text) pairs in page order
+    """
+    lines: List[str] = []
+    start_page = end_page = 0
+
+    def flush() -> Iterator[Block]:
+        nonlocal lines
+        if lines:
+            yield Block(" ".join(lines), start_page, end_page)
+            lines = []
+
+    for page_number, text in pages:
+        page_lines = text.splitlines()
+        width = max((len(line.strip()) for line in page_lines), default=0)
+        for raw_line in page_lines:
+            line = raw_line.strip()
+            if not line:
+                yield from flush()
+                continue
+            if is_heading(line) and (not lines or lines[-1][-1] in ".!?"):
+                yield from flush()
+                yield Block(line, page_number, page_number, is_heading=True)
+                continue
+            if not lines:
+                start_page = page_number
+            lines.append(line)
+            end_page = page_number
+            if line[-1] in ".!?:" and len(line) < 0.6 * width:
+                yield from flush()
+    yield from flush()
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_SPLIT_RE.split(text) if s.strip()]
+
+
+# ============================
+# Chunking
+# ============================
+
+
+def _split_oversized(
+    sentence: str, max_tokens: int, count_tokens: Callable[[str], int]
+) -> List[str]:
+    # Last resort for run-on text such as tables: cut between words
+    pieces, current = [], []
+    for word in sentence.split():
+        if current and count_tokens(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_pages(
+    pages: Iterable[Tuple[int, str]],
+    max_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    count_tokens: Callable[[str], int] = approximate_token_count,
+) -> Iterator[Chunk]:
+    """
+    Splits PDF pages into chunks of at most ``max_tokens`` tokens that never
+    cross a section heading and only break paragraphs between sentences.
+
+    Whole paragraphs are packed together while they fit; longer paragraphs are
+    split at sentence boundaries. Consecutive chunks of the same section share
+    up to ``overlap_tokens`` tokens of trailing sentences.
+
+    :param pages: (1-based page number, text) pairs in page order
+    :param max_tokens: Maximum tokens per chunk
+    :param overlap_tokens: Tokens of context repeated from the previous chunk
+    :param count_tokens: Tokenizer-backed counter; defaults to an estimate
+    :return: Iterator of chunks, in document order
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    section: Optional[str] = None
+    # (text, separator before it, tokens, first page, last page) of the chunk
+    # being built
+    units: List[Tuple[str, str, int, int, int]] = []
+    size = 0
+    fresh = False  # True once the chunk holds text beyond the overlap
+
+    def emit() -> Iterator[Chunk]:
+        text = "".join(sep + unit for unit, sep, *_ in units).strip()
+        yield Chunk(text, units[0][3], units[-1][4], section, size)
+
+    def flush(keep_overlap: bool) -> Iterator[Chunk]:
+        nonlocal units, size, fresh
+        if fresh:
+            yield from emit()
+        tail: List[Tuple[str, str, int, int, int]] = []
+        if keep_overlap and fresh:
+            tail_size = 0
+            for unit in reversed(units):
+                if tail_size + unit[2] > overlap_tokens:
+                    break
+                tail.insert(0, unit)
+                tail_size += unit[2]
+        units = tail
+        size = sum(unit[2] for unit in units)
+        fresh = False
+
+    def add(text: str, sep: str, tokens: int, block: Block) -> Iterator[Chunk]:
+        nonlocal size, fresh
+        if units and size + tokens > max_tokens:
+            yield from flush(keep_overlap=True)
+            # Drop overlap that would leave no room for the new unit
+            while units and size + tokens > max_tokens:
+                size -= units.pop(0)[2]
+        units.append((text, sep if units else "", tokens, block.page, block.page_end))
+        size += tokens
+        fresh = True
+
+    for block in iter_blocks(pages):
+        if block.is_heading:
+            yield from flush(keep_overlap=False)
+            section = block.text
+            continue
+
+        tokens = count_tokens(block.text)
+        if tokens <= max_tokens:
+            yield from add(block.text, PARAGRAPH_SEP, tokens, block)
+            continue
+
+        sep = PARAGRAPH_SEP
+        for sentence in split_sentences(block.text):
+            sentence_tokens = count_tokens(sentence)
+            pieces = (
+                [sentence]
+                if sentence_tokens <= max_tokens
+                else _split_oversized(sentence, max_tokens, count_tokens)
+            )
+            for piece in pieces:
+                piece_tokens = (
+                    sentence_tokens if len(pieces) == 1 else count_tokens(piece)
+                )
+                yield from add(piece, sep, piece_tokens, block)
+                sep = SENTENCE_SEP
+
+    yield from flush(keep_overlap=False)
@@ -0,0 +1,248 @@
+# llm/embedding_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import portalocker
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from dotenv import load_dotenv
+
+from llm.embedding_service import get_embedder
+
+load_dotenv()
+
+# ============================
+# Constants
+# ============================
+
+EMBEDDING_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "embedding_cache")
+    ),
+)
+
+DIGEST_SIZE = 32  # sha256
+VECTORS_FILENAME = "vectors.f32"
+KEYS_FILENAME = "keys.idx"
+META_FILENAME = "meta.json"
+LOCK_FILENAME = ".lock"
+
+# Recent query vectors kept in process memory in front of the disk cache
+MEMORY_CACHE_SIZE = 1024
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+# ============================
+# Disk Cache
+# ============================
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, append-only store of the embeddings of one model.
+
+    Each model gets its own directory holding a raw float32 matrix
+    (``vectors.f32``, read through ``np.memmap``) and ``keys.idx``, the sha256
+    digests of the embedded texts in row order. Appends take an exclusive
+    file lock, write the vectors before the keys and are therefore safe across
+    processes: a reader never sees a key without its vector.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR):
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", model_name))
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, VECTORS_FILENAME)
+        self._keys_path = os.path.join(self.path, KEYS_FILENAME)
+        self._meta_path = os.path.join(self.path, META_FILENAME)
+        self._lock_path = os.path.join(self.path, LOCK_FILENAME)
+
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._keys_size = 0
+        self._dim: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self._dim = json.load(f)["dim"]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def _refresh(self) -> None:
+        # Picks up rows appended since the last look, by this or another process
+        try:
+            size = os.path.getsize(self._keys_path)
+        except FileNotFoundError:
+            return
+        if size == self._keys_size:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_size)
+            data = f.read(size - self._keys_size)
+        complete = len(data) - len(data) % DIGEST_SIZE
+        row = self._keys_size // DIGEST_SIZE
+        for offset in range(0, complete, DIGEST_SIZE):
+            self._rows.setdefault(data[offset : offset + DIGEST_SIZE], row)
+            row += 1
+        self._keys_size += complete
+        if self._dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self._dim = json.load(f)["dim"]
+        self._matrix = None  # Remapped lazily with the new row count
+
+    def _vectors(self) -> np.memmap:
+        if self._matrix is None:
+            rows = self._keys_size // DIGEST_SIZE
+            self._matrix = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim)
+            )
+        return self._matrix
+
+    def get_many(self, digests: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """
+        Looks up embeddings by text digest.
+
+        :return: One vector (a copy) or None per digest, in order
+        """
+        with self._lock:
+            if any(d not in self._rows for d in digests):
+                self._refresh()
+            if not self._rows:
+                return [None] * len(digests)
+            matrix = self._vectors()
+            return [
+                np.array(matrix[self._rows[d]]) if d in self._rows else None
+                for d in digests
+            ]
+
+    def put_many(self, digests: Sequence[bytes], vectors: Sequence) -> int:
+        """
+        Appends the embeddings whose digests are not stored yet.
+
+        :return: Number of rows written
+        """
+        if not digests:
+            return 0
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._lock, portalocker.Lock(self._lock_path, timeout=60):
+            self._refresh()
+            if self._dim is None:
+                self._dim = int(matrix.shape[1])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self._dim}, f)
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match the "
+                    f"cache's {self._dim} for model {self.model_name}"
+                )
+
+            new_rows, new_keys, seen = [], [], set()
+            for digest, vector in zip(digests, matrix):
+                if digest in self._rows or digest in seen:
+                    continue
+                seen.add(digest)
+                new_rows.append(vector)
+                new_keys.append(digest)
+            if not new_keys:
+                return 0
+
+            rows = self._keys_size // DIGEST_SIZE
+            # Truncate a torn tail left by a crashed writer before appending
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(rows * self._dim * 4)
+                f.write(np.stack(new_rows).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._keys_path, "ab") as f:
+                f.truncate(self._keys_size)
+                f.write(b"".join(new_keys))
+            self._refresh()
+            return len(new_keys)
+
+
+# ============================
+# Embedding Function
+# ============================
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Chroma embedding function that consults the embedding cache first and only
+    sends texts it has never seen to the shared embedding service.
+
+    The model is loaded on the first cache miss, so a fully cached corpus can
+    be re-ingested without loading it at all.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: str = EMBEDDING_CACHE_DIR,
+        memory_cache_size: int = MEMORY_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.cache = EmbeddingCache(model_name, cache_dir)
+        self._recent: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._memory_cache_size = memory_cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, digest: bytes, vector: np.ndarray) -> None:
+        with self._recent_lock:
+            self._recent[digest] = vector
+            self._recent.move_to_end(digest)
+            while len(self._recent) > self._memory_cache_size:
+                self._recent.popitem(last=False)
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = list(input)
+        digests = [text_digest(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+
+        with self._recent_lock:
+            for i, digest in enumerate(digests):
+                vector = self._recent.get(digest)
+                if vector is not None:
+                    self._recent.move_to_end(digest)
+                    results[i] = vector
+
+        pending = [i for i, vector in enumerate(results) if vector is None]
+        if pending:
+            for i, vector in zip(
+                pending, self.cache.get_many([digests[i] for i in pending])
+            ):
+                results[i] = vector
+
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            # Embed each distinct text once, even if a batch repeats it
+            unique: Dict[bytes, int] = {}
+            for i in missing:
+                unique.setdefault(digests[i], i)
+            computed = get_embedder(self.model_name).embed(
+                [texts[i] for i in unique.values()]
+            )
+            vectors = dict(zip(unique, computed))
+            self.cache.put_many(list(vectors), list(vectors.values()))
+            for i in missing:
+                results[i] = vectors[digests[i]]
+
+        for digest, vector in zip(digests, results):
+            self._remember(digest, vector)
+        return results
@@ -0,0 +1,280 @@
+# llm/embedding_service.py
+"""
+One embedding model per process or per host, shared by ingestion and retrieval.
+
+In-process, every caller goes through a single ``MicroBatcher``: requests
+arriving within ``EMBEDDING_BATCH_WAIT_MS`` of each other are encoded in one
+forward pass by one worker thread, and torch is limited to
+``EMBEDDING_THREADS`` threads so encoding never competes with the web workers
+for every core.
+
+For one model per host, run the sidecar and point every worker at it:
+    python -m llm.embedding_service [--host 127.0.0.1] [--port 8765]
+    EMBEDDING_SERVICE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+from chromadb.utils import embedding_functions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+
+# ============================
+# Constants
+# ============================
+
+# The one model used for every collection and query
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "2"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "")
+EMBEDDING_SERVICE_TIMEOUT = 30  # seconds
+
+_STOP = object()
+
+
+# ============================
+# Local Micro-Batching
+# ============================
+
+
+def load_model(model_name: str):
+    """Loads the SentenceTransformer model with torch's thread pool bounded."""
+    try:
+        import torch
+
+        torch.set_num_threads(EMBEDDING_THREADS)
+    except ImportError:
+        pass
+    return embedding_functions.SentenceTransformerEmbeddingFunction(
+        model_name=model_name
+    )
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent embedding requests into batched forward passes.
+
+    A single worker thread owns the model. It takes the first waiting request,
+    gathers more for up to ``max_wait_ms`` (or until ``max_batch`` texts are
+    queued), encodes them together and resolves each caller's future.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_batch: int = EMBEDDING_MAX_BATCH,
+        max_wait_ms: float = EMBEDDING_BATCH_WAIT_MS,
+    ):
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._requests: "queue.Queue" = queue.Queue()
+        self._model = None
+        self._thread = threading.Thread(
+            target=self._run, name=f"embedder-{model_name}", daemon=True
+        )
+        self._thread.start()
+        self.batches = 0
+        self.texts = 0
+
+    def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """Embeds texts, blocking until the batch containing them has run."""
+        if not texts:
+            return []
+        future: Future = Future()
+        self._requests.put((list(texts), future))
+        return future.result()
+
+    def close(self) -> None:
+        self._requests.put(_STOP)
+
+    def _collect(self, first) -> Tuple[List[Tuple[List[str], Future]], bool]:
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            size += len(item[0])
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._requests.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                if self._model is None:
+                    self._model = load_model(self.model_name)
+                vectors = [
+                    np.asarray(v, dtype=np.float32) for v in self._model(texts)
+                ]
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                self.batches += 1
+                self.texts += len(texts)
+                offset = 0
+                for request_texts, future in batch:
+                    future.set_result(vectors[offset : offset + len(request_texts)])
+                    offset += len(request_texts)
+            if stop:
+                return
+
+
+# ============================
+# Sidecar Client
+# ============================
+
+
+class RemoteEmbedder:
+    """Sends embedding requests to the per-host sidecar."""
+
+    def __init__(self, url: str, model_name: str):
+        self.url = url.rstrip("/")
+        self.model_name = model_name
+        self._session = requests.Session()
+
+    def embed(self, texts: Sequence[str]) -> List[np.ndarray]:
+        if not texts:
+            return []
+        response = self._session.post(
+            f"{self.url}/embed",
+            json={"model": self.model_name, "texts": list(texts)},
+            timeout=EMBEDDING_SERVICE_TIMEOUT,
+        )
+        response.raise_for_status()
+        return [
+            np.asarray(v, dtype=np.float32) for v in response.json()["embeddings"]
+        ]
+
+
+# ============================
+# Process-wide Access
+# ============================
+
+_embedders: Dict[str, object] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(model_name: Optional[str] = None):
+    """
+    Returns the process-wide embedder for a model: the sidecar client when
+    ``EMBEDDING_SERVICE_URL`` is set, otherwise the in-process micro-batcher.
+
+    :param model_name: Defaults to ``EMBEDDING_MODEL``
+    :return: An object with ``embed(texts) -> List[np.ndarray]``
+    """
+    model_name = model_name or EMBEDDING_MODEL
+    with _embedders_lock:
+        embedder = _embedders.get(model_name)
+        if embedder is None:
+            if EMBEDDING_SERVICE_URL:
+                embedder = RemoteEmbedder(EMBEDDING_SERVICE_URL, model_name)
+            else:
+                embedder = MicroBatcher(model_name)
+            _embedders[model_name] = embedder
+    return embedder
+
+
+# ============================
+# Sidecar Server
+# ============================
+
+
+def make_handler(batcher: MicroBatcher):
+    class EmbeddingHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/health":
+                self.send_error(404)
+                return
+            self._send_json(
+                200,
+                {
+                    "model": batcher.model_name,
+                    "batches": batcher.batches,
+                    "texts": batcher.texts,
+                },
+            )
+
+        def do_POST(self):
+            if self.path != "/embed":
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if payload.get("model", batcher.model_name) != batcher.model_name:
+                self._send_json(
+                    400, {"error": f"this service embeds with {batcher.model_name}"}
+                )
+                return
+            vectors = batcher.embed(payload.get("texts", []))
+            self._send_json(200, {"embeddings": [v.tolist() for v in vectors]})
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return EmbeddingHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-host embedding sidecar")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    batcher = MicroBatcher(args.model)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(batcher))
+    logger.info(
+        f"[EMBEDDING SERVICE] {args.model} on http://{args.host}:{args.port} "
+        f"({EMBEDDING_THREADS} torch threads)"
+    )
+    try:
+        server.serve_forever()
+    finally:
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
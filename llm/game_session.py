@@ -0,0 +1,179 @@
+# llm/game_session.py
+"""
+Per-game chat sessions for the narration call.
+
+In ``messages`` storyline mode the DM sees its campaign as a conversation: the
+fixed system message and campaign context, every past turn as a user message
+and an assistant reply, then the new turn. A session only ever appends, so
+each call starts with the previous call's messages unchanged and the backend
+can resume from the state it already holds for them (Ollama keeps the KV
+cache of a slot's last prompt, OpenAI caches prompt prefixes) instead of
+re-reading the storyline as new input every turn.
+
+Once a session passes ``SESSION_MAX_TURNS`` its older half is dropped in one
+step, rather than one turn per call, which would change the prefix every
+turn. Dropped turns stay reachable through turn recall and the world state.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import List, Sequence, Tuple
+
+from colorama import Fore, Style
+from dotenv import load_dotenv
+
+from llm.prompts import Messages, continue_campaign_session_prompt
+from llm.turn_memory import MEMORY_TOP_K, format_storyline, recall_turns
+from services.cache import TTLCache
+
+load_dotenv()
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# "messages" sends past turns as chat messages; "text" is the flattened
+# storyline section used before sessions
+STORYLINE_MODE = os.getenv("STORYLINE_MODE", "messages")
+# Turns kept in a session before its older half is dropped
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "24"))
+
+SESSION_CACHE_SIZE = 512
+SESSION_CACHE_TTL = 60 * 60  # seconds
+
+# The database is the source of truth; an evicted session is rebuilt from the
+# saved turns, at the cost of one call without a reusable prefix
+_sessions = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+
+Turn = Tuple[int, str, str]
+
+
+# ============================
+# Sessions
+# ============================
+
+
+class GameSession:
+    """The window of turns one game's narration calls are built from."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Order of the last turn dropped from the window
+        self.start = 0
+        self.turns: List[Turn] = []
+
+    def append(self, order: int, user_input: str, gm_response: str) -> None:
+        with self._lock:
+            if self.turns and order <= self.turns[-1][0]:
+                return
+            self.turns.append((order, user_input, gm_response))
+            self._compact()
+
+    def replace(self, order: int, gm_response: str) -> None:
+        with self._lock:
+            for i, (turn_order, user_input, _) in enumerate(self.turns):
+                if turn_order == order:
+                    self.turns[i] = (order, user_input, gm_response)
+
+    def sync(self, conversation_pairs: Sequence) -> None:
+        """
+        Checks the window against the saved turns and rebuilds it if turns
+        were saved elsewhere (another worker, a restart) or changed.
+        """
+        saved = [
+            (pair.order, pair.user_input, pair.gm_response)
+            for pair in conversation_pairs
+            if pair.order > self.start
+        ]
+        with self._lock:
+            if saved != self.turns:
+                logger.info(
+                    f"{Fore.YELLOW}[SESSION] Rebuilding session window from "
+                    f"{len(saved)} saved turns\n{Style.RESET_ALL}"
+                )
+                self.turns = saved
+                self._compact()
+
+    def history(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return [(turn[1], turn[2]) for turn in self.turns]
+
+    def dropped(self, conversation_pairs: Sequence) -> List:
+        return [pair for pair in conversation_pairs if pair.order <= self.start]
+
+    def _compact(self) -> None:
+        if len(self.turns) > SESSION_MAX_TURNS:
+            self.turns = self.turns[-(SESSION_MAX_TURNS // 2) :]
+            self.start = self.turns[0][0] - 1
+
+
+def get_session(saved_game_id: int) -> GameSession:
+    session = _sessions.get(saved_game_id)
+    if session is None:
+        session = GameSession()
+        _sessions.set(saved_game_id, session)
+    return session
+
+
+def append_turn(
+    saved_game_id: int, order: int, user_input: str, gm_response: str
+) -> None:
+    """Adds a saved turn to the game's session, if it has one."""
+    session = _sessions.get(saved_game_id)
+    if session is not None:
+        session.append(order, user_input, gm_response)
+
+
+def replace_turn(saved_game_id: int, order: int, gm_response: str) -> None:
+    """Swaps in a refined response for a turn already in the game's session."""
+    session = _sessions.get(saved_game_id)
+    if session is not None:
+        session.replace(order, gm_response)
+
+
+def forget_session(saved_game_id: int) -> None:
+    """Drops the session of a game, e.g. after it is deleted."""
+    _sessions.pop(saved_game_id)
+
+
+async def session_prompt(
+    saved_game_id: int,
+    conversation_pairs: Sequence,
+    context: str,
+    user_input: str,
+    reference_material: str = "",
+    world_state: str = "",
+) -> Messages:
+    """
+    Builds the narration call of a game's next turn from its session, with
+    the turns relevant to the input recalled from before the window.
+    """
+    session = get_session(saved_game_id)
+    session.sync(conversation_pairs)
+    dropped = session.dropped(conversation_pairs)
+    recalled = ""
+    if dropped:
+        try:
+            selected = await asyncio.to_thread(
+                recall_turns, saved_game_id, dropped, user_input, MEMORY_TOP_K, 0
+            )
+            recalled = format_storyline(selected, len(dropped))
+        except Exception as e:
+            logger.error(f"{Fore.RED}[SESSION] Recall failed: {e}\n{Style.RESET_ALL}")
+    return continue_campaign_session_prompt(
+        context,
+        session.history(),
+        user_input,
+        reference_material,
+        world_state,
+        recalled,
+    )
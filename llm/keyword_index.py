@@ -0,0 +1,327 @@
+# llm/keyword_index.py
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ============================
+# Constants
+# ============================
+
+INDEX_SUFFIX = ".bm25"
+META_FILENAME = "meta.json"
+DOCS_FILENAME = "postings_docs.npy"
+TFS_FILENAME = "postings_tf.npy"
+LENGTHS_FILENAME = "doc_lengths.npy"
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal rank fusion constant from Cormack et al. (2009)
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Only the most frequent function words; rule names such as "Sleight of Hand"
+# keep their content words
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the this to was "
+    "with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[str]], k: int = RRF_K
+) -> List[Tuple[str, float]]:
+    """
+    Fuses ranked id lists: each id scores ``sum(1 / (k + rank))`` over the
+    lists it appears in (rank starting at 1).
+
+    :return: (id, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+# ============================
+# Inverted Index
+# ============================
+
+
+class KeywordIndex:
+    """
+    BM25 inverted index over ingested chunks.
+
+    Persisted postings are stored in CSR form: one ``uint32`` array of
+    document numbers and one ``uint16`` array of term frequencies, grouped by
+    term, plus per-document lengths. All three are memory-mapped, so a worker
+    only keeps the term dictionary resident.
+
+    Updates are incremental: added chunks go to an in-memory delta segment and
+    deleted chunks are tombstoned. Both are searchable immediately;
+    ``persist()`` merges the delta, drops tombstoned documents and atomically
+    replaces the files.
+    """
+
+    def __init__(self, path: str, collection_name: str):
+        self.dir = os.path.join(path, collection_name + INDEX_SUFFIX)
+        self._lock = threading.RLock()
+        self._load()
+
+    # Files
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.dir, META_FILENAME)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self._meta_path())
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        self._stamp = self._file_stamp()
+        self._doc_ids: List[str] = []
+        self._sources: List[str] = []
+        # term -> (offset, count) into the persisted postings arrays
+        self._terms: Dict[str, Tuple[int, int]] = {}
+        self._postings_docs = np.zeros(0, dtype=np.uint32)
+        self._postings_tfs = np.zeros(0, dtype=np.uint16)
+        base_lengths = np.zeros(0, dtype=np.uint32)
+        if self._stamp is not None:
+            with open(self._meta_path(), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._doc_ids = meta["doc_ids"]
+            self._sources = meta["sources"]
+            self._terms = {term: tuple(span) for term, span in meta["terms"].items()}
+            if self._doc_ids:
+                self._postings_docs = np.load(
+                    os.path.join(self.dir, DOCS_FILENAME), mmap_mode="r"
+                )
+                self._postings_tfs = np.load(
+                    os.path.join(self.dir, TFS_FILENAME), mmap_mode="r"
+                )
+                base_lengths = np.load(
+                    os.path.join(self.dir, LENGTHS_FILENAME), mmap_mode="r"
+                )
+        self._base_docs = len(self._doc_ids)
+        self._base_lengths = base_lengths
+        self._doc_of = {doc_id: n for n, doc_id in enumerate(self._doc_ids)}
+        # One byte per document, appendable in O(1); viewed as a bool array
+        self._live = bytearray(b"\x01" * self._base_docs)
+        self._live_count = self._base_docs
+        self._total_length = int(np.asarray(base_lengths, dtype=np.int64).sum())
+        # Delta segment: term -> [(doc number, tf)] for documents added since
+        # the last persist(); numbers continue after the persisted documents
+        self._delta: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._delta_lengths: List[int] = []
+        self._lengths_cache: Optional[np.ndarray] = None
+
+    def _dirty(self) -> bool:
+        return bool(self._delta_lengths) or self._live_count != len(self._doc_ids)
+
+    def _maybe_reload(self) -> None:
+        # Pick up a persist() from another process unless we hold local writes
+        if not self._dirty() and self._file_stamp() != self._stamp:
+            self._load()
+
+    # Writes
+
+    def add(self, doc_id: str, text: str, source: str = "") -> None:
+        """Indexes a chunk, replacing any previous version with the same id."""
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._maybe_reload()
+            if doc_id in self._doc_of:
+                self._tombstone(self._doc_of[doc_id])
+            n = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._sources.append(source)
+            self._doc_of[doc_id] = n
+            self._live.append(1)
+            self._live_count += 1
+            length = sum(counts.values())
+            self._delta_lengths.append(length)
+            self._total_length += length
+            self._lengths_cache = None
+            for term, tf in counts.items():
+                self._delta[term].append((n, min(tf, np.iinfo(np.uint16).max)))
+
+    def delete_source(self, source: str) -> int:
+        """
+        Tombstones every chunk of a source document.
+
+        :return: Number of chunks removed
+        """
+        with self._lock:
+            self._maybe_reload()
+            doomed = [
+                n
+                for n, doc_source in enumerate(self._sources)
+                if doc_source == source and self._live[n]
+            ]
+            for n in doomed:
+                self._tombstone(n)
+            return len(doomed)
+
+    def _tombstone(self, n: int) -> None:
+        self._live[n] = 0
+        self._live_count -= 1
+        self._total_length -= int(self._lengths()[n])
+        del self._doc_of[self._doc_ids[n]]
+
+    def persist(self) -> None:
+        with self._lock:
+            if not self._dirty():
+                return
+            live = np.flatnonzero(self._live_mask())
+            renumber = np.full(len(self._doc_ids), -1, dtype=np.int64)
+            renumber[live] = np.arange(len(live))
+
+            terms: Dict[str, Tuple[int, int]] = {}
+            docs_parts: List[np.ndarray] = []
+            tfs_parts: List[np.ndarray] = []
+            offset = 0
+            for term in sorted(set(self._terms) | set(self._delta)):
+                docs, tfs = self._postings(term)
+                new_docs = renumber[docs]
+                keep = new_docs >= 0
+                if not keep.any():
+                    continue
+                docs_parts.append(new_docs[keep].astype(np.uint32))
+                tfs_parts.append(tfs[keep].astype(np.uint16))
+                terms[term] = (offset, int(keep.sum()))
+                offset += terms[term][1]
+
+            os.makedirs(self.dir, exist_ok=True)
+            postings_docs = (
+                np.concatenate(docs_parts) if docs_parts else np.zeros(0, np.uint32)
+            )
+            postings_tfs = (
+                np.concatenate(tfs_parts) if tfs_parts else np.zeros(0, np.uint16)
+            )
+            self._save_array(DOCS_FILENAME, postings_docs)
+            self._save_array(TFS_FILENAME, postings_tfs)
+            self._save_array(LENGTHS_FILENAME, self._lengths()[live])
+            meta = {
+                "doc_ids": [self._doc_ids[n] for n in live],
+                "sources": [self._sources[n] for n in live],
+                "terms": terms,
+            }
+            # meta.json is replaced last; readers key reloads off it
+            tmp_path = self._meta_path() + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._meta_path())
+            self._load()
+
+    def _save_array(self, filename: str, array: np.ndarray) -> None:
+        tmp_path = os.path.join(self.dir, filename + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(self.dir, filename))
+
+    # Reads
+
+    def _live_mask(self) -> np.ndarray:
+        return np.frombuffer(self._live, dtype=bool)
+
+    def _lengths(self) -> np.ndarray:
+        if self._lengths_cache is None:
+            self._lengths_cache = np.concatenate(
+                [
+                    np.asarray(self._base_lengths, dtype=np.uint32),
+                    np.asarray(self._delta_lengths, dtype=np.uint32),
+                ]
+            )
+        return self._lengths_cache
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        parts_docs, parts_tfs = [], []
+        span = self._terms.get(term)
+        if span is not None:
+            offset, count = span
+            parts_docs.append(self._postings_docs[offset : offset + count])
+            parts_tfs.append(self._postings_tfs[offset : offset + count])
+        delta = self._delta.get(term)
+        if delta:
+            docs, tfs = zip(*delta)
+            parts_docs.append(np.asarray(docs, dtype=np.uint32))
+            parts_tfs.append(np.asarray(tfs, dtype=np.uint16))
+        if not parts_docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint16)
+        return (
+            np.concatenate(parts_docs).astype(np.int64),
+            np.concatenate(parts_tfs),
+        )
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """
+        Scores live chunks against the query with BM25.
+
+        :return: Up to ``top_k`` (chunk id, score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            self._maybe_reload()
+            n_docs = self._live_count
+            if not terms or n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            lengths = self._lengths()
+            live = self._live_mask()
+            scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+            for term in terms:
+                docs, tfs = self._postings(term)
+                keep = live[docs]
+                docs, tfs = docs[keep], tfs[keep].astype(np.float32)
+                if not len(docs):
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / avg_length)
+                scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+            matched = np.flatnonzero(scores)
+            if not len(matched):
+                return []
+            k = min(top_k, len(matched))
+            top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [(self._doc_ids[n], float(scores[n])) for n in top]
+
+    def count(self) -> int:
+        with self._lock:
+            self._maybe_reload()
+            return self._live_count
+
+
+# ============================
+# Factory
+# ============================
+
+_indexes: Dict[Tuple[str, str], KeywordIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_keyword_index(path: str, collection_name: str) -> KeywordIndex:
+    """Returns the per-process keyword index stored next to a vector store."""
+    key = (os.path.abspath(path), collection_name)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = KeywordIndex(path, collection_name)
+    return index
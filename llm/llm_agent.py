@@ -1,10 +1,13 @@
 # llm/llm_agent.py
 
+import asyncio
 import datetime
 import json
 import logging
 import random
+import os
 import re
+import time
 import traceback
 from typing import Any, Dict, List, Optional, Union
 
@@ -12,6 +15,7 @@ import urllib3
 from colorama import Fore, Style
 
 from llm.prompts import (
+    adapt_opening_prompt,
     continue_campaign_prompt,
     create_campaign_prompt,
     format_feedback_prompt,
@@ -22,6 +26,40 @@ from llm.prompts import (
     validate_player_action_prompt,
     validate_storyline_prompt,
 )
+from llm.llm_config import NARRATION, VALIDATION
+from llm.llm_metrics import agent_model, record_action_check, timed_reply
+from llm.game_session import (
+    STORYLINE_MODE,
+    append_turn,
+    replace_turn,
+    session_prompt,
+)
+from llm.opening_pool import (
+    OPENING_ADAPT,
+    OPENING_PROMPT,
+    adapt_opening,
+    placeholder_character,
+    register_opening_writer,
+    take_opening,
+)
+from llm.refinement import REFINEMENT_MODE, schedule_refinement
+from llm.speculation import (
+    begin_foreground,
+    claim_speculation,
+    end_foreground,
+    register_generator,
+    schedule_speculation,
+)
+from llm.retrieval import peek_context, remember_scene, retrieve_context
+from llm.turn_budget import (
+    OPTIONS_REVISION,
+    OPTIONS_VALIDATION,
+    STORYLINE_REVISION,
+    STORYLINE_VALIDATION,
+    TurnBudget,
+)
+from llm.turn_memory import recent_storyline, relevant_storyline, schedule_index_turn
+from llm.world_state import relevant_world_state, schedule_world_state_extraction
 from utils.utils import get_skill_modifier
 
 # SSL Warning Suppression
@@ -33,14 +71,22 @@ logger.setLevel(logging.DEBUG)
 
 # Constants
 MAX_RETRIES = 3
+# "parallel" drafts the DM response while the player's action is checked;
+# "serial" checks first
+ACTION_CHECK_MODE = os.getenv("ACTION_CHECK_MODE", "parallel")
 
 # Import ORM models and database utilities
+from sqlalchemy import func  # noqa: E402
 from sqlalchemy.orm import Session  # noqa: E402
 
+from db.database import SessionLocal  # noqa: E402
 from models.save_game_models import ConversationPair, SavedGame  # noqa: E402
+from services.character_snapshot import render_character_details  # noqa: E402
 
 DMAgent = "DMAgent"
 StorytellerAgent = "StorytellerAgent"
+ValidatorAgent = "ValidatorAgent"
+ClassifierAgent = "ClassifierAgent"
 
 
 # Helper Functions
@@ -85,8 +131,7 @@ async def send_feedback(
     agent, agent_name: str, expected_keys: List[str], previous_response: str
 ) -> Optional[Union[dict, str]]:
     logger.info(f"Previous Response: {previous_response}")
-    feedback_msg_content = format_feedback_prompt(expected_keys, previous_response)
-    feedback_msg = [{"content": feedback_msg_content, "role": "user"}]
+    feedback_msg = format_feedback_prompt(expected_keys, previous_response)
     logger.info(
         f"{Fore.GREEN}[SENDING FEEDBACK] Sending feedback to {agent_name}{Style.RESET_ALL}\n"
     )
@@ -99,9 +144,7 @@ async def send_feedback(
         return None
 
     try:
-        feedback_response = agent.generate_reply(messages=feedback_msg)
-        if hasattr(feedback_response, "__await__"):
-            feedback_response = await feedback_response
+        feedback_response = await timed_reply(agent, feedback_msg)
         logger.info(
             f"{Fore.GREEN}[FEEDBACK RESPONSE] Raw response from {agent_name}{Style.RESET_ALL}\n"
         )
@@ -138,9 +181,7 @@ async def get_agent_response(
             )
             logger.debug(f"{Fore.BLUE}{msg}{Style.RESET_ALL}\n")
 
-            response = agent.generate_reply(messages=msg)
-            if hasattr(response, "__await__"):
-                response = await response
+            response = await timed_reply(agent, msg)
             logger.info(
                 f"{Fore.GREEN}[RECEIVED] Raw response from {agent_name}{Style.RESET_ALL}\n"
             )
@@ -222,27 +263,13 @@ def build_conversation_context(
     user_preferences: Dict[str, str],
     current_character: Dict[str, Any],
 ) -> str:
-    # Define fields to exclude from the character details
-    excluded_fields = {
-        "id",
-        "experience_points",
-        "max_hit_points",
-        "current_hit_points",
-    }
-
     # Build preferences text
     preferences_text = "\n".join(
         [f"- {key}: {value}" for key, value in user_preferences.items()]
     )
 
-    # Filter out excluded fields and build core character details text
-    character_core_details = "\n".join(
-        [
-            f"- {key.capitalize()}: {value}"
-            for key, value in current_character.items()
-            if key.lower() not in excluded_fields
-        ]
-    )
+    # Core character details, memoized per character version
+    character_core_details = render_character_details(current_character)
 
     return f"""User Preferences:
     {preferences_text}
@@ -281,8 +308,7 @@ async def handle_storyline_feedback(
 # Helper function to generate initial DM response and handle feedback
 async def generate_initial_campaign_response(user_input, context, dm_agent):
     logger.info(f"{Fore.GREEN}[CREATING CAMPAIGN]\n{Style.RESET_ALL}")
-    dm_prompt_content = create_campaign_prompt(user_input, context)
-    dm_msg = [{"content": dm_prompt_content, "role": "user"}]
+    dm_msg = create_campaign_prompt(user_input, context)
     logger.debug(f"{Fore.BLUE}MSG: {dm_msg}\n{Style.RESET_ALL}")
     dm_response = await get_agent_response(dm_agent, DMAgent, dm_msg, ["response"])
     response = dm_response.get("response", "") if isinstance(dm_response, dict) else ""
@@ -290,13 +316,69 @@ async def generate_initial_campaign_response(user_input, context, dm_agent):
     return response
 
 
+# Helper function to write an opening for the pool of a preference combination
+async def write_opening(user_preferences, dm_agent, validator_agent):
+    context = build_conversation_context(user_preferences, placeholder_character())
+    dm_response_text = await generate_initial_campaign_response(
+        OPENING_PROMPT, context, dm_agent
+    )
+    if not dm_response_text.strip():
+        return ""
+    revised_text = (
+        await validate_and_revise_storyline(
+            context, "", dm_response_text, validator_agent, dm_agent
+        )
+        or dm_response_text
+    )
+    return (
+        await validate_and_revise_options(
+            context, revised_text, validator_agent, dm_agent
+        )
+        or revised_text
+    )
+
+
+# Helper function to open a new campaign from the opening pool
+async def pooled_opening_response(
+    db,
+    saved_game_id,
+    user_input,
+    user_preferences,
+    current_character,
+    context,
+    dm_agent,
+    validator_agent,
+):
+    opening = take_opening(db, agent_model(dm_agent), user_preferences, user_input)
+    if opening is None:
+        return None
+    dm_response_text = adapt_opening(opening, current_character)
+    if OPENING_ADAPT == "llm":
+        adapted = await get_agent_response(
+            validator_agent,
+            ValidatorAgent,
+            adapt_opening_prompt(context, dm_response_text),
+            ["response"],
+            1,
+        )
+        dm_response_text = (adapted or {}).get("response") or dm_response_text
+    save_conversation_pair(
+        db, saved_game_id, 1, user_input, dm_response_text, validator_agent
+    )
+    logger.info(
+        f"{Fore.GREEN}[RETURNING OPENING] {dm_response_text}\n{Style.RESET_ALL}"
+    )
+    return {"response": dm_response_text}
+
+
 # Helper function for continuing an existing campaign
-async def continue_campaign_response(user_input, context, storyline, dm_agent):
+async def continue_campaign_response(
+    user_input, context, storyline, dm_agent, reference_material="", world_state=""
+):
     logger.info(f"{Fore.GREEN}[CONTINUE CAMPAIGN RESPONSE]\n{Style.RESET_ALL}")
-    dm_continue_prompt_content = continue_campaign_prompt(
-        context, storyline, user_input
+    dm_continue_msg = continue_campaign_prompt(
+        context, storyline, user_input, reference_material, world_state
     )
-    dm_continue_msg = [{"content": dm_continue_prompt_content, "role": "user"}]
     logger.debug(f"{Fore.BLUE}MSG: {dm_continue_msg}\n{Style.RESET_ALL}")
     dm_response = await get_agent_response(
         dm_agent, DMAgent, dm_continue_msg, ["response"]
@@ -306,16 +388,92 @@ async def continue_campaign_response(user_input, context, storyline, dm_agent):
     return response
 
 
+# Helper function for continuing a campaign from the game's chat session
+async def continue_campaign_session_response(
+    user_input,
+    context,
+    saved_game_id,
+    conversation_pairs,
+    dm_agent,
+    reference_material="",
+    world_state="",
+):
+    logger.info(f"{Fore.GREEN}[CONTINUE CAMPAIGN SESSION RESPONSE]\n{Style.RESET_ALL}")
+    dm_continue_msg = await session_prompt(
+        saved_game_id,
+        conversation_pairs,
+        context,
+        user_input,
+        reference_material,
+        world_state,
+    )
+    logger.debug(f"{Fore.BLUE}MSG: {dm_continue_msg}\n{Style.RESET_ALL}")
+    dm_response = await get_agent_response(
+        dm_agent, DMAgent, dm_continue_msg, ["response"]
+    )
+    response = dm_response.get("response", "") if isinstance(dm_response, dict) else ""
+    logger.debug(f"{Fore.BLUE}Response: {response}\n{Style.RESET_ALL}")
+    return response
+
+
+# Helper function for the DM's draft in the configured storyline mode
+async def draft_response(
+    user_input,
+    context,
+    saved_game_id,
+    conversation_pairs,
+    storyline,
+    dm_agent,
+    reference_material="",
+    world_state="",
+):
+    if STORYLINE_MODE == "messages":
+        return await continue_campaign_session_response(
+            user_input,
+            context,
+            saved_game_id,
+            conversation_pairs,
+            dm_agent,
+            reference_material,
+            world_state,
+        )
+    return await continue_campaign_response(
+        user_input, context, storyline, dm_agent, reference_material, world_state
+    )
+
+
+async def timed(awaitable):
+    """Awaits and returns (result, seconds taken)."""
+    start = time.perf_counter()
+    result = await awaitable
+    return result, time.perf_counter() - start
+
+
 # Helper function to validate and revise storyline
 async def validate_and_revise_storyline(
-    context, storyline, dm_response_text, storyteller_agent, dm_agent
+    context,
+    storyline,
+    dm_response_text,
+    storyteller_agent,
+    dm_agent,
+    reference_material="",
+    world_state="",
+    budget: Optional[TurnBudget] = None,
 ):
     logger.info(f"{Fore.GREEN}[VALIDATE AND REVISE STORYLINE]\n{Style.RESET_ALL}")
-    prompt_content = validate_storyline_prompt(context, storyline, dm_response_text)
-    msg = [{"content": prompt_content, "role": "user"}]
+    budget = budget or TurnBudget(0)
+    if not budget.allows(STORYLINE_VALIDATION, VALIDATION):
+        return dm_response_text
+    msg = validate_storyline_prompt(
+        context, storyline, dm_response_text, reference_material, world_state
+    )
     logger.debug(f"{Fore.BLUE}MSG: {msg}\n{Style.RESET_ALL}")
     feedback_response = await get_agent_response(
-        storyteller_agent, StorytellerAgent, msg, ["feedback"]
+        storyteller_agent,
+        StorytellerAgent,
+        msg,
+        ["feedback"],
+        budget.retries(STORYLINE_VALIDATION, VALIDATION, MAX_RETRIES),
     )
     logger.debug(
         f"{Fore.BLUE}Feedback Response: {feedback_response}\n{Style.RESET_ALL}"
@@ -326,15 +484,18 @@ async def validate_and_revise_storyline(
         else ""
     )
 
-    if feedback:
+    if feedback and budget.allows(STORYLINE_REVISION, NARRATION):
         logger.info(f"{Fore.GREEN}[REVISING STORYLINE]\n{Style.RESET_ALL}")
-        revise_prompt_content = revise_storyline_prompt(
+        revise_msg = revise_storyline_prompt(
             context, storyline, dm_response_text, feedback
         )
-        revise_msg = [{"content": revise_prompt_content, "role": "user"}]
         logger.debug(f"{Fore.BLUE}MSG: {revise_msg}\n{Style.RESET_ALL}")
         revised_response = await get_agent_response(
-            dm_agent, DMAgent, revise_msg, ["response"]
+            dm_agent,
+            DMAgent,
+            revise_msg,
+            ["response"],
+            budget.retries(STORYLINE_REVISION, NARRATION, MAX_RETRIES),
         )
         logger.debug(
             f"{Fore.BLUE}Revised Response: {revised_response}\n{Style.RESET_ALL}"
@@ -353,17 +514,28 @@ async def validate_and_revise_storyline(
 
 # Helper function to validate and revise options
 async def validate_and_revise_options(
-    context, dm_response_text, storyteller_agent, dm_agent
+    context,
+    dm_response_text,
+    storyteller_agent,
+    dm_agent,
+    reference_material="",
+    budget: Optional[TurnBudget] = None,
 ):
     logger.info(f"{Fore.GREEN}[VALIDATE AND REVISE OPTIONS]\n{Style.RESET_ALL}")
-    options_prompt_content = validate_options_prompt(context, dm_response_text)
-    options_msg = [{"content": options_prompt_content, "role": "user"}]
+    budget = budget or TurnBudget(0)
+    if not budget.allows(OPTIONS_VALIDATION, VALIDATION):
+        return dm_response_text
+    options_msg = validate_options_prompt(context, dm_response_text, reference_material)
     logger.debug(f"{Fore.BLUE}MSG: {options_msg}\n{Style.RESET_ALL}")
     logger.debug(
         f"{Fore.YELLOW}DM Response Text: {dm_response_text}\n{Style.RESET_ALL}"
     )
     options_feedback_response = await get_agent_response(
-        storyteller_agent, StorytellerAgent, options_msg, ["feedback"]
+        storyteller_agent,
+        StorytellerAgent,
+        options_msg,
+        ["feedback"],
+        budget.retries(OPTIONS_VALIDATION, VALIDATION, MAX_RETRIES),
     )
     logger.debug(f"{Fore.BLUE}Response: {options_feedback_response}\n{Style.RESET_ALL}")
     options_feedback = (
@@ -372,17 +544,18 @@ async def validate_and_revise_options(
         else ""
     )
 
-    if options_feedback:
+    if options_feedback and budget.allows(OPTIONS_REVISION, NARRATION):
         logger.info(f"{Fore.GREEN}[REVISING OPTIONS]\n{Style.RESET_ALL}")
-        revise_options_prompt_content = revise_options_prompt(
+        revise_options_msg = revise_options_prompt(
             context, dm_response_text, options_feedback
         )
-        revise_options_msg = [
-            {"content": revise_options_prompt_content, "role": "user"}
-        ]
         logger.debug(f"{Fore.BLUE}MSG: {revise_options_msg}\n{Style.RESET_ALL}")
         revised_options_response = await get_agent_response(
-            dm_agent, DMAgent, revise_options_msg, ["response"]
+            dm_agent,
+            DMAgent,
+            revise_options_msg,
+            ["response"],
+            budget.retries(OPTIONS_REVISION, NARRATION, MAX_RETRIES),
         )
         logger.debug(
             f"{Fore.BLUE}Response: {revised_options_response}\n{Style.RESET_ALL}"
@@ -399,7 +572,15 @@ async def validate_and_revise_options(
 
 
 # Helper function to save conversation pair to database
-def save_conversation_pair(db, saved_game_id, order, user_input, gm_response_text):
+def save_conversation_pair(
+    db,
+    saved_game_id,
+    order,
+    user_input,
+    gm_response_text,
+    extraction_agent=None,
+    revision_pending=False,
+):
     logger.info(f"{Fore.GREEN}[SAVING CONVERSATION TO DB]\n{Style.RESET_ALL}")
     logger.debug(f"{Fore.BLUE}User: {user_input}\n")
     logger.debug(f"GM Response: {gm_response_text}\n{Style.RESET_ALL}")
@@ -409,19 +590,163 @@ def save_conversation_pair(db, saved_game_id, order, user_input, gm_response_tex
         user_input=user_input,
         gm_response=gm_response_text,
         timestamp=datetime.datetime.now(datetime.UTC),
+        revision_pending=revision_pending,
     )
     db.add(new_conversation_pair)
     db.commit()
+    # The new response is the scene the next turn's retrieval is scoped to
+    remember_scene(saved_game_id, gm_response_text)
+    append_turn(saved_game_id, order, user_input, gm_response_text)
+    schedule_speculation(saved_game_id, order, gm_response_text)
+    schedule_index_turn(saved_game_id, order, user_input, gm_response_text)
+    schedule_world_state_extraction(
+        extraction_agent, saved_game_id, order, user_input, gm_response_text
+    )
 
 
-def get_storyline(db, saved_game_id):
-    logger.info(f"{Fore.GREEN}[GETTING STORYLINE FROM DB]\n{Style.RESET_ALL}")
-    conversation_pairs = (
+# Helper function to replace a saved response with its refined version
+def update_conversation_pair(saved_game_id, order, gm_response_text):
+    """
+    Saves the refined response and clears the turn's pending revision. Once
+    the player has played a later turn, answered from the draft, the draft
+    is kept.
+
+    :return: Whether the refined response replaced the draft
+    """
+    logger.info(f"{Fore.GREEN}[UPDATING CONVERSATION IN DB]\n{Style.RESET_ALL}")
+    # Runs after the request, so it cannot use the request's session
+    with SessionLocal() as db:
+        pair = (
+            db.query(ConversationPair)
+            .filter_by(game_id=saved_game_id, order=order)
+            .first()
+        )
+        if pair is None:
+            return False
+        latest = (
+            db.query(func.max(ConversationPair.order))
+            .filter_by(game_id=saved_game_id)
+            .scalar()
+        )
+        pair.revision_pending = False
+        if latest != order:
+            db.commit()
+            logger.info(
+                f"{Fore.YELLOW}[KEEPING DRAFT] Turn {order} of game "
+                f"{saved_game_id} was already answered\n{Style.RESET_ALL}"
+            )
+            return False
+        pair.gm_response = gm_response_text
+        db.commit()
+    remember_scene(saved_game_id, gm_response_text)
+    replace_turn(saved_game_id, order, gm_response_text)
+    return True
+
+
+# Helper function to send the draft now and validate it in the background
+def respond_progressively(
+    db,
+    saved_game_id,
+    order,
+    user_input,
+    dm_response_text,
+    context,
+    storyline,
+    validator_agent,
+    dm_agent,
+    reference_material="",
+    world_state="",
+):
+    # World state is extracted from the final text, once refinement is done
+    save_conversation_pair(
+        db, saved_game_id, order, user_input, dm_response_text, revision_pending=True
+    )
+
+    async def refine():
+        # Holds off speculation on the draft's options until the text is final
+        begin_foreground()
+        try:
+            return await refine_draft()
+        except Exception:
+            # Other workers would otherwise report the turn pending for good
+            await asyncio.to_thread(
+                update_conversation_pair, saved_game_id, order, dm_response_text
+            )
+            raise
+        finally:
+            end_foreground()
+
+    async def refine_draft():
+        revised_text = (
+            await validate_and_revise_storyline(
+                context,
+                storyline,
+                dm_response_text,
+                validator_agent,
+                dm_agent,
+                reference_material,
+                world_state,
+            )
+            or dm_response_text
+        )
+        final_text = (
+            await validate_and_revise_options(
+                context, revised_text, validator_agent, dm_agent, reference_material
+            )
+            or revised_text
+        )
+        # Also clears the pending revision when the draft stands
+        replaced = await asyncio.to_thread(
+            update_conversation_pair, saved_game_id, order, final_text
+        )
+        if not replaced:
+            final_text = dm_response_text
+        elif final_text != dm_response_text:
+            schedule_speculation(saved_game_id, order, final_text)
+        schedule_world_state_extraction(
+            validator_agent, saved_game_id, order, user_input, final_text
+        )
+        return final_text
+
+    schedule_refinement(saved_game_id, order, dm_response_text, refine)
+    logger.info(
+        f"{Fore.GREEN}[RETURNING DRAFT] {dm_response_text}\n{Style.RESET_ALL}"
+    )
+    return {"response": dm_response_text, "turn": order, "revision_pending": True}
+
+
+# Helper function to draft the DM's response from the game's saved state
+async def draft_continuation(saved_game_id, user_input, context, dm_agent):
+    # Runs outside any request, so it opens its own database session
+    with SessionLocal() as db:
+        (storyline, world_state, conversation_pairs), retrieval = await asyncio.gather(
+            load_turn_context(db, saved_game_id, user_input),
+            retrieve_context(saved_game_id, user_input),
+        )
+    return await draft_response(
+        user_input,
+        context,
+        saved_game_id,
+        conversation_pairs,
+        storyline,
+        dm_agent,
+        retrieval.to_prompt(),
+        world_state,
+    )
+
+
+def get_conversation_pairs(db, saved_game_id):
+    return (
         db.query(ConversationPair)
         .filter_by(game_id=saved_game_id)
         .order_by(ConversationPair.order)
         .all()
     )
+
+
+def get_storyline(db, saved_game_id):
+    logger.info(f"{Fore.GREEN}[GETTING STORYLINE FROM DB]\n{Style.RESET_ALL}")
+    conversation_pairs = get_conversation_pairs(db, saved_game_id)
     storyline = "\n".join(
         [
             f"User: {pair.user_input}\nGM: {pair.gm_response}"
@@ -432,16 +757,39 @@ def get_storyline(db, saved_game_id):
     return storyline, conversation_pairs
 
 
+async def load_turn_context(db, saved_game_id, user_input):
+    # Long campaigns keep their recall without sending every turn: only the
+    # turns relevant to this input, the latest ones and the known facts about
+    # the current scene go into the prompts
+    logger.info(f"{Fore.GREEN}[GETTING STORYLINE FROM DB]\n{Style.RESET_ALL}")
+    conversation_pairs = await asyncio.to_thread(
+        get_conversation_pairs, db, saved_game_id
+    )
+    scene = conversation_pairs[-1].gm_response if conversation_pairs else ""
+    storyline, world_state = await asyncio.gather(
+        relevant_storyline(saved_game_id, conversation_pairs, user_input),
+        asyncio.to_thread(
+            relevant_world_state, saved_game_id, f"{scene}\n{user_input}"
+        ),
+    )
+    logger.debug(f"{Fore.BLUE}Storyline: \n{storyline}\n{Style.RESET_ALL}")
+    logger.debug(f"{Fore.BLUE}World State: \n{world_state}\n{Style.RESET_ALL}")
+    return storyline, world_state, conversation_pairs
+
+
 async def handle_invalid_action(
-    context, storyline, user_input, storyteller_agent, dm_agent
+    context,
+    storyline,
+    user_input,
+    storyteller_agent,
+    dm_agent,
+    reference_material="",
+    world_state="",
 ):
     logger.info(f"{Fore.GREEN}[CHECKING FOR INVALID ACTION]\n{Style.RESET_ALL}")
-    action_validation_prompt_content = validate_player_action_prompt(
-        context, storyline, user_input
+    action_validation_msg = validate_player_action_prompt(
+        context, storyline, user_input, reference_material, world_state
     )
-    action_validation_msg = [
-        {"content": action_validation_prompt_content, "role": "user"}
-    ]
     logger.debug(f"{Fore.BLUE}MSG: {action_validation_msg}\n{Style.RESET_ALL}")
     action_feedback_response = await get_agent_response(
         storyteller_agent, StorytellerAgent, action_validation_msg, ["feedback"]
@@ -455,12 +803,9 @@ async def handle_invalid_action(
 
     if action_feedback:
         logger.info(f"{Fore.GREEN}[SENDING ACTION FEEDBACK]\n{Style.RESET_ALL}")
-        inform_feedback_prompt_content = inform_invalid_action_prompt(
+        inform_feedback_msg = inform_invalid_action_prompt(
             context, storyline, user_input
         )
-        inform_feedback_msg = [
-            {"content": inform_feedback_prompt_content, "role": "user"}
-        ]
         logger.debug(f"{Fore.BLUE}MSG: {inform_feedback_msg}\n{Style.RESET_ALL}")
         inform_feedback_response = await get_agent_response(
             dm_agent, DMAgent, inform_feedback_msg, ["response"]
@@ -489,6 +834,9 @@ async def generate_gm_response(
     saved_game_id: int,
     db: Session,
 ) -> Dict[str, str]:
+    # Started before any work so the budget covers the whole turn
+    budget = TurnBudget()
+    begin_foreground()
     try:
         logger.info(f"{Fore.GREEN}[GENERATING GM RESPONSE]\n{Style.RESET_ALL}")
 
@@ -501,8 +849,18 @@ async def generate_gm_response(
                 "response": "Error: Unable to find the saved game session. Please click 'start a new game'."
             }
 
-        # Retrieve storyline and context
-        storyline, conversation_pairs = get_storyline(db, saved_game_id)
+        # Load the storyline while rulebook retrieval runs under its latency
+        # budget; both block on I/O, so both run off the event loop
+        (storyline, world_state, conversation_pairs), retrieval = await asyncio.gather(
+            load_turn_context(db, saved_game_id, user_input),
+            retrieve_context(saved_game_id, user_input),
+        )
+        reference_material = retrieval.to_prompt()
+        # With the established facts at hand, the storyline validator only
+        # needs the latest turns rather than the recalled history
+        validation_storyline = (
+            recent_storyline(conversation_pairs) if world_state else storyline
+        )
         context = build_conversation_context(user_preferences, current_character)
         is_new_campaign = len(conversation_pairs) == 0
 
@@ -512,8 +870,36 @@ async def generate_gm_response(
             return {
                 "response": "Error: Missing agents for campaign response generation."
             }
+        # Judgment calls go to the small validation and classification models;
+        # agents built from a single configuration share the storyteller's
+        validator_agent = agents.get(ValidatorAgent) or storyteller_agent
+        classifier_agent = agents.get(ClassifierAgent) or storyteller_agent
+        # The options this turn offers are drafted ahead with the same agents
+        register_generator(
+            saved_game_id,
+            lambda option: draft_continuation(saved_game_id, option, context, dm_agent),
+        )
+        # New games with a generic first input are opened from a pool the
+        # selected model fills while idle
+        register_opening_writer(
+            agent_model(dm_agent),
+            lambda preferences: write_opening(preferences, dm_agent, validator_agent),
+        )
 
         if is_new_campaign:
+            pooled_response = await pooled_opening_response(
+                db,
+                saved_game_id,
+                user_input,
+                user_preferences,
+                current_character,
+                context,
+                dm_agent,
+                validator_agent,
+            )
+            if pooled_response is not None:
+                return pooled_response
+
             # Initial campaign response generation
             dm_response_text = await generate_initial_campaign_response(
                 user_input, context, dm_agent
@@ -526,9 +912,37 @@ async def generate_gm_response(
                 logger.error(error_message)
                 return {"response": error_message}
 
+            # Retrieval that missed its budget may have finished by now
+            reference_material = (
+                reference_material
+                or peek_context(saved_game_id, user_input).to_prompt()
+            )
+
+            if REFINEMENT_MODE == "progressive":
+                return respond_progressively(
+                    db,
+                    saved_game_id,
+                    1,
+                    user_input,
+                    dm_response_text,
+                    context,
+                    validation_storyline,
+                    validator_agent,
+                    dm_agent,
+                    reference_material,
+                    world_state,
+                )
+
             # Validation and revision of the storyline
             dm_response_revised_text = await validate_and_revise_storyline(
-                context, storyline, dm_response_text, storyteller_agent, dm_agent
+                context,
+                validation_storyline,
+                dm_response_text,
+                validator_agent,
+                dm_agent,
+                reference_material,
+                world_state,
+                budget,
             )
             logger.debug(
                 f"{Fore.BLUE}Revised Campaign Response: {dm_response_revised_text}\n{Style.RESET_ALL}"
@@ -538,7 +952,12 @@ async def generate_gm_response(
                 logger.error(error_message)
                 # Saving conversation and returning final response
                 save_conversation_pair(
-                    db, saved_game_id, 1, user_input, dm_response_text
+                    db,
+                    saved_game_id,
+                    1,
+                    user_input,
+                    dm_response_text,
+                    validator_agent,
                 )
                 logger.info(
                     f"{Fore.GREEN}[RETURNING] {dm_response_text}\n{Style.RESET_ALL}"
@@ -547,7 +966,12 @@ async def generate_gm_response(
 
             # Validation and revision of options
             dm_response_revised_options_text = await validate_and_revise_options(
-                context, dm_response_revised_text, storyteller_agent, dm_agent
+                context,
+                dm_response_revised_text,
+                validator_agent,
+                dm_agent,
+                reference_material,
+                budget,
             )
             logger.debug(
                 f"{Fore.BLUE}Revised Options Response: {dm_response_revised_options_text}\n{Style.RESET_ALL}"
@@ -557,7 +981,12 @@ async def generate_gm_response(
                 logger.error(error_message)
                 # Saving conversation and returning final response
                 save_conversation_pair(
-                    db, saved_game_id, 1, user_input, dm_response_revised_text
+                    db,
+                    saved_game_id,
+                    1,
+                    user_input,
+                    dm_response_revised_text,
+                    validator_agent,
                 )
                 logger.info(
                     f"{Fore.GREEN}[RETURNING] {dm_response_revised_text}\n{Style.RESET_ALL}"
@@ -566,7 +995,12 @@ async def generate_gm_response(
 
             # Saving conversation and returning final response
             save_conversation_pair(
-                db, saved_game_id, 1, user_input, dm_response_revised_options_text
+                db,
+                saved_game_id,
+                1,
+                user_input,
+                dm_response_revised_options_text,
+                validator_agent,
             )
             logger.info(
                 f"{Fore.GREEN}[RETURNING] {dm_response_revised_options_text}\n{Style.RESET_ALL}"
@@ -574,12 +1008,55 @@ async def generate_gm_response(
             return {"response": dm_response_revised_options_text}
 
         else:
-            # Validate action and handle invalid actions if necessary
-            # logger.debug("INVALIDACTION!!!!!!")
-            invalid_action_response = await handle_invalid_action(
-                context, storyline, user_input, storyteller_agent, dm_agent
+            # A draft prepared while the player was reading the options
+            speculated_text = await claim_speculation(
+                saved_game_id, len(conversation_pairs), user_input
             )
+
+            # Most actions are valid, so the DM drafts while the action is
+            # checked; the draft is dropped if the check fails
+            draft_task = None
+            if not speculated_text and ACTION_CHECK_MODE == "parallel":
+                draft_task = asyncio.create_task(
+                    timed(
+                        draft_response(
+                            user_input,
+                            context,
+                            saved_game_id,
+                            conversation_pairs,
+                            storyline,
+                            dm_agent,
+                            reference_material,
+                            world_state,
+                        )
+                    )
+                )
+
+            # Validate action and handle invalid actions if necessary; an
+            # offered option already passed options validation
+            # logger.debug("INVALIDACTION!!!!!!")
+            invalid_action_response = None
+            if not speculated_text:
+                try:
+                    invalid_action_response, check_s = await timed(
+                        handle_invalid_action(
+                            context,
+                            storyline,
+                            user_input,
+                            validator_agent,
+                            dm_agent,
+                            reference_material,
+                            world_state,
+                        )
+                    )
+                except BaseException:
+                    if draft_task is not None:
+                        draft_task.cancel()
+                    raise
             # logger.debug("ISSUE!!!!!!")
+            if invalid_action_response and draft_task is not None:
+                draft_task.cancel()
+                record_action_check(wasted=True)
             if invalid_action_response:
                 logger.info(
                     f"{Fore.GREEN}[INVALID RESPONSE] {invalid_action_response}\n{Style.RESET_ALL}"
@@ -587,7 +1064,7 @@ async def generate_gm_response(
                 # logger.debug("INVALIDACTIONREPONSE!!!!!")
                 # New code to call LLM-based skill suggestion function
                 skill_suggestion = await get_llm_skill_check_suggestion(
-                    user_input, context, storyteller_agent
+                    user_input, context, classifier_agent
                 )
 
                 # logger.info(f"{current_character}")
@@ -615,7 +1092,12 @@ async def generate_gm_response(
                     )
                     new_order = len(conversation_pairs) + 1
                     save_conversation_pair(
-                        db, saved_game_id, new_order, user_input, response_text
+                        db,
+                        saved_game_id,
+                        new_order,
+                        user_input,
+                        response_text,
+                        validator_agent,
                     )
                     return {"response": response_text}
                 else:
@@ -626,9 +1108,22 @@ async def generate_gm_response(
                     return {"response": invalid_action_response}
 
             # Continue the campaign response
-            dm_response_text = await continue_campaign_response(
-                user_input, context, storyline, dm_agent
-            )
+            if speculated_text:
+                dm_response_text = speculated_text
+            elif draft_task is not None:
+                dm_response_text, draft_s = await draft_task
+                record_action_check(wasted=False, saved_s=min(check_s, draft_s))
+            else:
+                dm_response_text = await draft_response(
+                    user_input,
+                    context,
+                    saved_game_id,
+                    conversation_pairs,
+                    storyline,
+                    dm_agent,
+                    reference_material,
+                    world_state,
+                )
 
             logger.debug(
                 f"{Fore.BLUE}Continue Campaign Initial Response: {dm_response_text}\n{Style.RESET_ALL}"
@@ -639,9 +1134,37 @@ async def generate_gm_response(
                 logger.error(error_message)
                 return {"response": error_message}
 
+            # Retrieval that missed its budget may have finished by now
+            reference_material = (
+                reference_material
+                or peek_context(saved_game_id, user_input).to_prompt()
+            )
+
+            if REFINEMENT_MODE == "progressive":
+                return respond_progressively(
+                    db,
+                    saved_game_id,
+                    len(conversation_pairs) + 1,
+                    user_input,
+                    dm_response_text,
+                    context,
+                    validation_storyline,
+                    validator_agent,
+                    dm_agent,
+                    reference_material,
+                    world_state,
+                )
+
             # Validation and revision of the storyline
             dm_response_revised_text = await validate_and_revise_storyline(
-                context, storyline, dm_response_text, storyteller_agent, dm_agent
+                context,
+                validation_storyline,
+                dm_response_text,
+                validator_agent,
+                dm_agent,
+                reference_material,
+                world_state,
+                budget,
             )
             logger.debug(
                 f"{Fore.BLUE}Revised Response: {dm_response_revised_text}\n{Style.RESET_ALL}"
@@ -652,7 +1175,12 @@ async def generate_gm_response(
                 # Save conversation and return final response
                 new_order = len(conversation_pairs) + 1
                 save_conversation_pair(
-                    db, saved_game_id, new_order, user_input, dm_response_text
+                    db,
+                    saved_game_id,
+                    new_order,
+                    user_input,
+                    dm_response_text,
+                    validator_agent,
                 )
                 logger.info(
                     f"{Fore.GREEN}[RETURNING] {dm_response_text}\n{Style.RESET_ALL}"
@@ -661,7 +1189,12 @@ async def generate_gm_response(
 
             # Validation and revision of options
             dm_response_revised_options_text = await validate_and_revise_options(
-                context, dm_response_revised_text, storyteller_agent, dm_agent
+                context,
+                dm_response_revised_text,
+                validator_agent,
+                dm_agent,
+                reference_material,
+                budget,
             )
             logger.debug(
                 f"{Fore.BLUE}Revised Options Response: {dm_response_revised_options_text}\n{Style.RESET_ALL}"
@@ -673,7 +1206,12 @@ async def generate_gm_response(
                 # Save conversation and return final response
                 new_order = len(conversation_pairs) + 1
                 save_conversation_pair(
-                    db, saved_game_id, new_order, user_input, dm_response_revised_text
+                    db,
+                    saved_game_id,
+                    new_order,
+                    user_input,
+                    dm_response_revised_text,
+                    validator_agent,
                 )
                 logger.info(
                     f"{Fore.GREEN}[RETURNING] {dm_response_revised_text}\n{Style.RESET_ALL}"
@@ -688,6 +1226,7 @@ async def generate_gm_response(
                 new_order,
                 user_input,
                 dm_response_revised_options_text,
+                validator_agent,
             )
             logger.info(
                 f"{Fore.GREEN}[RETURNING] {dm_response_revised_options_text}\n{Style.RESET_ALL}"
@@ -698,6 +1237,9 @@ async def generate_gm_response(
         logger.error(f"{Fore.RED}[ERROR GENERATING GM RESPONSE] {e}\n{Style.RESET_ALL}")
         logger.error(traceback.format_exc())
         return {"response": "Error generating GM response."}
+    finally:
+        budget.finish()
+        end_foreground()
 
 
 async def get_llm_skill_check_suggestion(
@@ -731,7 +1273,7 @@ async def get_llm_skill_check_suggestion(
 
     try:
         # Request response from agent
-        response = agent.generate_reply(messages=messages)
+        response = await timed_reply(agent, messages)
 
         # Log to confirm type of response
         logger.info(f"[LLM RESPONSE] Full response from agent: {response}")
@@ -806,7 +1348,7 @@ async def generate_roll_feedback(
     ]
 
     logger.debug("attempting to generate response to invalid action roll")
-    response = storyteller_agent.generate_reply(messages=prompt)
+    response = await timed_reply(storyteller_agent, prompt)
 
     if isinstance(response, str):
         feedback = response.strip()
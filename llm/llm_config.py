@@ -3,28 +3,97 @@
 import os
 from typing import Dict, Any
 
+# ============================
+# Model Tiers
+# ============================
 
-def get_llm_config(provider: str, model: str) -> Dict[str, Any]:
+# Narration writes what the player reads; validation judges drafts, actions
+# and extracts world state; classification picks one label (skill checks)
+NARRATION = "narration"
+VALIDATION = "validation"
+CLASSIFICATION = "classification"
+TIERS = (NARRATION, VALIDATION, CLASSIFICATION)
+
+# Judgment calls want the same answer every time, not creative variety
+TIER_SAMPLING = {
+    NARRATION: {
+        "temperature": 1.2,
+        "top_p": 0.9,
+        "max_tokens": 2048,
+        "frequency_penalty": 0.2,
+        "presence_penalty": 0.2,
+    },
+    VALIDATION: {"temperature": 0.2, "top_p": 0.9, "max_tokens": 1024},
+    CLASSIFICATION: {"temperature": 0.0, "top_p": 1.0, "max_tokens": 64},
+}
+
+# Backend each provider's calls are sent to
+PROVIDER_BASE_URLS = {
+    "ollama": "http://localhost:11434/v1",
+    "openai": "https://api.openai.com/v1",
+}
+
+# Tier each agent's calls are routed to, by agent name
+AGENT_TIERS = {
+    "DMAgent": NARRATION,
+    "StorytellerAgent": NARRATION,
+    "ValidatorAgent": VALIDATION,
+    "ClassifierAgent": CLASSIFICATION,
+}
+
+
+def tier_model(provider: str, model: str, tier: str) -> str:
+    """
+    Resolves the model serving a tier. Narration uses the model the player
+    selected; the other tiers use <PROVIDER>_<TIER>_MODEL (e.g.
+    OLLAMA_VALIDATION_MODEL) if set, so a smaller model is only called once
+    it is known to be installed, and the selected model otherwise.
+
+    :param provider: The LLM provider ('openai', 'ollama', etc.)
+    :param model: The model selected for narration
+    :param tier: One of ``TIERS``
+    :return: Model name for the tier
+    """
+    if tier == NARRATION:
+        return model
+    override = os.getenv(f"{provider.upper()}_{tier.upper()}_MODEL")
+    return override or model
+
+
+def config_provider(config: Dict[str, Any]) -> str:
+    """
+    :param config: One entry of an LLM configuration's ``config_list``
+    :return: The provider whose backend the entry calls, or its base URL
+    """
+    base_url = config.get("base_url", "")
+    for provider, provider_url in PROVIDER_BASE_URLS.items():
+        if base_url == provider_url:
+            return provider
+    return base_url or "unknown"
+
+
+def get_llm_config(
+    provider: str, model: str, tier: str = NARRATION
+) -> Dict[str, Any]:
     """
     Retrieves the LLM configuration based on the provider.
 
     :param provider: The LLM provider ('openai', 'ollama', etc.)
+    :param model: The model to configure
+    :param tier: The tier whose sampling parameters to use
     :return: Configuration dictionary for the specified LLM provider
     """
+    sampling = dict(TIER_SAMPLING[tier])
     if provider == "ollama":
         config = {
             "config_list": [
                 {
                     "model": model,
-                    "base_url": "http://localhost:11434/v1",
+                    "base_url": PROVIDER_BASE_URLS["ollama"],
                     "api_key": "ollama",
                     "price": [0, 0],
-                    "max_tokens": 2048,
-                    "temperature": 1.2,
-                    "top_p": 0.9,
                     "n": 1,
-                    "frequency_penalty": 0.2,
-                    "presence_penalty": 0.2,
+                    **sampling,
                 }
             ],
             "timeout": 1000,
@@ -36,17 +105,18 @@ def get_llm_config(provider: str, model: str) -> Dict[str, Any]:
         if not api_key:
             raise EnvironmentError("OPENAI_API_KEY not set in environment variables.")
 
+        # The penalties were only ever tuned for Ollama
+        sampling.pop("frequency_penalty", None)
+        sampling.pop("presence_penalty", None)
         config = {
             "config_list": [
                 {
                     "model": model,
                     "api_key": api_key,
                     "api_type": "openai",
-                    "base_url": "https://api.openai.com/v1",
+                    "base_url": PROVIDER_BASE_URLS["openai"],
                     "n": 1,
-                    "max_tokens": 2048,
-                    "temperature": 1.2,
-                    "top_p": 0.9,
+                    **sampling,
                 }
             ],
             "timeout": 1000,
@@ -55,3 +125,17 @@ def get_llm_config(provider: str, model: str) -> Dict[str, Any]:
 
     else:
         raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def get_tier_configs(provider: str, model: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Retrieves one LLM configuration per tier.
+
+    :param provider: The LLM provider ('openai', 'ollama', etc.)
+    :param model: The model selected for narration
+    :return: Configuration dictionaries keyed by tier
+    """
+    return {
+        tier: get_llm_config(provider, tier_model(provider, model, tier), tier)
+        for tier in TIERS
+    }
@@ -0,0 +1,240 @@
+# llm/llm_metrics.py
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from colorama import Fore, Style
+
+from llm.admission import llm_slot
+from llm.llm_config import AGENT_TIERS, NARRATION, config_provider
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# Latest call latencies kept per tier and model for percentiles
+LATENCY_WINDOW = 500
+
+_lock = threading.Lock()
+_stats: Dict[Tuple[str, str], "CallStats"] = {}
+
+
+# ============================
+# Per-tier Statistics
+# ============================
+
+
+class CallStats:
+    """Latency, token and cost totals of the calls one tier made to one model."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_s": round(self.seconds / self.calls, 3) if self.calls else 0.0,
+            "p50_s": percentile(0.5),
+            "p95_s": percentile(0.95),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 6),
+        }
+
+
+def record(
+    tier: str,
+    model: str,
+    seconds: float,
+    usage: Tuple[int, int, float] = (0, 0, 0.0),
+    error: bool = False,
+) -> None:
+    """
+    Records one LLM call.
+
+    :param usage: (prompt tokens, completion tokens, cost in USD)
+    """
+    with _lock:
+        stats = _stats.get((tier, model))
+        if stats is None:
+            stats = _stats[(tier, model)] = CallStats()
+        stats.calls += 1
+        stats.errors += int(error)
+        stats.seconds += seconds
+        stats.latencies.append(seconds)
+        stats.prompt_tokens += usage[0]
+        stats.completion_tokens += usage[1]
+        stats.cost += usage[2]
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    :return: Call count, errors, latency (mean, p50, p95), tokens and cost of
+        LLM calls since the process started, keyed by tier, then model
+    """
+    with _lock:
+        report: Dict[str, Dict[str, Any]] = {}
+        for (tier, model), stats in sorted(_stats.items()):
+            report.setdefault(tier, {})[model] = stats.to_dict()
+    return report
+
+
+def tier_latency(tier: str) -> Optional[float]:
+    """
+    :return: Median latency in seconds of the tier's recent calls across its
+        models, or None before its first call
+    """
+    with _lock:
+        latencies = sorted(
+            seconds
+            for (call_tier, _), stats in _stats.items()
+            if call_tier == tier
+            for seconds in stats.latencies
+        )
+    if not latencies:
+        return None
+    return latencies[len(latencies) // 2]
+
+
+# ============================
+# Parallel Action Checks
+# ============================
+
+_action_checks = {"checks": 0, "wasted": 0, "saved_s": 0.0}
+
+
+def record_action_check(wasted: bool, saved_s: float = 0.0) -> None:
+    """
+    Records one turn whose DM draft ran alongside the action check.
+
+    :param wasted: The action was invalid and the draft was dropped
+    :param saved_s: Seconds saved over checking first: the shorter of the two
+    """
+    with _lock:
+        _action_checks["checks"] += 1
+        _action_checks["wasted"] += int(wasted)
+        _action_checks["saved_s"] += saved_s
+
+
+def action_check_snapshot() -> Dict[str, Any]:
+    """
+    :return: Action checks run alongside a draft, drafts dropped because the
+        check rejected the action (wasted), and the time the kept drafts saved
+    """
+    with _lock:
+        checks, wasted, saved_s = (
+            _action_checks["checks"],
+            _action_checks["wasted"],
+            _action_checks["saved_s"],
+        )
+    kept = checks - wasted
+    return {
+        "checks": checks,
+        "wasted_drafts": wasted,
+        "waste_rate": round(wasted / checks, 3) if checks else 0.0,
+        "saved_s_total": round(saved_s, 3),
+        "saved_s_mean": round(saved_s / kept, 3) if kept else 0.0,
+    }
+
+
+# ============================
+# Timed Calls
+# ============================
+
+
+def agent_tier(agent) -> str:
+    return AGENT_TIERS.get(getattr(agent, "name", ""), NARRATION)
+
+
+def agent_model(agent) -> str:
+    try:
+        return agent.llm_config["config_list"][0]["model"]
+    except (AttributeError, KeyError, IndexError, TypeError):
+        return "unknown"
+
+
+def agent_provider(agent) -> str:
+    try:
+        return config_provider(agent.llm_config["config_list"][0])
+    except (AttributeError, KeyError, IndexError, TypeError):
+        return "unknown"
+
+
+def _usage(agent) -> Tuple[int, int, float]:
+    # autogen accumulates usage per client; a call's share is the difference
+    summary = getattr(getattr(agent, "client", None), "actual_usage_summary", None)
+    if not summary:
+        return 0, 0, 0.0
+    models = [value for value in summary.values() if isinstance(value, dict)]
+    return (
+        sum(m.get("prompt_tokens", 0) for m in models),
+        sum(m.get("completion_tokens", 0) for m in models),
+        summary.get("total_cost", 0.0),
+    )
+
+
+async def timed_reply(agent, messages, in_thread: bool = False):
+    """
+    Calls ``agent.generate_reply`` and records its latency, tokens and cost
+    under the agent's tier.
+
+    Agents with ``a_generate_reply`` (every autogen agent) are awaited so the
+    request to the model does not block the event loop. The call waits for a
+    slot of its model and provider first, in its lane of the fair queue; the
+    recorded latency leaves that wait out.
+
+    :param in_thread: Run a blocking ``generate_reply`` in a worker thread
+    :return: The agent's reply
+    """
+    tier, model = agent_tier(agent), agent_model(agent)
+    async with llm_slot(agent_provider(agent), model, tier):
+        before = _usage(agent)
+        start = time.perf_counter()
+        try:
+            if hasattr(agent, "a_generate_reply"):
+                response = await agent.a_generate_reply(messages=messages)
+            elif in_thread:
+                response = await asyncio.to_thread(
+                    agent.generate_reply, messages=messages
+                )
+            else:
+                response = agent.generate_reply(messages=messages)
+            if hasattr(response, "__await__"):
+                response = await response
+        except Exception:
+            record(tier, model, time.perf_counter() - start, error=True)
+            raise
+        seconds = time.perf_counter() - start
+    after = _usage(agent)
+    usage = tuple(max(a - b, 0) for a, b in zip(after, before))
+    record(tier, model, seconds, usage)
+    logger.info(
+        f"{Fore.CYAN}[LLM CALL] {tier} on {model}: {seconds:.2f}s, "
+        f"{usage[0]}+{usage[1]} tokens, ${usage[2]:.5f}\n{Style.RESET_ALL}"
+    )
+    return response
@@ -0,0 +1,362 @@
+# llm/opening_pool.py
+"""
+A pool of campaign openings written ahead for each combination of game
+preferences.
+
+The first turn of a game is its slowest: the opening is written and then
+passes both validation stages. Game style, tone, difficulty and theme allow
+only 320 combinations, so while no player's turn is being generated a
+background job writes and validates up to ``OPENING_POOL_SIZE`` openings per
+combination and narration model, for a placeholder character. A new game
+whose first input only asks to start ("Begin", "Let's start") takes one from
+the pool instead; the placeholders are filled in with the character's
+name, race and class, or with one short validation-tier call when
+``OPENING_ADAPT`` is ``llm``.
+
+Combinations that players asked for while their pool was empty are refilled
+first. Openings are kept in the ``pooled_openings`` table, so the pool
+survives restarts and is shared by every worker on the database.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Set, Tuple
+
+from colorama import Fore, Style
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db.database import SessionLocal
+from llm.admission import mark_background
+from llm.speculation import wait_idle
+from models.game_preferences_models import (
+    DifficultyEnum,
+    GameStyleEnum,
+    ThemeEnum,
+    ToneEnum,
+)
+from models.opening_pool_models import PooledOpening
+
+load_dotenv()
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# Openings kept per preference combination and model; 0 turns the pool off
+OPENING_POOL_SIZE = int(os.getenv("OPENING_POOL_SIZE", "0"))
+# "template" fills in the placeholders; "llm" also makes one short call
+OPENING_ADAPT = os.getenv("OPENING_ADAPT", "template")
+
+# The player's input pooled openings are written for
+OPENING_PROMPT = "Begin the adventure."
+# Character fields the pool writes placeholders for, with their placeholders
+PLACEHOLDERS = {"name": "[NAME]", "race": "[RACE]", "class": "[CLASS]"}
+
+# First inputs that only ask to start, once filler words are dropped
+GENERIC_OPENINGS = frozenset(
+    [
+        "",
+        "begin",
+        "start",
+        "go",
+        "play",
+        "ready",
+        "im ready",
+        "lets begin",
+        "lets start",
+        "lets go",
+        "lets play",
+        "go ahead",
+        "start it",
+        "begin it",
+        "hello",
+        "hi",
+    ]
+)
+# Words a generic first input may add: "Okay, let's begin the adventure!"
+OPENING_FILLER_WORDS = frozenset(
+    "a an the our my new now please ok okay so then on with "
+    "adventure game story quest journey campaign".split()
+)
+
+# Session preference keys, in combination order
+PREFERENCE_ENUMS = (
+    ("gameStyle", GameStyleEnum),
+    ("tone", ToneEnum),
+    ("difficulty", DifficultyEnum),
+    ("theme", ThemeEnum),
+)
+COMBINATIONS = list(itertools.product(*(enum for _, enum in PREFERENCE_ENUMS)))
+
+Combination = Tuple[GameStyleEnum, ToneEnum, DifficultyEnum, ThemeEnum]
+WriteOpening = Callable[[Dict[str, str]], Awaitable[str]]
+
+# How each narration model writes an opening, set by its latest turn; one
+# entry per model the players have chosen
+_writers: Dict[str, WriteOpening] = {}
+# Games that found their combination's pool empty, by (model, combination)
+_demand = Counter()
+_counts = Counter()
+# Keeps the refill task referenced until it finishes
+_pending: Set["asyncio.Task"] = set()
+
+
+def combination(user_preferences: Mapping[str, str]) -> Optional[Combination]:
+    """
+    :param user_preferences: Preferences as stored in the session
+    :return: The preference combination, or None if one is missing or unknown
+    """
+    try:
+        return tuple(
+            enum(user_preferences.get(key)) for key, enum in PREFERENCE_ENUMS
+        )
+    except ValueError:
+        return None
+
+
+def combination_preferences(combo: Combination) -> Dict[str, str]:
+    """:return: The combination in the session's preference format"""
+    return {key: value.value for (key, _), value in zip(PREFERENCE_ENUMS, combo)}
+
+
+def placeholder_character() -> Dict[str, str]:
+    """:return: The character pooled openings are written for"""
+    return dict(PLACEHOLDERS)
+
+
+def adapt_opening(text: str, current_character: Mapping[str, Any]) -> str:
+    """
+    Fills in the placeholders of a pooled opening. A placeholder the
+    character has no value for becomes a neutral word.
+    """
+    fallbacks = {"name": "adventurer", "race": "traveler", "class": "adventurer"}
+    for field, placeholder in PLACEHOLDERS.items():
+        value = current_character.get(field) or fallbacks[field]
+        text = text.replace(placeholder, str(value))
+    return text
+
+
+def is_generic_opening(user_input: str) -> bool:
+    """
+    :return: Whether a first input asks for no particular opening, so any
+        opening for the player's preferences answers it
+    """
+    words = re.findall(r"[a-z]+", user_input.lower().replace("'", ""))
+    kept = " ".join(word for word in words if word not in OPENING_FILLER_WORDS)
+    return kept in GENERIC_OPENINGS
+
+
+# ============================
+# Pool
+# ============================
+
+
+def _filter(query, model: str, combo: Combination):
+    game_style, tone, difficulty, theme = combo
+    return query.filter_by(
+        model=model,
+        game_style=game_style,
+        tone=tone,
+        difficulty=difficulty,
+        theme=theme,
+    )
+
+
+def take_opening(
+    db: Session,
+    model: str,
+    user_preferences: Mapping[str, str],
+    user_input: str,
+) -> Optional[str]:
+    """
+    Removes and returns the oldest pooled opening for the player's
+    preferences, if the first input is generic enough for one.
+
+    :param model: Narration model of the game
+    :return: The opening with its placeholders, or None
+    """
+    if OPENING_POOL_SIZE <= 0:
+        return None
+    combo = combination(user_preferences)
+    if combo is None or not is_generic_opening(user_input):
+        _counts["skipped"] += 1
+        return None
+    opening = (
+        _filter(db.query(PooledOpening), model, combo)
+        .order_by(PooledOpening.id)
+        .first()
+    )
+    text, deleted = None, 0
+    if opening is not None:
+        text = opening.text
+        # Another game may take the same row between the query and the delete
+        deleted = db.query(PooledOpening).filter_by(id=opening.id).delete()
+    db.commit()
+    if not deleted:
+        _counts["misses"] += 1
+        _demand[(model, combo)] += 1
+        schedule_refill()
+        return None
+    _counts["hits"] += 1
+    logger.info(
+        f"{Fore.GREEN}[OPENING POOL] Serving a pooled opening for "
+        f"{'/'.join(value.value for value in combo)} on {model}\n{Style.RESET_ALL}"
+    )
+    schedule_refill()
+    return text
+
+
+def _pool_sizes(db: Session, model: str) -> Counter:
+    rows = (
+        db.query(
+            PooledOpening.game_style,
+            PooledOpening.tone,
+            PooledOpening.difficulty,
+            PooledOpening.theme,
+            func.count(PooledOpening.id),
+        )
+        .filter_by(model=model)
+        .group_by(
+            PooledOpening.game_style,
+            PooledOpening.tone,
+            PooledOpening.difficulty,
+            PooledOpening.theme,
+        )
+        .all()
+    )
+    return Counter({tuple(row[:4]): row[4] for row in rows})
+
+
+def _next_refill() -> Optional[Tuple[str, Combination]]:
+    # The combination most short of openings; those players asked for first
+    with SessionLocal() as db:
+        for model in list(_writers):
+            sizes = _pool_sizes(db, model)
+            short = [
+                combo for combo in COMBINATIONS if sizes[combo] < OPENING_POOL_SIZE
+            ]
+            if short:
+                return model, min(
+                    short, key=lambda combo: (-_demand[(model, combo)], sizes[combo])
+                )
+    return None
+
+
+def _store(model: str, combo: Combination, text: str) -> None:
+    game_style, tone, difficulty, theme = combo
+    with SessionLocal() as db:
+        db.add(
+            PooledOpening(
+                model=model,
+                game_style=game_style,
+                tone=tone,
+                difficulty=difficulty,
+                theme=theme,
+                text=text,
+            )
+        )
+        db.commit()
+
+
+async def _refill() -> None:
+    mark_background()
+    while True:
+        job = await asyncio.to_thread(_next_refill)
+        if job is None:
+            return
+        model, combo = job
+        # Low priority: write only while no player's turn is being generated
+        await wait_idle()
+        text = await _writers[model](combination_preferences(combo))
+        if not text.strip():
+            # The model is likely unavailable; the next turn restarts the refill
+            _counts["failed"] += 1
+            logger.error(
+                f"{Fore.RED}[OPENING POOL] Writing an opening on {model} failed\n"
+                f"{Style.RESET_ALL}"
+            )
+            return
+        await asyncio.to_thread(_store, model, combo, text)
+        _demand.pop((model, combo), None)
+        _counts["written"] += 1
+        logger.info(
+            f"{Fore.CYAN}[OPENING POOL] Pooled an opening for "
+            f"{'/'.join(value.value for value in combo)} on {model}\n"
+            f"{Style.RESET_ALL}"
+        )
+
+
+def _refill_done(task: "asyncio.Task") -> None:
+    _pending.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        _counts["failed"] += 1
+        logger.error(
+            f"{Fore.RED}[OPENING POOL] Refill failed: {task.exception()}\n"
+            f"{Style.RESET_ALL}"
+        )
+
+
+def schedule_refill() -> None:
+    """
+    Starts refilling the pool in the background unless a refill is running.
+    Outside an event loop, with the pool turned off or before any model has
+    registered a writer, nothing happens.
+    """
+    if OPENING_POOL_SIZE <= 0 or not _writers or _pending:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_refill())
+    _pending.add(task)
+    task.add_done_callback(_refill_done)
+
+
+def register_opening_writer(model: str, write: WriteOpening) -> None:
+    """
+    Sets how openings are written for a narration model and starts refilling
+    its pool.
+
+    :param write: Writes and validates an opening for the given preferences
+        and ``placeholder_character()``, returning "" on failure
+    """
+    if OPENING_POOL_SIZE <= 0:
+        return
+    _writers[model] = write
+    schedule_refill()
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    :return: Openings served (hits), not found (misses), not tried because
+        the first input was specific (skipped), written and failed, and the
+        openings pooled per model
+    """
+    pooled: Dict[str, int] = {}
+    if OPENING_POOL_SIZE > 0:
+        with SessionLocal() as db:
+            pooled = dict(
+                db.query(PooledOpening.model, func.count(PooledOpening.id))
+                .group_by(PooledOpening.model)
+                .all()
+            )
+    keys = ("hits", "misses", "skipped", "written", "failed")
+    return {
+        "pool_size": OPENING_POOL_SIZE,
+        **{key: _counts[key] for key in keys},
+        "pooled": pooled,
+    }
@@ -1,43 +1,415 @@
+# llm/pdf_processing.py
+
+import hashlib
+import json
+import logging
 import os
-import chromadb
-from chromadb.utils import embedding_functions
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
 import pdfplumber
 
+from llm.chunking import (
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_TOKENS,
+    CHUNKER_VERSION,
+    chunk_pages,
+)
+from llm.embedding_cache import CachedEmbeddingFunction
+from llm.embedding_service import EMBEDDING_MODEL
+from llm.keyword_index import get_keyword_index
+from llm.vector_store import VECTOR_STORE_BACKEND, get_vector_store
 
-def process_pdfs(docs_path, chroma_db_path, collection_name, embedding_model_name):
-    # Initialize ChromaDB client
-    client = chromadb.PersistentClient(path=chroma_db_path)
+# ============================
+# Logging Configuration
+# ============================
 
-    # Initialize embedding function directly
-    embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name=embedding_model_name
-    )
+logger = logging.getLogger(__name__)
 
-    # Create or get the collection for the specified agent
-    collection = client.get_or_create_collection(
-        name=collection_name, embedding_function=embedding_function
-    )
+# ============================
+# Constants
+# ============================
+
+PAGES_PER_TASK = 16  # Pages extracted by one worker task
+MANIFEST_FILENAME = "ingest_manifest.json"
+EMBED_BATCH_SIZE = 64  # Chunks per embedding-model forward pass
+WRITE_BATCH_SIZE = 256  # Chunks per store upsert call
+QUEUE_SIZE = 1024  # Chunks buffered between extraction and embedding
+
+
+# ============================
+# Manifest
+# ============================
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(
+    content_hash: str, chunk_tokens: int, chunk_overlap_tokens: int
+) -> Dict[str, Any]:
+    """
+    :return: The manifest entry of a file: its content hash and how it was
+        chunked. A file is re-indexed when any of them changes.
+    """
+    return {
+        "sha256": content_hash,
+        "chunker": CHUNKER_VERSION,
+        "chunk_tokens": chunk_tokens,
+        "chunk_overlap_tokens": chunk_overlap_tokens,
+    }
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Loads the ingestion manifest: collection (per backend) -> {filename:
+    fingerprint}. Manifests written before fingerprints hold bare sha256
+    strings, which match no fingerprint, so their files are re-indexed.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest_path: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    # Write-then-rename so an interrupted run never leaves a truncated manifest
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+# ============================
+# Extraction
+# ============================
 
-    # Process PDFs in the given directory
-    for filename in os.listdir(docs_path):
-        if filename.endswith(".pdf"):
-            pdf_path = os.path.join(docs_path, filename)
-            text = ""
-            with pdfplumber.open(pdf_path) as pdf:  # Using pdfplumber to open the PDF
-                for page in pdf.pages:
-                    text += page.extract_text() or ""  # Extract text from each page
-
-            # Split text into chunks
-            chunks = [text[i : i + 1000] for i in range(0, len(text), 1000)]  # noqa
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """
+    Extracts the text of pages [start, stop) of a PDF. Runs in a worker process.
+
+    :return: (1-based page number, text) pairs
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return [
+            (page_number + 1, pdf.pages[page_number].extract_text() or "")
+            for page_number in range(start, min(stop, len(pdf.pages)))
+        ]
+
+
+def iter_pdf_pages(
+    pdf_path: str, executor: Executor, pages_per_task: int = PAGES_PER_TASK
+) -> Iterator[Tuple[int, str]]:
+    """
+    Streams the pages of a PDF in order while the executor extracts page
+    ranges in parallel.
+
+    :return: Iterator of (1-based page number, text) pairs
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+
+    futures = [
+        executor.submit(extract_page_range, pdf_path, start, start + pages_per_task)
+        for start in range(0, page_count, pages_per_task)
+    ]
+    for future in futures:
+        yield from future.result()
+
+
+# ============================
+# Batched Writes
+# ============================
+
+
+class ChunkWriter:
+    """
+    Accumulates chunks and writes them with one embedding call per
+    ``embed_batch_size`` chunks and one ``upsert`` per ``write_batch_size``.
+    """
+
+    def __init__(
+        self,
+        store,
+        embedding_function: Callable[[List[str]], List[Any]],
+        embed_batch_size: int = EMBED_BATCH_SIZE,
+        write_batch_size: int = WRITE_BATCH_SIZE,
+    ):
+        self.store = store
+        self.embedding_function = embedding_function
+        self.embed_batch_size = embed_batch_size
+        self.write_batch_size = write_batch_size
+        self._pending: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._embedded: List[Tuple[str, str, Dict[str, Any], Any]] = []
+        self.written = 0
+
+    def add(self, chunk_id: str, document: str, metadata: Dict[str, Any]) -> None:
+        self._pending.append((chunk_id, document, metadata))
+        if len(self._pending) >= self.embed_batch_size:
+            self._embed_pending()
+        if len(self._embedded) >= self.write_batch_size:
+            self._write_embedded()
+
+    def flush(self) -> None:
+        self._embed_pending()
+        self._write_embedded()
+
+    def _embed_pending(self) -> None:
+        if not self._pending:
+            return
+        embeddings = self.embedding_function([doc for _, doc, _ in self._pending])
+        self._embedded.extend(
+            (chunk_id, doc, meta, embedding)
+            for (chunk_id, doc, meta), embedding in zip(self._pending, embeddings)
+        )
+        self._pending = []
+
+    def _write_embedded(self) -> None:
+        if not self._embedded:
+            return
+        ids, documents, metadatas, embeddings = map(list, zip(*self._embedded))
+        self.store.upsert(
+            ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings
+        )
+        self.written += len(ids)
+        self._embedded = []
+
+
+def write_chunks(
+    store,
+    embedding_function: Callable[[List[str]], List[Any]],
+    chunks: Iterable[Tuple[str, str, Dict[str, Any]]],
+    embed_batch_size: int = EMBED_BATCH_SIZE,
+    write_batch_size: int = WRITE_BATCH_SIZE,
+) -> int:
+    """
+    Embeds and writes (id, document, metadata) chunks in batches.
+
+    :param store: A vector store, or anything with the same ``upsert`` keywords
+        (such as a Chroma collection)
+
+    :return: Number of chunks written
+    """
+    writer = ChunkWriter(store, embedding_function, embed_batch_size, write_batch_size)
+    for chunk_id, document, metadata in chunks:
+        writer.add(chunk_id, document, metadata)
+    writer.flush()
+    return writer.written
+
+
+# ============================
+# Ingestion
+# ============================
+
+# Markers passed from the extraction thread to the embedding/writing thread
+_FILE_START, _CHUNK, _FILE_DONE, _ERROR, _END = range(5)
+
+
+def _produce_chunks(
+    files: List[Tuple[str, str, Dict[str, Any], bool]],
+    executor: Executor,
+    out_queue: "queue.Queue[tuple]",
+    chunk_tokens: int,
+    chunk_overlap_tokens: int,
+) -> None:
+    """
+    Extraction side of the pipeline: streams chunk events for every file into
+    a bounded queue, blocking while the embedding side catches up.
+    """
+    try:
+        for filename, pdf_path, fingerprint, replace in files:
+            out_queue.put((_FILE_START, filename, replace))
+            page_count = 0
+            pages = iter_pdf_pages(pdf_path, executor)
+
+            def counted_pages():
+                nonlocal page_count
+                for page in pages:
+                    page_count += 1
+                    yield page
+
+            chunks = chunk_pages(counted_pages(), chunk_tokens, chunk_overlap_tokens)
             for idx, chunk in enumerate(chunks):
-                collection.add(
-                    documents=[chunk],
-                    metadatas=[{"source": filename}],
-                    ids=[f"{filename}-{idx}"],
+                metadata = chunk.metadata(filename)
+                metadata["chunk"] = idx
+                out_queue.put((_CHUNK, f"{filename}-{idx}", chunk.text, metadata))
+            out_queue.put((_FILE_DONE, filename, fingerprint, page_count))
+    except BaseException as e:  # Re-raised on the consumer side
+        out_queue.put((_ERROR, e))
+    finally:
+        out_queue.put((_END,))
+
+
+def process_pdfs(
+    docs_path: str,
+    store_path: str,
+    collection_name: str,
+    embedding_model_name: str,
+    max_workers: Optional[int] = None,
+    embed_batch_size: int = EMBED_BATCH_SIZE,
+    write_batch_size: int = WRITE_BATCH_SIZE,
+    queue_size: int = QUEUE_SIZE,
+    chunk_tokens: int = CHUNK_TOKENS,
+    chunk_overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    backend: Optional[str] = None,
+) -> Dict[str, float]:
+    """
+    Incrementally ingests the PDFs of a directory into a vector store.
+
+    Files whose content hash and chunking (``CHUNKER_VERSION``, chunk_tokens
+    and chunk_overlap_tokens) match the manifest are skipped. Changed files
+    have their previous chunks removed before being re-added, and chunks of
+    deleted files are removed from the store.
+
+    Every chunk is also added to the collection's BM25 keyword index.
+
+    Pages are split by ``chunk_pages`` along heading, paragraph and sentence
+    boundaries; each chunk records its source, page range and section title.
+
+    Extraction runs on a producer thread feeding a bounded queue; the calling
+    thread embeds chunks in batches and writes them with batched upserts.
+
+    :param docs_path: Directory containing the PDFs
+    :param store_path: Vector store persistence directory
+    :param collection_name: Collection to write to
+    :param embedding_model_name: SentenceTransformer model name
+    :param max_workers: Extraction processes (defaults to the CPU count)
+    :param embed_batch_size: Chunks per embedding-model forward pass
+    :param write_batch_size: Chunks per store upsert
+    :param queue_size: Maximum chunks buffered between extraction and embedding
+    :param chunk_tokens: Maximum tokens per chunk
+    :param chunk_overlap_tokens: Tokens shared by consecutive chunks of a section
+    :param backend: Vector store backend, overriding ``VECTOR_STORE_BACKEND``
+    :return: Ingestion statistics, including pages/sec and chunks/sec
+    """
+    # Unchanged chunk texts are served from the embedding cache, so re-chunking
+    # or rebuilding a collection only embeds text the model has never seen
+    embedding_function = CachedEmbeddingFunction(embedding_model_name)
+
+    backend = backend or VECTOR_STORE_BACKEND
+    store = get_vector_store(store_path, collection_name, embedding_function, backend)
+    keyword_index = get_keyword_index(store_path, collection_name)
+
+    manifest_path = os.path.join(store_path, MANIFEST_FILENAME)
+    manifest = load_manifest(manifest_path)
+    # Each backend keeps its own copy of the data, so it gets its own entry
+    manifest_key = (
+        collection_name if backend == "chroma" else f"{collection_name}:{backend}"
+    )
+    indexed = manifest.setdefault(manifest_key, {})
+
+    filenames = sorted(f for f in os.listdir(docs_path) if f.endswith(".pdf"))
+
+    # Drop chunks of PDFs that were removed from the directory
+    for filename in set(indexed) - set(filenames):
+        logger.info(f"[INGEST] Removing {filename} from {collection_name}")
+        store.delete(where={"source": filename})
+        keyword_index.delete_source(filename)
+        del indexed[filename]
+    keyword_index.persist()
+
+    # Built before the keyword index existed; re-chunking is cheap since every
+    # embedding comes from the cache
+    rebuild = bool(indexed) and keyword_index.count() == 0
+    if rebuild:
+        logger.info(f"[INGEST] Building the keyword index for {collection_name}")
+
+    files = []
+    stats = {"files": 0, "skipped": 0, "pages": 0, "chunks": 0}
+    for filename in filenames:
+        pdf_path = os.path.join(docs_path, filename)
+        fingerprint = file_fingerprint(
+            file_sha256(pdf_path), chunk_tokens, chunk_overlap_tokens
+        )
+        if not rebuild and indexed.get(filename) == fingerprint:
+            stats["skipped"] += 1
+            continue
+        # Indexed files are replaced, so no chunk of an older chunking survives
+        files.append((filename, pdf_path, fingerprint, filename in indexed))
+
+    writer = ChunkWriter(store, embedding_function, embed_batch_size, write_batch_size)
+    chunk_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=queue_size)
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        producer = threading.Thread(
+            target=_produce_chunks,
+            args=(
+                files,
+                executor,
+                chunk_queue,
+                chunk_tokens,
+                chunk_overlap_tokens,
+            ),
+            name="pdf-extraction",
+            daemon=True,
+        )
+        producer.start()
+
+        chunk_count = 0
+        while True:
+            event = chunk_queue.get()
+            kind = event[0]
+            if kind == _CHUNK:
+                _, chunk_id, chunk, metadata = event
+                writer.add(chunk_id, chunk, metadata)
+                keyword_index.add(chunk_id, chunk, metadata["source"])
+                chunk_count += 1
+            elif kind == _FILE_START:
+                _, filename, replace = event
+                chunk_count = 0
+                if replace:
+                    # Changed file: re-index it in place
+                    store.delete(where={"source": filename})
+                    keyword_index.delete_source(filename)
+            elif kind == _FILE_DONE:
+                _, filename, fingerprint, page_count = event
+                writer.flush()
+                store.persist()
+                keyword_index.persist()
+                indexed[filename] = fingerprint
+                # Persist per file so an interrupted run resumes where it stopped
+                save_manifest(manifest_path, manifest)
+                stats["files"] += 1
+                stats["pages"] += page_count
+                stats["chunks"] += chunk_count
+                logger.info(
+                    f"[INGEST] {filename}: {page_count} pages, {chunk_count} chunks"
                 )
+            elif kind == _ERROR:
+                raise event[1]
+            else:  # _END
+                break
+        producer.join()
+
+    store.persist()
+    save_manifest(manifest_path, manifest)
+    elapsed = time.perf_counter() - start_time
+    stats["seconds"] = elapsed
+    stats["pages_per_sec"] = stats["pages"] / elapsed if elapsed else 0.0
+    stats["chunks_per_sec"] = stats["chunks"] / elapsed if elapsed else 0.0
+    stats["embedding_cache_hits"] = embedding_function.hits
+    stats["embedding_cache_misses"] = embedding_function.misses
+    logger.info(
+        f"[INGEST] {collection_name}: {stats['files']} indexed, {stats['skipped']} "
+        f"unchanged, {stats['pages_per_sec']:.1f} pages/sec, "
+        f"{stats['chunks_per_sec']:.1f} chunks/sec, "
+        f"{embedding_function.hits} cached / {embedding_function.misses} embedded"
+    )
+    return stats
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Paths for DM and Storyteller resources
     DM_DOCS_PATH = os.path.abspath(
         os.path.join(os.path.dirname(__file__), "..", "resources", "dm_resources")
@@ -56,9 +428,6 @@ if __name__ == "__main__":
         os.path.join(os.path.dirname(__file__), "..", "chromadb_st")
     )
 
-    # Embedding model
-    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-
     # Process PDFs for the DM agent
     process_pdfs(DM_DOCS_PATH, DM_CHROMA_DB_PATH, "dm_actions", EMBEDDING_MODEL)
 
@@ -1,334 +1,504 @@
 # llm/prompts.py
+"""
+Prompt builders, one per call type.
+
+Every builder returns chat messages laid out from most to least stable so
+that provider prefix caching (Ollama's KV cache, OpenAI's prompt caching) can
+reuse as much of the previous call as possible:
+
+1. a system message with the call type's fixed instructions, byte-identical
+   on every call;
+2. a user message with the campaign context (preferences and character),
+   which only changes when the character does;
+3. a user message with the per-turn material (storyline, world state,
+   reference excerpts, player input), always last.
+
+The session variant of the narration call (``continue_campaign_session_prompt``)
+sends past turns as alternating user and assistant messages between 2. and 3.
+instead of a storyline section, so consecutive turns share everything but
+the new turn.
+"""
+
+import json
 import logging
+from typing import Dict, List, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+Messages = List[Dict[str, str]]
 
-def create_campaign_prompt(user_input, context):
-    return f"""
-    You are the Game Master (GM) for a campaign in a role-playing game based on the player's preferences and 5th Edition mechanics. Create an immersive, consistent world setting while introducing a compelling storyline.
-
-    **Player Preferences and Character Details:**
-    {context}
-
-    **Player Input:**
-    {user_input}
-
-    **Instructions:**
-    1. Begin with a **rich, vivid scene description** to set the tone and atmosphere. Include sensory details such as:
-        - **Visual elements** (colors, textures, movement)
-        - **Sounds** (background noises, specific auditory cues)
-        - **Scents** (environmental smells, noticeable aromas)
-        - **Textures or sensations** (ambient temperature, weather, tactile elements)
-    2. Provide potential **interaction options** within the scene, such as:
-        - **Dialogue choices** for conversations with NPCs.
-        - **Skill checks** (e.g., perception, insight, investigation) to build tension or reveal hidden details.
-        - **Open-ended exploration** for player freedom.
-    3. Drive the narrative forward at a good, reasonable pace - not too quick or too slow.
-    4. Maintain continuity with previous player actions to build a cohesive storyline, weaving in prior events.
-    5. Use **5E mechanics** as a basis for responses.
-    6. **JSON Response Format Requirement**:
-        - Only respond in JSON format.
-        - Use the format below, with no extra keys or explanations:
-
-    ```json
-    {{
-        "response": "<Narrative response as a single string. Ensure nested dialogue is enclosed in single quotes, e.g., 'He said, Hello!' Do not include line breaks or extra whitespace inside this field.>"
-    }}
-    ```
-
-    **Correct Example:**
-    ```json
-    {{
-        "response": "The town square bustles with activity as vendors shout their wares. A guard eyes you warily and says, 'Greetings, traveler. What brings you here?'"
-    }}
-    ```
-    """
+# ============================
+# Message Layout
+# ============================
+
+
+def reference_section(reference_material) -> Tuple[str, str]:
+    # Retrieved rulebook/storytelling excerpts; omitted entirely when empty
+    return (
+        "Reference Material (excerpts from the rulebooks; use them where relevant)",
+        reference_material,
+    )
+
+
+def world_state_section(world_state) -> Tuple[str, str]:
+    # Known facts about the entities in the current scene; omitted when empty
+    return ("Established World State (treat these facts as canon)", world_state)
 
 
-def continue_campaign_prompt(context, previous_storyline, user_input):
-    return f"""
-    You are the Game Master (GM) for an ongoing campaign in a role-playing game. Continue the story based on the player's input while maintaining consistency with their preferences and established storyline.
-
-    **Player Preferences and Character Details:**
-    {context}
-
-    **Current Storyline:**
-    {previous_storyline}
-
-    **Player Input:**
-    {user_input}
-
-    **Instructions:**
-    1. Start with a **detailed, immersive scene description**. Include sensory details that align with the established setting:
-        - **Visuals** (colors, textures, movement).
-        - **Sounds** (ambient noises, specific auditory cues).
-        - **Scents** (aromas or environmental smells).
-        - **Textures or sensations** (weather, tactile elements).
-    2. Offer **interaction options** within the scene:
-        - **Dialogue choices** for conversations with NPCs.
-        - **Skill challenges** (e.g., stealth, perception) to create tension.
-        - **Exploration opportunities** to allow player freedom.
-    3. Follow storytelling conventions:
-        - Add **narrative hooks** to provide options without forcing a specific path.
-        - Include **foreshadowing** to build suspense or intrigue.
-        - Balance intense moments with **rest or discovery** opportunities.
-    4. Drive the narrative forward at a good, reasonable pace - not too quick or too slow.
-    5. Do NOT reveal GM-only information, such as DCs or hidden mechanics.
-    6. Assume the player knows their character's basic information, so avoid repeating it.
-
-    **JSON Response Requirement**:
-    - **Respond ONLY in JSON format** using the structure below.
-    - Follow this exact format to ensure proper JSON parsing:
-
-    ```json
-    {{
-        "response": "<Your narrative response here as a single string. Include sensory details, interaction options, and maintain storyline continuity. Use single quotes for nested dialogue (e.g., 'He said, Hello!'). Do not include line breaks or extra whitespace within this field.>"
-    }}
-    ```
-
-    **Correct JSON Example:**
-    ```json
-    {{
-        "response": "As you step into the shadowy forest, the crunch of leaves underfoot echoes around you. A hooded figure steps forward and says, 'Greetings, traveler. What brings you to these woods?'"
-    }}
-    ```
+def build_messages(
+    instructions: str,
+    context: Optional[str],
+    sections: List[Tuple[str, str]],
+) -> Messages:
     """
+    Lays out a call as system instructions, then the campaign context, then
+    the per-turn sections. Empty sections are left out.
 
+    :param instructions: Fixed instructions of the call type
+    :param context: Player preferences and character details, or None
+    :param sections: (title, body) pairs, most stable first
+    :return: Chat messages for ``generate_reply``
+    """
+    messages = [{"role": "system", "content": instructions}]
+    if context:
+        messages.append(
+            {
+                "role": "user",
+                "content": f"**Player Preferences and Character Details:**\n{context}",
+            }
+        )
+    tail = "\n\n".join(f"**{title}:**\n{body}" for title, body in sections if body)
+    messages.append({"role": "user", "content": tail})
+    return messages
+
+
+def conversation_messages(history: Sequence[Tuple[str, str]]) -> Messages:
+    """
+    Renders past turns as the player's user messages and the GM's assistant
+    replies, the latter in the JSON format the GM is asked to answer in.
 
-def validate_storyline_prompt(context, storyline, dm_response):
-    return f"""
-    Your task is to review the campaign storyline for alignment with the player's preferences, ensuring it is immersive, consistent, and engaging.
-
-    **Player Preferences and Character Details:**
-    {context}
-
-    **Current Storyline:**
-    {storyline}
-    
-    **New GM Response:**
-    {dm_response}
-
-    **Instructions:**
-    1. Verify that the storyline aligns with the player's preferences, including tone, theme, and difficulty, and that it remains consistent with previous context.
-    2. Confirm that the narrative is immersive and flows smoothly, with rich descriptions, appropriate pacing, and well-crafted scenes.
-    3. Ensure the GM’s response adheres to best practices for TTRPG storytelling, enhancing the player's experience.
-    4. Provide feedback only if you identify:
-        - **Misalignments** with player preferences (e.g., unwanted tone shifts, inconsistencies with established elements),
-        - **Narrative inconsistencies** or contradictions,
-        - **Elements hindering immersion** (e.g., lack of sensory detail, unclear descriptions, or abrupt transitions).
-    5. **Avoid suggesting major changes unless they are strictly necessary for consistency or player alignment.**
-
-    6. **Response Format:**
-    ```json
-    {{
-        "feedback": "<Your feedback here, or empty string if no feedback is needed>"
-    }}
-    ```
-
-    7. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**
+    :param history: (user_input, gm_response) pairs, oldest first
     """
+    messages = []
+    for user_input, gm_response in history:
+        messages.append(
+            {"role": "user", "content": f"**Player Input:**\n{user_input}"}
+        )
+        messages.append(
+            {"role": "assistant", "content": json.dumps({"response": gm_response})}
+        )
+    return messages
+
+
+# ============================
+# Instructions
+# ============================
+
+CREATE_CAMPAIGN_INSTRUCTIONS = """\
+You are the Game Master (GM) for a campaign in a role-playing game based on the player's preferences and 5th Edition mechanics. Create an immersive, consistent world setting while introducing a compelling storyline.
+
+**Instructions:**
+1. Begin with a **rich, vivid scene description** to set the tone and atmosphere. Include sensory details such as:
+    - **Visual elements** (colors, textures, movement)
+    - **Sounds** (background noises, specific auditory cues)
+    - **Scents** (environmental smells, noticeable aromas)
+    - **Textures or sensations** (ambient temperature, weather, tactile elements)
+2. Provide potential **interaction options** within the scene, such as:
+    - **Dialogue choices** for conversations with NPCs.
+    - **Skill checks** (e.g., perception, insight, investigation) to build tension or reveal hidden details.
+    - **Open-ended exploration** for player freedom.
+3. Drive the narrative forward at a good, reasonable pace - not too quick or too slow.
+4. Maintain continuity with previous player actions to build a cohesive storyline, weaving in prior events.
+5. Use **5E mechanics** as a basis for responses.
+6. **JSON Response Format Requirement**:
+    - Only respond in JSON format.
+    - Use the format below, with no extra keys or explanations:
+
+```json
+{
+    "response": "<Narrative response as a single string. Ensure nested dialogue is enclosed in single quotes, e.g., 'He said, Hello!' Do not include line breaks or extra whitespace inside this field.>"
+}
+```
+
+**Correct Example:**
+```json
+{
+    "response": "The town square bustles with activity as vendors shout their wares. A guard eyes you warily and says, 'Greetings, traveler. What brings you here?'"
+}
+```"""
+
+CONTINUE_CAMPAIGN_INSTRUCTIONS = """\
+You are the Game Master (GM) for an ongoing campaign in a role-playing game. Continue the story based on the player's input while maintaining consistency with their preferences and established storyline.
+
+**Instructions:**
+1. Start with a **detailed, immersive scene description**. Include sensory details that align with the established setting:
+    - **Visuals** (colors, textures, movement).
+    - **Sounds** (ambient noises, specific auditory cues).
+    - **Scents** (aromas or environmental smells).
+    - **Textures or sensations** (weather, tactile elements).
+2. Offer **interaction options** within the scene:
+    - **Dialogue choices** for conversations with NPCs.
+    - **Skill challenges** (e.g., stealth, perception) to create tension.
+    - **Exploration opportunities** to allow player freedom.
+3. Follow storytelling conventions:
+    - Add **narrative hooks** to provide options without forcing a specific path.
+    - Include **foreshadowing** to build suspense or intrigue.
+    - Balance intense moments with **rest or discovery** opportunities.
+4. Drive the narrative forward at a good, reasonable pace - not too quick or too slow.
+5. Do NOT reveal GM-only information, such as DCs or hidden mechanics.
+6. Assume the player knows their character's basic information, so avoid repeating it.
+
+**JSON Response Requirement**:
+- **Respond ONLY in JSON format** using the structure below.
+- Follow this exact format to ensure proper JSON parsing:
+
+```json
+{
+    "response": "<Your narrative response here as a single string. Include sensory details, interaction options, and maintain storyline continuity. Use single quotes for nested dialogue (e.g., 'He said, Hello!'). Do not include line breaks or extra whitespace within this field.>"
+}
+```
+
+**Correct JSON Example:**
+```json
+{
+    "response": "As you step into the shadowy forest, the crunch of leaves underfoot echoes around you. A hooded figure steps forward and says, 'Greetings, traveler. What brings you to these woods?'"
+}
+```"""
+
+VALIDATE_STORYLINE_INSTRUCTIONS = """\
+Your task is to review the campaign storyline for alignment with the player's preferences, ensuring it is immersive, consistent, and engaging.
+
+**Instructions:**
+1. Verify that the storyline aligns with the player's preferences, including tone, theme, and difficulty, and that it remains consistent with previous context.
+2. Confirm that the narrative is immersive and flows smoothly, with rich descriptions, appropriate pacing, and well-crafted scenes.
+3. Ensure the GM’s response adheres to best practices for TTRPG storytelling, enhancing the player's experience.
+4. Provide feedback only if you identify:
+    - **Misalignments** with player preferences (e.g., unwanted tone shifts, inconsistencies with established elements),
+    - **Narrative inconsistencies** or contradictions,
+    - **Elements hindering immersion** (e.g., lack of sensory detail, unclear descriptions, or abrupt transitions).
+5. **Avoid suggesting major changes unless they are strictly necessary for consistency or player alignment.**
+
+6. **Response Format:**
+```json
+{
+    "feedback": "<Your feedback here, or empty string if no feedback is needed>"
+}
+```
+
+7. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**"""
+
+REVISE_STORYLINE_INSTRUCTIONS = """\
+You are the Game Master (GM) revising your previous response based on feedback. Ensure the storyline aligns with the player's preferences and preserves immersion.
+**Your response should retain all elements of the previous response, with only minimal adjustments based on the feedback.**
+
+**Instructions:**
+1. Retain the original description closely; make only small adjustments, such as adding details or shifting tone slightly.
+2. Maintain all key elements from the previous response (e.g., objects, characters, atmosphere).
+3. Enhance immersion by adding minor sensory details or descriptive elements if needed.
+4. Avoid introducing new items, locations, or actions unless explicitly requested in the feedback.
+5. **Respond in JSON format only, using the structure below:**
+```json
+{
+    "response": "<Your revised narrative response here>"
+}
+```
+6. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**"""
+
+VALIDATE_OPTIONS_INSTRUCTIONS = """\
+Review the GM's response to ensure that all options provided align with the player's abilities, character details, and the current scene context.
+
+**Instructions:**
+1. Check that each option provided by the GM is realistic, consistent with the character's abilities, class, and standard 5th Edition rules.
+2. Verify that the options align with the current scene and setting, enhancing immersion rather than disrupting it.
+3. Identify any options that propose actions beyond the character’s capabilities or that could break immersion within the scene.
+4. **Only provide feedback if inconsistencies are detected regarding abilities, rules, or scene context.** If everything aligns, set `"feedback"` to an empty string.
+
+5. **Response Format:**
+    - Respond strictly with a JSON object containing only the `feedback` key, with no nested keys or additional fields.
+    - If feedback is necessary, provide it within the `feedback` field. If no feedback is needed, set `feedback` to an empty string (`""`).
+
+6. **Required JSON Response Format (strict adherence):**
+```json
+{
+    "feedback": "<Your feedback here, or an empty string if no feedback is needed>"
+}
+```
+
+7. **Important:**
+    - Your response must strictly match the format above, with only the `feedback` key in the JSON object. Do not include any extra text, explanations, or keys outside of the JSON block.
+    - Do not include nested keys."""
+
+REVISE_OPTIONS_INSTRUCTIONS = """\
+You are the Game Master (GM) revising your previous response based on feedback. Retain the structure and content of your original response, but make specific adjustments to address the feedback provided.
+
+**Instructions:**
+1. Keep your response as close to the original as possible.
+2. Adjust the options only as needed to incorporate the feedback.
+3. Ensure the options are consistent with the environmental context of the scene.
+4. Maintain immersion by aligning actions with the game’s theme.
+5. **Always respond in JSON format with the following structure:**
+```json
+{
+    "response": "<Your revised narrative response here>"
+}
+```
+6. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**"""
+
+INFORM_INVALID_ACTION_INSTRUCTIONS = """\
+Provide feedback to the player about why their chosen action is invalid based on their abilities, class, or 5th Edition rules. Suggest alternative actions they could consider that are appropriate for their character.
+
+**Instructions:**
+1. Briefly explain why the chosen action is not possible due to the character's abilities or 5th Edition rules.
+2. Offer a few alternative actions the player could consider, suited to their abilities.
+3. **Do not** consider the action's consistency with the scene or narrative context. Strictly evaluate its compliance with the rules.
+4. **Respond in JSON format** with the following structure, using the key 'response' and no nested keys:
+```json
+{
+    "response": "<Your explanation and suggested actions here>"
+}
+```
+5. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**"""
+
+VALIDATE_PLAYER_ACTION_INSTRUCTIONS = """\
+Your task is to evaluate the player's chosen action and determine whether it is valid based on their character's abilities, class, and 5th Edition rules.
+
+**Instructions:**
+1. Determine if the player's action is valid for their character's class and abilities under 5th Edition rules.
+2. Allow the player to have creative freedom provided they are in compliance with 5th edition rules.
+3. Allow the player to ask questions of the GM.
+4. If the action is **valid**, respond with JSON containing an empty string for feedback:
+```json
+{
+    "feedback": ""
+}
+```
+5. If the action is **invalid** (e.g., the character attempts to use a spell or ability they do not have), respond with feedback explaining **why** the action is invalid and suggest a few alternative actions that are appropriate for their character.
+6. When generating the list of alternative actions make sure to only use characters that are appropriate in  JSON format: (Replace * with -)
+7. If the action is valid, but requires a skill check for success, then respond with feedback indicating such.
+8. Don't forget to close a bracketed list with ] if you start one with [
+9. Remember to always close your JSON response with a closing curly bracket
+10. **Response Format:**
+```json
+{
+    "feedback": "<Your feedback here>"
+}
+```
+11. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**"""
+
+EXTRACT_WORLD_STATE_INSTRUCTIONS = """\
+Your task is to record what the latest turn of a role-playing campaign established about the game world, so later turns stay consistent.
+
+**Instructions:**
+1. List the NPCs, locations, items, quests and factions that appear in this turn. Reuse the exact name of an already known entity when it reappears.
+2. Record only durable facts stated in this turn (who someone is, where something is, what was promised, owned, lost or revealed). Skip atmosphere and sensory description.
+3. Record relationships between named entities, e.g. "employs", "located in", "owns", "hostile to".
+4. List new unresolved story threads (open questions, promises, quests) and any earlier threads this turn resolved, using their exact wording.
+5. Keep each fact and thread to one short sentence. Use empty lists when there is nothing to record.
+6. **Response Format:**
+```json
+{
+    "entities": [{"name": "<name>", "kind": "npc|location|item|quest|faction|other", "description": "<one short sentence>"}],
+    "facts": [{"entity": "<name>", "fact": "<one short sentence>"}],
+    "relationships": [{"source": "<name>", "relation": "<relation>", "target": "<name>"}],
+    "threads_opened": ["<thread>"],
+    "threads_resolved": ["<thread>"]
+}
+```
+7. **Do not include any text outside of the JSON block. Only provide the JSON response.**"""
+
+ADAPT_OPENING_INSTRUCTIONS = """\
+You are the Game Master (GM) fitting a campaign opening, written in advance, to the player's character.
+
+**Instructions:**
+1. Keep the scene, its events and the offered options exactly as they are.
+2. Change only what refers to the player's character so it matches their name, race and class, and fix any grammar this affects.
+3. **Always respond in JSON format with the following structure:**
+```json
+{
+    "response": "<The adapted opening here>"
+}
+```
+4. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**"""
+
+FORMAT_FEEDBACK_INSTRUCTIONS = """\
+Your previous response did not meet the correct JSON format.
+
+**Instructions:**
+1. Keep your response as close to the original as possible while correcting for proper JSON encoding.
+2. Use exactly the keys listed below.
+3. **Each key must have a value**, even if it's an empty string ("").
+4. **The value must be a single string**: avoid line breaks, use single quotes for nested dialogue (e.g., 'He said, Hello!'), and ensure no extra whitespace.
+5. **Escape special characters properly**, including double quotes ("), backslashes (\\), and newlines (\\n).
+6. **Return only the JSON block** with the specified keys. Do not add explanations, additional keys, or any text outside the JSON block.
+7. **Respond using the exact JSON format given below.**"""
+
+
+# ============================
+# Prompt Builders
+# ============================
+
+
+def create_campaign_prompt(user_input, context) -> Messages:
+    return build_messages(
+        CREATE_CAMPAIGN_INSTRUCTIONS, context, [("Player Input", user_input)]
+    )
 
 
-def revise_storyline_prompt(context, storyline, previous_response, feedback):
-    return f"""
-    You are the Game Master (GM) revising your previous response based on feedback. Ensure the storyline aligns with the player's preferences and preserves immersion. 
-    **Your response should retain all elements of the previous response, with only minimal adjustments based on the feedback.**
-    
-    **Player Preferences and Character Details:**
-    {context}
-    
-    **Current Storyline:**
-    {storyline}
-    
-    **Previous Response:**
-    {previous_response}
-    
-    **Feedback:**
-    {feedback}
-    
-    **Instructions:**
-    1. Retain the original description closely; make only small adjustments, such as adding details or shifting tone slightly.
-    2. Maintain all key elements from the previous response (e.g., objects, characters, atmosphere).
-    3. Enhance immersion by adding minor sensory details or descriptive elements if needed.
-    4. Avoid introducing new items, locations, or actions unless explicitly requested in the feedback.
-    5. **Respond in JSON format only, using the structure below:**
-    ```json
-    {{
-        "response": "<Your revised narrative response here>"
-    }}
-    ```
-    6. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**
+def continue_campaign_prompt(
+    context, previous_storyline, user_input, reference_material="", world_state=""
+) -> Messages:
+    return build_messages(
+        CONTINUE_CAMPAIGN_INSTRUCTIONS,
+        context,
+        [
+            ("Current Storyline", previous_storyline),
+            world_state_section(world_state),
+            reference_section(reference_material),
+            ("Player Input", user_input),
+        ],
+    )
+
+
+def continue_campaign_session_prompt(
+    context,
+    history,
+    user_input,
+    reference_material="",
+    world_state="",
+    recalled_storyline="",
+) -> Messages:
+    """
+    The narration call with the game's transcript as chat turns.
+
+    :param history: (user_input, gm_response) pairs of the session's turns
+    :param recalled_storyline: Relevant turns from before the session window
     """
+    messages = build_messages(
+        CONTINUE_CAMPAIGN_INSTRUCTIONS,
+        context,
+        [
+            ("Recalled Earlier Turns", recalled_storyline),
+            world_state_section(world_state),
+            reference_section(reference_material),
+            ("Player Input", user_input),
+        ],
+    )
+    return messages[:-1] + conversation_messages(history) + messages[-1:]
+
+
+def validate_storyline_prompt(
+    context, storyline, dm_response, reference_material="", world_state=""
+) -> Messages:
+    return build_messages(
+        VALIDATE_STORYLINE_INSTRUCTIONS,
+        context,
+        [
+            ("Current Storyline", storyline),
+            world_state_section(world_state),
+            reference_section(reference_material),
+            ("New GM Response", dm_response),
+        ],
+    )
+
+
+def revise_storyline_prompt(context, storyline, previous_response, feedback) -> Messages:
+    return build_messages(
+        REVISE_STORYLINE_INSTRUCTIONS,
+        context,
+        [
+            ("Current Storyline", storyline),
+            ("Previous Response", previous_response),
+            ("Feedback", feedback),
+        ],
+    )
 
 
-def validate_options_prompt(context, dm_prompt):
+def validate_options_prompt(context, dm_prompt, reference_material="") -> Messages:
     logger.debug("validate_options_prompt")
-    return f"""
-    Review the GM's response to ensure that all options provided align with the player's abilities, character details, and the current scene context.
-
-    **Player Preferences and Character Details:**
-    {context}
-
-    **GM's Response (Scene and Options):**
-    {dm_prompt}
-
-    **Instructions:**
-    1. Check that each option provided by the GM is realistic, consistent with the character's abilities, class, and standard 5th Edition rules.
-    2. Verify that the options align with the current scene and setting, enhancing immersion rather than disrupting it.
-    3. Identify any options that propose actions beyond the character’s capabilities or that could break immersion within the scene.
-    4. **Only provide feedback if inconsistencies are detected regarding abilities, rules, or scene context.** If everything aligns, set `"feedback"` to an empty string.
-
-    5. **Response Format:**
-        - Respond strictly with a JSON object containing only the `feedback` key, with no nested keys or additional fields.
-        - If feedback is necessary, provide it within the `feedback` field. If no feedback is needed, set `feedback` to an empty string (`""`).
-
-    6. **Required JSON Response Format (strict adherence):**
-    ```json
-    {{
-        "feedback": "<Your feedback here, or an empty string if no feedback is needed>"
-    }}
-    ```
-
-    7. **Important:**
-        - Your response must strictly match the format above, with only the `feedback` key in the JSON object. Do not include any extra text, explanations, or keys outside of the JSON block.
-        - Do not include nested keys.
-    """
+    return build_messages(
+        VALIDATE_OPTIONS_INSTRUCTIONS,
+        context,
+        [
+            reference_section(reference_material),
+            ("GM's Response (Scene and Options)", dm_prompt),
+        ],
+    )
 
 
-def revise_options_prompt(context, dm_response, feedback):
+def revise_options_prompt(context, dm_response, feedback) -> Messages:
     logger.debug("revise_options_prompt")
-    return f"""
-    You are the Game Master (GM) revising your previous response based on feedback. Retain the structure and content of your original response, but make specific adjustments to address the feedback provided.
-    
-    **Player Preferences and Character Details:**
-    {context}
-    
-    **Original GM Response:**
-    {dm_response}
-    
-    **Feedback to Address:**
-    {feedback}
-    
-    **Instructions:**
-    1. Keep your response as close to the original as possible.
-    2. Adjust the options only as needed to incorporate the feedback.
-    3. Ensure the options are consistent with the environmental context of the scene.
-    4. Maintain immersion by aligning actions with the game’s themeR.
-    5. **Always respond in JSON format with the following structure:**
-    ```json
-    {{
-        "response": "<Your revised narrative response here>"
-    }}
-    ```
-    6. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**
-    """
+    return build_messages(
+        REVISE_OPTIONS_INSTRUCTIONS,
+        context,
+        [("Original GM Response", dm_response), ("Feedback to Address", feedback)],
+    )
 
 
-def inform_invalid_action_prompt(context, storyline, user_input):
+def inform_invalid_action_prompt(context, storyline, user_input) -> Messages:
     logger.debug("inform_invalid_action_prompt")
-    return f"""
-    Provide feedback to the player about why their chosen action is invalid based on their abilities, class, or 5th Edition rules. Suggest alternative actions they could consider that are appropriate for their character.
-    
-    **Player Preferences and Character Details:**
-    {context}
-    
-    **Storyline:**
-    {storyline}
-    
-    **Player's Input (Chosen Action):**
-    {user_input}
-    
-    **Instructions:**
-    1. Briefly explain why the chosen action is not possible due to the character's abilities or 5th Edition rules.
-    2. Offer a few alternative actions the player could consider, suited to their abilities.
-    3. **Do not** consider the action's consistency with the scene or narrative context. Strictly evaluate its compliance with the rules.
-    4. **Respond in JSON format** with the following structure, using the key 'response' and no nested keys:
-    ```json
-    {{
-        "response": "<Your explanation and suggested actions here>"
-    }}
-    ```
-    5. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested keys.**
-    """
+    return build_messages(
+        INFORM_INVALID_ACTION_INSTRUCTIONS,
+        context,
+        [("Storyline", storyline), ("Player's Input (Chosen Action)", user_input)],
+    )
 
 
-def validate_player_action_prompt(context, dm_response, user_input):
+def validate_player_action_prompt(
+    context, dm_response, user_input, reference_material="", world_state=""
+) -> Messages:
     logger.debug("validate_player_action_prompt")
-    return f"""
-    Your task is to evaluate the player's chosen action and determine whether it is valid based on their character's abilities, class, and 5th Edition rules.
-    
-    **Player Preferences and Character Details:**
-    {context}
-    
-    **Current Conversation and Scene:**
-    {dm_response}
-    
-    **Player's Input (Chosen Action):**
-    {user_input}
-    
-    **Instructions:**
-    1. Determine if the player's action is valid for their character's class and abilities under 5th Edition rules.
-    2. Allow the player to have creative freedom provided they are in compliance with 5th edition rules.
-    3. Allow the player to ask questions of the GM.
-    4. If the action is **valid**, respond with JSON containing an empty string for feedback:
-    ```json
-    {{
-        "feedback": ""
-    }}
-    ```
-    5. If the action is **invalid** (e.g., the character attempts to use a spell or ability they do not have), respond with feedback explaining **why** the action is invalid and suggest a few alternative actions that are appropriate for their character.
-    6. When generating the list of alternative actions make sure to only use characters that are appropriate in  JSON format: (Replace * with -)
-    7. If the action is valid, but requires a skill check for success, then respond with feedback indicating such.
-    8. Don't forget to close a bracketed list with ] if you start one with [
-    9. Remember to always close your JSON response with a closing curly bracket
-    10. **Response Format:**
-    ```json
-    {{
-        "feedback": "<Your feedback here>"
-    }}
-    ```
-    11. **Do not include any text outside of the JSON block. Only provide the JSON response. Do not include nested 
-    keys.**
-    """
+    return build_messages(
+        VALIDATE_PLAYER_ACTION_INSTRUCTIONS,
+        context,
+        [
+            ("Current Conversation and Scene", dm_response),
+            world_state_section(world_state),
+            reference_section(reference_material),
+            ("Player's Input (Chosen Action)", user_input),
+        ],
+    )
 
 
-def format_feedback_prompt(expected_keys, previous_response):
+def extract_world_state_prompt(known_entities, user_input, gm_response) -> Messages:
+    logger.debug("extract_world_state_prompt")
+    return build_messages(
+        EXTRACT_WORLD_STATE_INSTRUCTIONS,
+        None,
+        [
+            ("Already Known Entities", known_entities or "None yet."),
+            ("Player Input", user_input),
+            ("GM Response", gm_response),
+        ],
+    )
+
+
+def adapt_opening_prompt(context, opening) -> Messages:
+    logger.debug("adapt_opening_prompt")
+    return build_messages(
+        ADAPT_OPENING_INSTRUCTIONS, context, [("Prepared Opening", opening)]
+    )
+
+
+def format_feedback_prompt(expected_keys, previous_response) -> Messages:
     logger.debug("format_feedback_prompt")
     # Generate JSON example with all expected keys
-    json_example = ",\n        ".join(
+    json_example = ",\n    ".join(
+        f'"{key}": "<original response without nested quotation marks>"'
+        for key in expected_keys
+    )
+    correct_example = ", ".join(
+        f'"{key}": "The guard eyes you warily and says, '
+        f"'Greetings, traveler.'\""
+        for key in expected_keys
+    )
+    return build_messages(
+        FORMAT_FEEDBACK_INSTRUCTIONS,
+        None,
         [
-            f'"{key}": "<original response without nested quotation marks>"'
-            for key in expected_keys
-        ]
+            ("Original GM Response", previous_response),
+            ("Keys", ", ".join(expected_keys)),
+            ("Required JSON Format", f"```json\n{{\n    {json_example}\n}}\n```"),
+            ("Correct JSON Example", f"```json\n{{\n    {correct_example}\n}}\n```"),
+        ],
     )
-
-    return f"""Your previous response did not meet the correct JSON format.
-
-    **Original GM Response:**
-    {previous_response}
-
-    **Instructions:**
-    1. Keep your response as close to the original as possible while correcting for proper JSON encoding.
-    2. Use exactly these keys: **{', '.join(expected_keys)}**.
-    3. **Each key must have a value**, even if it's an empty string ("").
-    4. **The value must be a single string**: avoid line breaks, use single quotes for nested dialogue (e.g., 'He said, Hello!'), and ensure no extra whitespace.
-    5. **Escape special characters properly**, including double quotes (\"), backslashes (\\), and newlines (\\n).
-    6. **Return only the JSON block** with the specified keys. Do not add explanations, additional keys, or any text outside the JSON block.
-    7. **Respond using the exact JSON format below**:
-
-    **Required JSON Format:**
-    ```json
-    {{
-        {json_example}
-    }}
-    ```
-
-    **Correct JSON Example**:
-    ```json
-    {{
-        {", ".join(['"{}": "The guard eyes you warily and says, \'Greetings, traveler.\'"'.format(key) for key in expected_keys])}
-    }}
-    ```
-    """
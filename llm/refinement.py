@@ -0,0 +1,101 @@
+# llm/refinement.py
+"""
+Progressive refinement of GM responses.
+
+In ``progressive`` mode a turn returns the DM's unvalidated draft as soon as
+it exists; validation and revision run afterwards in a background task. The
+client polls ``/turn_revision/<order>`` and swaps in the revised text, which
+also replaces the saved ``ConversationPair.gm_response``. The saved turn is
+flagged ``revision_pending`` until then, so any worker can answer the poll. A
+revision finished after the player has played a later turn is dropped: that
+turn was already answered from the draft.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from colorama import Fore, Style
+from dotenv import load_dotenv
+
+from llm.admission import mark_background
+from services.cache import TTLCache
+
+load_dotenv()
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# "blocking" validates before responding; "progressive" responds with the
+# draft and pushes the revision later
+REFINEMENT_MODE = os.getenv("REFINEMENT_MODE", "blocking")
+
+PENDING = "pending"
+DONE = "done"
+
+# Status of recent refinements by (game, turn order). Lost entries are fine:
+# the saved turn is the final text once no refinement is pending
+_refinements = TTLCache(maxsize=1024, ttl=15 * 60)
+# Keeps background refinement tasks referenced until they finish
+_pending: Set["asyncio.Task"] = set()
+
+
+def refinement_status(saved_game_id: int, order: int) -> Optional[Dict[str, Any]]:
+    """
+    :return: ``{"status": "pending"|"done", "gm_response": text}`` for a turn
+        refined by this process, or None
+    """
+    return _refinements.get((saved_game_id, order))
+
+
+def schedule_refinement(
+    saved_game_id: int,
+    order: int,
+    draft: str,
+    refine: Callable[[], Awaitable[str]],
+) -> None:
+    """
+    Refines a turn's draft in the background.
+
+    :param draft: The response already sent to the player
+    :param refine: Runs validation and revision and returns the final text
+    """
+    key = (saved_game_id, order)
+    _refinements.set(key, {"status": PENDING, "gm_response": draft})
+
+    async def run() -> None:
+        # The player already has the draft; their next turn goes first
+        mark_background()
+        # A failed refinement leaves the draft as the final text
+        final = draft
+        try:
+            final = await refine() or draft
+        finally:
+            _refinements.set(key, {"status": DONE, "gm_response": final})
+        if final != draft:
+            logger.info(
+                f"{Fore.GREEN}[REFINEMENT] Revised turn {order} of game "
+                f"{saved_game_id}\n{Style.RESET_ALL}"
+            )
+
+    task = asyncio.get_running_loop().create_task(run())
+    _pending.add(task)
+    task.add_done_callback(_refinement_done)
+
+
+def _refinement_done(task: "asyncio.Task") -> None:
+    _pending.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            f"{Fore.RED}[REFINEMENT] Refinement failed: "
+            f"{task.exception()}\n{Style.RESET_ALL}"
+        )
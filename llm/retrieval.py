@@ -0,0 +1,277 @@
+# llm/retrieval.py
+
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from colorama import Fore, Style
+from dotenv import load_dotenv
+
+from llm.agents import CHROMA_DB_PATH_DM, CHROMA_DB_PATH_ST, embedding_function
+from llm.keyword_index import KeywordIndex, get_keyword_index, reciprocal_rank_fusion
+from llm.vector_store import VectorStore, get_vector_store
+from services.cache import TTLCache
+
+load_dotenv()
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# Collections written by llm/pdf_processing.py
+DM_COLLECTION = "dm_actions"
+ST_COLLECTION = "story_descriptions"
+
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+# Retrieval is skipped for a turn if it cannot finish within this budget
+RETRIEVAL_BUDGET_MS = float(os.getenv("RETRIEVAL_BUDGET_MS", "300"))
+# Candidates taken from each of the vector and keyword rankings before fusion,
+# as a multiple of top_k
+HYBRID_CANDIDATES = 4
+
+RESULT_CACHE_SIZE = 512
+RESULT_CACHE_TTL = 15 * 60  # seconds
+SCENE_CACHE_SIZE = 4096
+
+# Retrieval results, keyed by (game, scene digest, query digest)
+_result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+# Latest GM response per game, so the query can include the current scene
+# without waiting for the storyline to load
+_scene_cache = TTLCache(maxsize=SCENE_CACHE_SIZE)
+
+
+# ============================
+# Data Classes
+# ============================
+
+
+@dataclass(frozen=True, slots=True)
+class RetrievedChunk:
+    text: str
+    source: str
+    page: Optional[int]
+    section: str
+    score: float  # Reciprocal-rank-fusion score; higher is better
+
+
+@dataclass(frozen=True, slots=True)
+class RetrievalResult:
+    """Top-k rulebook (DM) and storytelling (ST) chunks for one turn."""
+
+    rules: Tuple[RetrievedChunk, ...] = ()
+    lore: Tuple[RetrievedChunk, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.rules or self.lore)
+
+    def to_prompt(self) -> str:
+        """
+        Renders the chunks as a compact reference block for prompts.
+
+        :return: The block, or an empty string if nothing was retrieved
+        """
+        sections = []
+        for title, chunks in (("Rules", self.rules), ("Storytelling", self.lore)):
+            if chunks:
+                lines = "\n".join(f"- {_citation(c)} {c.text}" for c in chunks)
+                sections.append(f"{title}:\n{lines}")
+        return "\n\n".join(sections)
+
+
+NO_RESULTS = RetrievalResult()
+
+
+def _citation(chunk: RetrievedChunk) -> str:
+    where = chunk.source
+    if chunk.section:
+        where += f", {chunk.section}"
+    if chunk.page:
+        where += f", p. {chunk.page}"
+    return f"[{where}]"
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+# ============================
+# Scene Tracking
+# ============================
+
+
+def remember_scene(saved_game_id: int, gm_response: str) -> None:
+    """Records the latest GM response of a game as its current scene."""
+    _scene_cache.set(saved_game_id, gm_response)
+
+
+def forget_game(saved_game_id: int) -> None:
+    """Drops the scene and cached results of a game, e.g. after it is deleted."""
+    _scene_cache.pop(saved_game_id)
+    _result_cache.invalidate(lambda key, _: key[0] == saved_game_id)
+
+
+# ============================
+# Collection Queries
+# ============================
+
+
+def dm_store() -> VectorStore:
+    return get_vector_store(CHROMA_DB_PATH_DM, DM_COLLECTION, embedding_function)
+
+
+def st_store() -> VectorStore:
+    return get_vector_store(CHROMA_DB_PATH_ST, ST_COLLECTION, embedding_function)
+
+
+def dm_keywords() -> KeywordIndex:
+    return get_keyword_index(CHROMA_DB_PATH_DM, DM_COLLECTION)
+
+
+def st_keywords() -> KeywordIndex:
+    return get_keyword_index(CHROMA_DB_PATH_ST, ST_COLLECTION)
+
+
+def hybrid_search(
+    store: VectorStore,
+    keyword_index: KeywordIndex,
+    keyword_query: str,
+    query_embedding: List[float],
+    top_k: int,
+) -> Tuple[RetrievedChunk, ...]:
+    """
+    Fuses vector and BM25 rankings of one collection with reciprocal rank
+    fusion (blocking). Exact-term queries such as spell or skill names are
+    carried by BM25, paraphrases by the embeddings.
+
+    :return: Up to ``top_k`` chunks, best first; empty if nothing was ingested
+    """
+    candidates = top_k * HYBRID_CANDIDATES
+    vector_hits = store.query(query_embedding, candidates)
+    keyword_hits = keyword_index.search(keyword_query, candidates)
+    fused = reciprocal_rank_fusion(
+        [[hit.id for hit in vector_hits], [doc_id for doc_id, _ in keyword_hits]]
+    )[:top_k]
+
+    hits = {hit.id: hit for hit in vector_hits}
+    missing = [doc_id for doc_id, _ in fused if doc_id not in hits]
+    hits.update((hit.id, hit) for hit in store.get(missing))
+    return tuple(
+        RetrievedChunk(
+            text=hits[doc_id].document,
+            source=hits[doc_id].metadata.get("source", ""),
+            page=hits[doc_id].metadata.get("page"),
+            section=hits[doc_id].metadata.get("section", ""),
+            score=score,
+        )
+        for doc_id, score in fused
+        if doc_id in hits
+    )
+
+
+def build_query(user_input: str, scene: str) -> str:
+    # The end of the scene holds the options the player is answering
+    return f"{scene[-500:]}\n{user_input}".strip()
+
+
+async def _retrieve(
+    cache_key: Tuple[Any, ...], query: str, user_input: str, top_k: int
+):
+    # Embed once and reuse the vector for both collections
+    (query_embedding,) = await asyncio.to_thread(embedding_function, [query])
+    # Keyword search uses the player's own words; the scene would drown them
+    rules, lore = await asyncio.gather(
+        asyncio.to_thread(
+            hybrid_search, dm_store(), dm_keywords(), user_input, query_embedding, top_k
+        ),
+        asyncio.to_thread(
+            hybrid_search, st_store(), st_keywords(), user_input, query_embedding, top_k
+        ),
+    )
+    result = RetrievalResult(rules=rules, lore=lore)
+    _result_cache.set(cache_key, result)
+    return result
+
+
+def _cache_key(saved_game_id: int, user_input: str, top_k: int) -> Tuple[Any, ...]:
+    scene = _scene_cache.get(saved_game_id, "")
+    return saved_game_id, _digest(scene), _digest(user_input), top_k
+
+
+def peek_context(
+    saved_game_id: int, user_input: str, top_k: int = RETRIEVAL_TOP_K
+) -> RetrievalResult:
+    """
+    Returns the cached result for a turn without querying, e.g. for validators
+    running after a retrieval that missed its budget finished in the background.
+    """
+    return _result_cache.get(_cache_key(saved_game_id, user_input, top_k), NO_RESULTS)
+
+
+async def retrieve_context(
+    saved_game_id: int,
+    user_input: str,
+    top_k: int = RETRIEVAL_TOP_K,
+    budget_ms: float = RETRIEVAL_BUDGET_MS,
+) -> RetrievalResult:
+    """
+    Retrieves reference chunks for a turn from the DM and storyteller collections.
+
+    Both collections are queried concurrently off the event loop, each with
+    hybrid vector + BM25 search. If the budget runs out the turn proceeds
+    without reference material; the query keeps running in the background and
+    still fills the cache for the validators and later turns.
+
+    :param saved_game_id: The game being played
+    :param user_input: The player's input for this turn
+    :param top_k: Chunks taken from each collection
+    :param budget_ms: Latency budget in milliseconds
+    :return: The retrieved chunks, or ``NO_RESULTS`` on timeout or error
+    """
+    query = build_query(user_input, _scene_cache.get(saved_game_id, ""))
+    if not query:
+        return NO_RESULTS
+    cache_key = _cache_key(saved_game_id, user_input, top_k)
+    cached = _result_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"{Fore.GREEN}[RETRIEVAL] Cache hit\n{Style.RESET_ALL}")
+        return cached
+
+    task = asyncio.ensure_future(_retrieve(cache_key, query, user_input, top_k))
+    try:
+        # shield() lets the query finish (and be cached) after a timeout
+        result = await asyncio.wait_for(asyncio.shield(task), budget_ms / 1000)
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"{Fore.YELLOW}[RETRIEVAL] Exceeded {budget_ms:.0f} ms budget, "
+            f"continuing without reference material\n{Style.RESET_ALL}"
+        )
+        task.add_done_callback(_log_background_failure)
+        return NO_RESULTS
+    except Exception as e:
+        logger.error(f"{Fore.RED}[RETRIEVAL] Failed: {e}\n{Style.RESET_ALL}")
+        return NO_RESULTS
+
+    logger.info(
+        f"{Fore.GREEN}[RETRIEVAL] {len(result.rules)} rule and {len(result.lore)} "
+        f"storytelling chunks\n{Style.RESET_ALL}"
+    )
+    return result
+
+
+def _log_background_failure(task: "asyncio.Future[RetrievalResult]") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            f"{Fore.RED}[RETRIEVAL] Background query failed: "
+            f"{task.exception()}\n{Style.RESET_ALL}"
+        )
+
@@ -0,0 +1,350 @@
+# llm/speculation.py
+"""
+Speculative pre-generation of the GM's answer to the options it offered.
+
+After a turn is saved, the options numbered 1, 2, 3... at the end of the GM
+response are extracted and, while no turn is being generated, the DM drafts
+its continuation for the first ``SPECULATION_TOP_N`` of them; a response
+whose numbering is not a contiguous run from 1 is not speculated on. When
+the player's next input picks one of them (its number, its text, or a close
+paraphrase by embedding similarity) the prepared draft replaces the
+narration call. Any other input cancels the speculation.
+
+Speculative drafts run one at a time by default (``SPECULATION_CONCURRENCY``)
+and only while the process has no foreground turn in flight. A cancelled
+draft stops waiting at once, but a model request already sent finishes in its
+worker thread.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import numpy as np
+from colorama import Fore, Style
+from dotenv import load_dotenv
+
+from llm.admission import mark_background
+from llm.agents import embedding_function
+from services.cache import TTLCache
+
+load_dotenv()
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# Options drafted ahead per turn; 0 turns speculation off
+SPECULATION_TOP_N = int(os.getenv("SPECULATION_TOP_N", "0"))
+# Speculative drafts generated at the same time, across all games
+SPECULATION_CONCURRENCY = int(os.getenv("SPECULATION_CONCURRENCY", "1"))
+# Cosine similarity above which an input counts as choosing an option
+SPECULATION_MATCH_THRESHOLD = float(os.getenv("SPECULATION_MATCH_THRESHOLD", "0.8"))
+
+# Speculations older than this are dropped with the game's entry
+SPECULATION_TTL = 10 * 60  # seconds
+
+# The marker of a numbered option: "1. Ask the guard", "2) Follow the tracks"
+OPTION_MARKER = re.compile(r"(?:^|(?<=\s))(\d{1,2})[.)]\s+")
+# Where the last option ends: its first sentence end or line break
+OPTION_END = re.compile(r"(?<=[.!?])\s|\n")
+# "2", "option 2", "#2"
+CHOICE_PATTERN = re.compile(r"^(?:option\s*|#)?(\d{1,2})[.)]?$", re.I)
+
+_games = TTLCache(maxsize=1024, ttl=SPECULATION_TTL)
+# How to draft the DM's response for each game, set by its latest turn
+_generators = TTLCache(maxsize=1024, ttl=SPECULATION_TTL)
+_slots: Optional[asyncio.Semaphore] = None
+_idle: Optional[asyncio.Event] = None
+_foreground = 0
+_counts = Counter()
+# Keeps speculation tasks referenced until they finish
+_pending: Set["asyncio.Task"] = set()
+
+Generate = Callable[[str], Awaitable[str]]
+
+
+def extract_options(gm_response: str) -> Dict[int, str]:
+    """
+    Finds the options a GM response ends with: the last run of items
+    numbered 1, 2, 3... Any other number inside the run ("you roll a 15.")
+    means the numbering cannot be trusted. The last option ends at its first
+    sentence end or line break, before a closing "What will you do?".
+
+    :return: Option text by its printed number, or an empty dict
+    """
+    text = gm_response.strip()
+    markers = list(OPTION_MARKER.finditer(text))
+    starts = [i for i, marker in enumerate(markers) if marker.group(1) == "1"]
+    if not starts:
+        return {}
+    run = markers[starts[-1]:]
+    if [int(marker.group(1)) for marker in run] != list(range(1, len(run) + 1)):
+        return {}
+    options = {}
+    for position, marker in enumerate(run):
+        if position + 1 < len(run):
+            option = text[marker.end():run[position + 1].start()]
+        else:
+            option = OPTION_END.split(text[marker.end():], 1)[0]
+        option = option.strip().rstrip(".;,")
+        if not 3 <= len(option) <= 200:
+            return {}
+        options[position + 1] = option
+    return options if len(options) >= 2 else {}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9 ]", "", text.lower()).strip()
+
+
+# ============================
+# Foreground Turns
+# ============================
+
+
+def _events():
+    # Created lazily, inside the running event loop
+    global _slots, _idle
+    if _slots is None:
+        _slots = asyncio.Semaphore(SPECULATION_CONCURRENCY)
+        _idle = asyncio.Event()
+        _idle.set()
+    return _slots, _idle
+
+
+def begin_foreground() -> None:
+    """Marks a player's turn as in flight; speculation waits until none are."""
+    global _foreground
+    _foreground += 1
+    _events()[1].clear()
+
+
+def end_foreground() -> None:
+    global _foreground
+    _foreground = max(_foreground - 1, 0)
+    if _foreground == 0:
+        _events()[1].set()
+
+
+async def wait_idle() -> None:
+    """Waits until no player's turn is being generated."""
+    await _events()[1].wait()
+
+
+# ============================
+# Speculation
+# ============================
+
+
+class GameSpeculation:
+    """The options drafted ahead after one turn of a game."""
+
+    def __init__(self, turn: int, options: Dict[int, str]):
+        self.turn = turn
+        # Option text by printed number
+        self.options = options
+        self.vectors: Optional[np.ndarray] = None
+        self.tasks: Dict[int, "asyncio.Task"] = {}
+        # Numbers of the options whose draft got a slot and reached the model
+        self.started: Set[int] = set()
+
+    def cancel(self, keep: Optional[int] = None) -> None:
+        for number, task in self.tasks.items():
+            if number == keep:
+                continue
+            if not task.done():
+                task.cancel()
+                _counts["cancelled"] += 1
+            elif not task.cancelled() and task.exception() is None:
+                _counts["wasted"] += 1
+
+    def match(self, user_input: str) -> Optional[int]:
+        """
+        :return: Printed number of the speculated option the input picks, or
+            None
+        """
+        choice = CHOICE_PATTERN.match(user_input.strip())
+        if choice:
+            number = int(choice.group(1))
+            return number if number in self.options else None
+        normalized = _normalize(user_input)
+        for number, option in self.options.items():
+            if normalized == _normalize(option):
+                return number
+        if self.vectors is None:
+            return None
+        (query,) = embedding_function([user_input])
+        query = np.asarray(query, dtype=np.float32)
+        scores = self.vectors @ (query / (np.linalg.norm(query) or 1.0))
+        best = int(np.argmax(scores))
+        if scores[best] < SPECULATION_MATCH_THRESHOLD:
+            return None
+        # Vectors are in the options' order
+        return list(self.options)[best]
+
+
+async def _draft(
+    speculation: GameSpeculation, number: int, generate: Generate
+) -> str:
+    mark_background()
+    slots, idle = _events()
+    async with slots:
+        # Low priority: start only while no player's turn is being generated
+        await idle.wait()
+        speculation.started.add(number)
+        _counts["started"] += 1
+        return await generate(speculation.options[number])
+
+
+def _embed_options(options: List[str]) -> np.ndarray:
+    vectors = np.asarray(embedding_function(options), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+async def _embed(speculation: GameSpeculation) -> None:
+    # Until the options are embedded, only numbers and exact text match
+    try:
+        speculation.vectors = await asyncio.to_thread(
+            _embed_options, list(speculation.options.values())
+        )
+    except Exception as e:
+        logger.error(
+            f"{Fore.RED}[SPECULATION] Embedding options failed: {e}\n{Style.RESET_ALL}"
+        )
+
+
+def _track(task: "asyncio.Task") -> "asyncio.Task":
+    _pending.add(task)
+    task.add_done_callback(_task_done)
+    return task
+
+
+def _task_done(task: "asyncio.Task") -> None:
+    _pending.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            f"{Fore.RED}[SPECULATION] Draft failed: {task.exception()}\n"
+            f"{Style.RESET_ALL}"
+        )
+
+
+def register_generator(saved_game_id: int, generate: Generate) -> None:
+    """
+    Sets how the game's options are drafted: the DM's response to an input,
+    with the campaign context and agents of the game's latest turn.
+    """
+    if SPECULATION_TOP_N > 0:
+        _generators.set(saved_game_id, generate)
+
+
+def schedule_speculation(saved_game_id: int, turn: int, gm_response: str) -> None:
+    """
+    Drafts the continuations of the options a saved turn offers, replacing
+    any earlier speculation for the game. Outside an event loop, with
+    speculation turned off or without a registered generator, nothing
+    happens.
+
+    :param turn: Order of the saved turn
+    """
+    generate = _generators.get(saved_game_id)
+    if SPECULATION_TOP_N <= 0 or generate is None:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    previous = _games.get(saved_game_id)
+    if previous is not None:
+        previous.cancel()
+    options = {
+        number: option
+        for number, option in extract_options(gm_response).items()
+        if number <= SPECULATION_TOP_N
+    }
+    if not options:
+        _games.pop(saved_game_id)
+        return
+    speculation = GameSpeculation(turn, options)
+    _games.set(saved_game_id, speculation)
+    _track(asyncio.create_task(_embed(speculation)))
+    for number in options:
+        speculation.tasks[number] = _track(
+            asyncio.create_task(_draft(speculation, number, generate))
+        )
+    logger.info(
+        f"{Fore.CYAN}[SPECULATION] Drafting {len(options)} options after turn "
+        f"{turn} of game {saved_game_id}\n{Style.RESET_ALL}"
+    )
+
+
+async def claim_speculation(
+    saved_game_id: int, turn: int, user_input: str
+) -> Optional[str]:
+    """
+    Takes the prepared draft for the player's input, if the input picks one
+    of the options speculated after ``turn``, and cancels the others.
+
+    :param turn: Order of the latest saved turn of the game
+    :return: The drafted GM response, or None
+    """
+    speculation = _games.pop(saved_game_id)
+    if speculation is None:
+        return None
+    if speculation.turn != turn:
+        speculation.cancel()
+        return None
+    try:
+        number = await asyncio.to_thread(speculation.match, user_input)
+    except Exception as e:
+        logger.error(f"{Fore.RED}[SPECULATION] Matching failed: {e}\n{Style.RESET_ALL}")
+        number = None
+    task = speculation.tasks.get(number) if number is not None else None
+    if task is not None and not task.done() and number not in speculation.started:
+        # Still queued: it would wait for this very turn to finish
+        task = None
+    speculation.cancel(keep=number if task is not None else None)
+    if task is None or task.cancelled():
+        _counts["misses"] += 1
+        return None
+    try:
+        # An unfinished draft is already ahead of a fresh narration call
+        response = await task
+    except Exception as e:
+        logger.error(f"{Fore.RED}[SPECULATION] Draft failed: {e}\n{Style.RESET_ALL}")
+        _counts["misses"] += 1
+        return None
+    _counts["hits"] += 1
+    logger.info(
+        f"{Fore.GREEN}[SPECULATION] Serving the draft for option {number} of "
+        f"game {saved_game_id}\n{Style.RESET_ALL}"
+    )
+    return response or None
+
+
+def forget_speculation(saved_game_id: int) -> None:
+    """Cancels and drops a game's speculation, e.g. after it is deleted."""
+    speculation = _games.pop(saved_game_id)
+    if speculation is not None:
+        speculation.cancel()
+    _generators.pop(saved_game_id)
+
+
+def snapshot() -> Dict[str, int]:
+    """
+    :return: Drafts started, cancelled and finished unused (wasted), and
+        claims that hit or missed
+    """
+    keys = ("started", "cancelled", "wasted", "hits", "misses")
+    return {key: _counts[key] for key in keys}
@@ -0,0 +1,157 @@
+# llm/turn_budget.py
+"""
+Deadline-aware scheduling of the optional stages of a turn.
+
+A turn always produces a draft; validating and revising it is worth doing
+only while the player's wait stays near ``TURN_BUDGET_S``. Before each
+optional stage the scheduler compares the time left with what that stage
+usually takes (the median latency of its tier, from ``llm_metrics``) and
+skips it, or cuts its format retries, when it would overrun. Skipped stages
+are logged and counted for ``/metrics``.
+
+The budget is off by default, so every turn is validated; setting
+``TURN_BUDGET_S`` trades validation for latency.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+from colorama import Fore, Style
+from dotenv import load_dotenv
+
+from llm.llm_config import CLASSIFICATION, NARRATION, VALIDATION
+from llm.llm_metrics import tier_latency
+
+load_dotenv()
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# Target seconds per turn; 0 (the default) runs every stage regardless of time
+TURN_BUDGET_S = float(os.getenv("TURN_BUDGET_S", "0"))
+
+# Assumed call latency of a tier until it has made calls in this process
+DEFAULT_CALL_ESTIMATE_S = {NARRATION: 4.0, VALIDATION: 1.5, CLASSIFICATION: 0.5}
+
+# Optional stages, in the order a turn runs them
+STORYLINE_VALIDATION = "storyline_validation"
+STORYLINE_REVISION = "storyline_revision"
+OPTIONS_VALIDATION = "options_validation"
+OPTIONS_REVISION = "options_revision"
+
+_lock = threading.Lock()
+_stage_counts: Dict[str, Counter] = {}
+_turns = Counter()
+
+
+def estimate(tier: str) -> float:
+    latency = tier_latency(tier)
+    return DEFAULT_CALL_ESTIMATE_S[tier] if latency is None else latency
+
+
+# ============================
+# Per-turn Budget
+# ============================
+
+
+class TurnBudget:
+    """The time left for one turn and the stages it ran or skipped."""
+
+    def __init__(
+        self,
+        budget_s: float = TURN_BUDGET_S,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.budget_s = budget_s
+        self._timer = timer
+        self._start = timer()
+        self.ran: List[str] = []
+        self.skipped: List[str] = []
+        self.shortened: List[str] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_s > 0
+
+    def elapsed(self) -> float:
+        return self._timer() - self._start
+
+    def remaining(self) -> float:
+        return self.budget_s - self.elapsed()
+
+    def allows(self, stage: str, tier: str) -> bool:
+        """
+        Decides whether an optional stage fits in the time left and records
+        the decision.
+
+        :param stage: Stage name, e.g. ``STORYLINE_VALIDATION``
+        :param tier: Tier of the call the stage makes
+        """
+        if self.enabled and self.remaining() < estimate(tier):
+            self.skipped.append(stage)
+            logger.info(
+                f"{Fore.YELLOW}[TURN BUDGET] Skipping {stage}: "
+                f"{max(self.remaining(), 0):.1f}s left, ~{estimate(tier):.1f}s "
+                f"needed\n{Style.RESET_ALL}"
+            )
+            return False
+        self.ran.append(stage)
+        return True
+
+    def retries(self, stage: str, tier: str, max_retries: int) -> int:
+        """
+        Format retries a stage may use. Each retry costs about two calls, so
+        a stage without time for one gets a single attempt.
+        """
+        if self.enabled and self.remaining() < 3 * estimate(tier):
+            if max_retries > 1:
+                self.shortened.append(stage)
+            return 1
+        return max_retries
+
+    def finish(self) -> None:
+        """Logs the turn's schedule and adds it to the counters."""
+        elapsed = self.elapsed()
+        with _lock:
+            _turns["turns"] += 1
+            if self.enabled and elapsed > self.budget_s:
+                _turns["over_budget"] += 1
+            for outcome, stages in (
+                ("ran", self.ran),
+                ("skipped", self.skipped),
+                ("shortened", self.shortened),
+            ):
+                for stage in stages:
+                    _stage_counts.setdefault(stage, Counter())[outcome] += 1
+        if self.skipped or self.shortened:
+            logger.info(
+                f"{Fore.YELLOW}[TURN BUDGET] Turn took {elapsed:.1f}s of "
+                f"{self.budget_s:.1f}s; skipped: {', '.join(self.skipped) or 'none'}; "
+                f"shortened: {', '.join(self.shortened) or 'none'}\n{Style.RESET_ALL}"
+            )
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    :return: Turn counts and how often each optional stage ran, was skipped
+        or was shortened
+    """
+    with _lock:
+        return {
+            "budget_s": TURN_BUDGET_S,
+            "turns": _turns["turns"],
+            "over_budget": _turns["over_budget"],
+            "stages": {stage: dict(counts) for stage, counts in _stage_counts.items()},
+        }
@@ -0,0 +1,252 @@
+# llm/turn_memory.py
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, List, Sequence, Set
+
+import numpy as np
+from colorama import Fore, Style
+from dotenv import load_dotenv
+
+from llm.agents import embedding_function
+from services.cache import TTLCache
+
+load_dotenv()
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# Past turns recalled by relevance to the player's input
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "4"))
+# Latest turns always included, in order, so the current scene is intact
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "6"))
+# Latest turns shown to validators that also get the game's world state
+VALIDATION_RECENT_TURNS = 2
+
+# Characters of the GM response embedded with each turn; MiniLM truncates
+# long inputs anyway and the opening of a response names the scene
+TURN_EMBED_CHARS = 1000
+
+MEMORY_CACHE_SIZE = 512
+MEMORY_CACHE_TTL = 60 * 60  # seconds
+
+# Per-game turn indexes. The database and the on-disk embedding cache are the
+# source of truth, so an evicted or never-loaded index is rebuilt cheaply
+_memories = TTLCache(maxsize=MEMORY_CACHE_SIZE, ttl=MEMORY_CACHE_TTL)
+# Keeps background indexing tasks referenced until they finish
+_pending: Set["asyncio.Task"] = set()
+
+
+def turn_text(user_input: str, gm_response: str) -> str:
+    return f"User: {user_input}\nGM: {gm_response[:TURN_EMBED_CHARS]}"
+
+
+def format_turn(pair) -> str:
+    return f"User: {pair.user_input}\nGM: {pair.gm_response}"
+
+
+# ============================
+# Per-game Index
+# ============================
+
+
+class GameMemory:
+    """Embeddings of the turns of one game, keyed by turn order."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders: List[int] = []
+        self._rows: Dict[int, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def __contains__(self, order: int) -> bool:
+        return order in self._rows
+
+    def add(self, orders: Sequence[int], vectors: Sequence) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        with self._lock:
+            fresh = [i for i, order in enumerate(orders) if order not in self._rows]
+            if not fresh:
+                return
+            if not self._orders:
+                self._matrix = vectors[fresh]
+            else:
+                self._matrix = np.vstack([self._matrix, vectors[fresh]])
+            for i in fresh:
+                self._rows[orders[i]] = len(self._orders)
+                self._orders.append(orders[i])
+
+    def search(self, query_vector, top_k: int, exclude: Set[int]) -> List[int]:
+        """
+        :return: Orders of up to ``top_k`` most similar turns, best first
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self._lock:
+            if not self._orders:
+                return []
+            scores = self._matrix @ query
+            ranked = np.argsort(-scores)
+            orders = self._orders
+        picked = []
+        for row in ranked:
+            if orders[row] not in exclude:
+                picked.append(orders[row])
+                if len(picked) == top_k:
+                    break
+        return picked
+
+
+def _memory(saved_game_id: int) -> GameMemory:
+    memory = _memories.get(saved_game_id)
+    if memory is None:
+        memory = GameMemory()
+        _memories.set(saved_game_id, memory)
+    return memory
+
+
+def index_turns(saved_game_id: int, turns: Sequence) -> None:
+    """
+    Embeds and indexes turns of a game that are not indexed yet (blocking).
+
+    :param turns: ``ConversationPair`` rows or (order, user_input, gm_response)
+    """
+    memory = _memory(saved_game_id)
+    fresh = []
+    for turn in turns:
+        if isinstance(turn, tuple):
+            order, user_input, gm_response = turn
+        else:
+            order, user_input, gm_response = (
+                turn.order,
+                turn.user_input,
+                turn.gm_response,
+            )
+        if order not in memory:
+            fresh.append((order, turn_text(user_input, gm_response)))
+    if fresh:
+        vectors = embedding_function([text for _, text in fresh])
+        memory.add([order for order, _ in fresh], vectors)
+
+
+def schedule_index_turn(
+    saved_game_id: int, order: int, user_input: str, gm_response: str
+) -> None:
+    """
+    Indexes a saved turn in the background so the response is not delayed.
+    Called outside an event loop, the turn is indexed lazily on next recall.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(
+        asyncio.to_thread(
+            index_turns, saved_game_id, [(order, user_input, gm_response)]
+        )
+    )
+    _pending.add(task)
+    task.add_done_callback(_index_done)
+
+
+def _index_done(task: "asyncio.Task") -> None:
+    _pending.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            f"{Fore.RED}[MEMORY] Indexing turn failed: "
+            f"{task.exception()}\n{Style.RESET_ALL}"
+        )
+
+
+def forget_turns(saved_game_id: int) -> None:
+    """Drops the turn index of a game, e.g. after it is deleted."""
+    _memories.pop(saved_game_id)
+
+
+# ============================
+# Recall
+# ============================
+
+
+def recall_turns(
+    saved_game_id: int,
+    conversation_pairs: Sequence,
+    user_input: str,
+    top_k: int = MEMORY_TOP_K,
+    recent: int = MEMORY_RECENT_TURNS,
+) -> List:
+    """
+    Selects the turns worth showing the model (blocking): the ``recent``
+    latest turns plus the ``top_k`` earlier turns most similar to the input.
+
+    :param conversation_pairs: All turns of the game, in order
+    :return: The selected turns, in order
+    """
+    if len(conversation_pairs) <= top_k + recent:
+        return list(conversation_pairs)
+    earlier = conversation_pairs[: len(conversation_pairs) - recent]
+    latest = conversation_pairs[len(conversation_pairs) - recent :]
+
+    # Backfills turns saved by other workers or before a restart
+    index_turns(saved_game_id, earlier)
+    (query_vector,) = embedding_function([user_input])
+    exclude = {pair.order for pair in latest}
+    recalled = set(_memory(saved_game_id).search(query_vector, top_k, exclude))
+    return [pair for pair in earlier if pair.order in recalled] + list(latest)
+
+
+def format_storyline(selected: Sequence, total: int) -> str:
+    """Renders selected turns, marking where earlier turns were left out."""
+    lines = []
+    previous = 0
+    for pair in selected:
+        if pair.order > previous + 1:
+            lines.append(f"[... {pair.order - previous - 1} earlier turns omitted ...]")
+        lines.append(format_turn(pair))
+        previous = pair.order
+    if total > previous:
+        lines.append(f"[... {total - previous} turns omitted ...]")
+    return "\n".join(lines)
+
+
+def recent_storyline(
+    conversation_pairs: Sequence, turns: int = VALIDATION_RECENT_TURNS
+) -> str:
+    """Renders only the latest turns of a game."""
+    return format_storyline(conversation_pairs[-turns:], len(conversation_pairs))
+
+
+async def relevant_storyline(
+    saved_game_id: int, conversation_pairs: Sequence, user_input: str
+) -> str:
+    """
+    Builds the storyline for a prompt from the turns most relevant to the
+    player's input plus the latest turns, instead of the whole history.
+
+    Falls back to the latest turns alone if recall fails.
+    """
+    try:
+        selected = await asyncio.to_thread(
+            recall_turns, saved_game_id, conversation_pairs, user_input
+        )
+    except Exception as e:
+        logger.error(f"{Fore.RED}[MEMORY] Recall failed: {e}\n{Style.RESET_ALL}")
+        selected = list(conversation_pairs[-MEMORY_RECENT_TURNS:])
+    if len(selected) < len(conversation_pairs):
+        logger.info(
+            f"{Fore.GREEN}[MEMORY] Using {len(selected)} of "
+            f"{len(conversation_pairs)} turns\n{Style.RESET_ALL}"
+        )
+    return format_storyline(selected, len(conversation_pairs))
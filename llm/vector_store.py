@@ -0,0 +1,410 @@
+# llm/vector_store.py
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ============================
+# Constants
+# ============================
+
+# "chroma" (default), "numpy", or "numpy-int8" for int8-quantized vectors
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+
+NUMPY_STORE_SUFFIX = ".npstore"
+VECTORS_FILENAME = "vectors.npy"
+SCALES_FILENAME = "scales.npy"
+RECORDS_FILENAME = "records.json"
+
+
+@dataclass(frozen=True, slots=True)
+class VectorHit:
+    id: str
+    document: str
+    metadata: Dict[str, Any]
+    distance: float
+
+
+# ============================
+# Interface
+# ============================
+
+
+class VectorStore(ABC):
+    """
+    Minimal vector-store interface used by ingestion and retrieval.
+
+    Writers pass precomputed embeddings; queries take a query embedding, so
+    stores never load an embedding model themselves.
+    """
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Sequence,
+    ) -> None: ...
+
+    @abstractmethod
+    def delete(self, where: Dict[str, Any]) -> None:
+        """Deletes every record whose metadata matches all ``where`` items."""
+
+    @abstractmethod
+    def query(self, query_embedding: Sequence[float], top_k: int) -> List[VectorHit]:
+        """Returns up to ``top_k`` hits, nearest first."""
+
+    @abstractmethod
+    def get(self, ids: Sequence[str]) -> List[VectorHit]:
+        """Fetches records by id (missing ids are skipped); distances are NaN."""
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+    def persist(self) -> None:
+        """Makes previous writes durable and visible to other processes."""
+
+
+# ============================
+# Chroma Backend
+# ============================
+
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, path: str, collection_name: str, embedding_function=None):
+        self.path = path
+        self.collection_name = collection_name
+        self.embedding_function = embedding_function
+        self._collection = None
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        # chromadb is imported and the client opened on first use only
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    import chromadb
+
+                    client = chromadb.PersistentClient(path=self.path)
+                    self._collection = client.get_or_create_collection(
+                        name=self.collection_name,
+                        embedding_function=self.embedding_function,
+                    )
+        return self._collection
+
+    def upsert(self, ids, documents, metadatas, embeddings) -> None:
+        self.collection.upsert(
+            ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings
+        )
+
+    def delete(self, where: Dict[str, Any]) -> None:
+        self.collection.delete(where=where)
+
+    def query(self, query_embedding, top_k: int) -> List[VectorHit]:
+        if top_k <= 0:
+            return []
+        result = self.collection.query(
+            query_embeddings=[list(query_embedding)],
+            n_results=top_k,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            VectorHit(id_, document, metadata or {}, distance)
+            for id_, document, metadata, distance in zip(
+                result["ids"][0],
+                result["documents"][0],
+                result["metadatas"][0],
+                result["distances"][0],
+            )
+        ]
+
+    def get(self, ids: Sequence[str]) -> List[VectorHit]:
+        if not ids:
+            return []
+        result = self.collection.get(ids=list(ids), include=["documents", "metadatas"])
+        found = {
+            id_: VectorHit(id_, document, metadata or {}, float("nan"))
+            for id_, document, metadata in zip(
+                result["ids"], result["documents"], result["metadatas"]
+            )
+        }
+        return [found[id_] for id_ in ids if id_ in found]
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+# ============================
+# NumPy Backend
+# ============================
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _quantize(matrix: np.ndarray):
+    # Symmetric per-row int8: row ~= int8_row * scale
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process exact cosine search over a memory-mapped ``.npy`` matrix.
+
+    Vectors are L2-normalized on write, so a query is one matrix-vector
+    product followed by ``np.argpartition`` for the top k. With ``quantize``
+    the matrix is stored as int8 with a float32 scale per row, a quarter of
+    the float32 size.
+
+    Writes are buffered in memory (and already searchable) until
+    ``persist()``, which compacts deleted rows away and atomically replaces
+    the files. Other processes pick up the new files on their next query.
+    """
+
+    def __init__(self, path: str, collection_name: str, quantize: bool = False):
+        name = collection_name + (".int8" if quantize else "")
+        self.dir = os.path.join(path, name + NUMPY_STORE_SUFFIX)
+        self.quantize = quantize
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._load()
+
+    # Files
+
+    def _records_path(self) -> str:
+        return os.path.join(self.dir, RECORDS_FILENAME)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self._records_path())
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._stamp = self._file_stamp()
+        if self._stamp is not None:
+            with open(self._records_path(), "r", encoding="utf-8") as f:
+                records = json.load(f)
+            self._ids = records["ids"]
+            self._documents = records["documents"]
+            self._metadatas = records["metadatas"]
+            if self._ids:
+                self._vectors = np.load(
+                    os.path.join(self.dir, VECTORS_FILENAME), mmap_mode="r"
+                )
+                if self._vectors.dtype == np.int8:
+                    self._scales = np.load(os.path.join(self.dir, SCALES_FILENAME))
+        self._live = np.ones(len(self._ids), dtype=bool)
+        self._row_of = {id_: row for row, id_ in enumerate(self._ids)}
+        # Rows written since the last persist(), searched alongside the matrix;
+        # row numbers continue after the stored rows
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_live: List[bool] = []
+        self._pending_matrix: Optional[np.ndarray] = None
+
+    def _dirty(self) -> bool:
+        return bool(self._pending_vectors) or not self._live.all()
+
+    def _maybe_reload(self) -> None:
+        # Another process persisted; unpersisted local writes take precedence
+        if not self._dirty() and self._file_stamp() != self._stamp:
+            self._load()
+
+    def persist(self) -> None:
+        with self._lock:
+            if not self._dirty():
+                return
+            stored = len(self._live)
+            keep = [row for row in range(stored) if self._live[row]] + [
+                stored + i for i, live in enumerate(self._pending_live) if live
+            ]
+            matrix = self._stored_matrix()
+            if self._pending_vectors:
+                pending = np.vstack(self._pending_vectors)
+                matrix = pending if matrix is None else np.vstack([matrix, pending])
+            vectors = matrix[keep] if keep else np.zeros((0, 0), np.float32)
+            records = {
+                "ids": [self._ids[row] for row in keep],
+                "documents": [self._documents[row] for row in keep],
+                "metadatas": [self._metadatas[row] for row in keep],
+            }
+
+            os.makedirs(self.dir, exist_ok=True)
+            if self.quantize and len(vectors):
+                vectors, scales = _quantize(vectors)
+                self._save_array(SCALES_FILENAME, scales)
+            self._save_array(VECTORS_FILENAME, vectors)
+            # The records file is replaced last; readers key reloads off it
+            tmp_path = self._records_path() + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f)
+            os.replace(tmp_path, self._records_path())
+            self._load()
+
+    def _save_array(self, filename: str, array: np.ndarray) -> None:
+        tmp_path = os.path.join(self.dir, filename + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(self.dir, filename))
+
+    def _stored_matrix(self) -> Optional[np.ndarray]:
+        # Persisted rows as float32 (dequantized when stored as int8)
+        if self._vectors is None:
+            return None
+        if self._scales is not None:
+            return self._vectors.astype(np.float32) * self._scales[:, None]
+        return np.asarray(self._vectors)
+
+    # Writes
+
+    def upsert(self, ids, documents, metadatas, embeddings) -> None:
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            self._maybe_reload()
+            for id_, document, metadata, vector in zip(
+                ids, documents, metadatas, vectors
+            ):
+                row = self._row_of.get(id_)
+                if row is not None:
+                    self._drop(row)
+                self._row_of[id_] = len(self._ids)
+                self._ids.append(id_)
+                self._documents.append(document)
+                self._metadatas.append(dict(metadata or {}))
+                self._pending_vectors.append(vector)
+                self._pending_live.append(True)
+            self._pending_matrix = None
+
+    def delete(self, where: Dict[str, Any]) -> None:
+        with self._lock:
+            self._maybe_reload()
+            for id_, row in list(self._row_of.items()):
+                metadata = self._metadatas[row]
+                if all(metadata.get(k) == v for k, v in where.items()):
+                    self._drop(row)
+
+    def _drop(self, row: int) -> None:
+        stored = len(self._live)
+        if row < stored:
+            self._live[row] = False
+        else:
+            self._pending_live[row - stored] = False
+        del self._row_of[self._ids[row]]
+
+    # Reads
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        parts = []
+        if self._vectors is not None and len(self._live):
+            scores = self._vectors @ query
+            if self._scales is not None:
+                scores = scores * self._scales
+            parts.append(np.where(self._live, scores, -np.inf))
+        if self._pending_vectors:
+            if self._pending_matrix is None:
+                self._pending_matrix = np.vstack(self._pending_vectors)
+            scores = self._pending_matrix @ query
+            parts.append(np.where(self._pending_live, scores, -np.inf))
+        return np.concatenate(parts) if parts else np.zeros(0, np.float32)
+
+    def query(self, query_embedding, top_k: int) -> List[VectorHit]:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self._lock:
+            self._maybe_reload()
+            scores = self._scores(query)
+            k = min(top_k, len(self._row_of))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                VectorHit(
+                    self._ids[row],
+                    self._documents[row],
+                    self._metadatas[row],
+                    float(1.0 - scores[row]),
+                )
+                for row in top
+            ]
+
+    def get(self, ids: Sequence[str]) -> List[VectorHit]:
+        with self._lock:
+            self._maybe_reload()
+            rows = [self._row_of[id_] for id_ in ids if id_ in self._row_of]
+            return [
+                VectorHit(
+                    self._ids[row],
+                    self._documents[row],
+                    self._metadatas[row],
+                    float("nan"),
+                )
+                for row in rows
+            ]
+
+    def count(self) -> int:
+        with self._lock:
+            self._maybe_reload()
+            return len(self._row_of)
+
+
+# ============================
+# Factory
+# ============================
+
+_stores: Dict[tuple, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(
+    path: str,
+    collection_name: str,
+    embedding_function=None,
+    backend: Optional[str] = None,
+) -> VectorStore:
+    """
+    Returns the per-process store for a collection, creating it on first use.
+
+    :param path: Persistence directory (e.g. ``chromadb_dm``)
+    :param collection_name: Collection within that directory
+    :param embedding_function: Embedding function registered with Chroma
+    :param backend: Overrides ``VECTOR_STORE_BACKEND``
+    :return: The vector store
+    """
+    backend = backend or VECTOR_STORE_BACKEND
+    key = (backend, os.path.abspath(path), collection_name)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == "chroma":
+                store = ChromaVectorStore(path, collection_name, embedding_function)
+            elif backend in ("numpy", "numpy-int8"):
+                store = NumpyVectorStore(
+                    path, collection_name, quantize=backend == "numpy-int8"
+                )
+            else:
+                raise ValueError(f"Unknown vector store backend: {backend}")
+            _stores[key] = store
+    return store
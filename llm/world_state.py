@@ -0,0 +1,352 @@
+# llm/world_state.py
+
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from colorama import Fore, Style
+
+from db.database import SessionLocal
+from llm.admission import mark_background
+from llm.keyword_index import STOPWORDS
+from llm.llm_metrics import timed_reply
+from llm.prompts import extract_world_state_prompt
+from models.world_state_models import (
+    ENTITY_NAME_LENGTH,
+    THREAD_DESCRIPTION_LENGTH,
+    EntityKindEnum,
+    OpenThread,
+    ThreadStatusEnum,
+    WorldEntity,
+    WorldFact,
+    WorldRelationship,
+)
+from services.cache import TTLCache
+
+# ============================
+# Logging Configuration
+# ============================
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# ============================
+# Constants
+# ============================
+
+# Budget of the world-state block in prompts
+MAX_SCENE_ENTITIES = 8
+FACTS_PER_ENTITY = 3
+MAX_RELATIONSHIPS = 8
+MAX_OPEN_THREADS = 5
+# Known entity names sent to the extractor so it reuses them
+MAX_KNOWN_ENTITIES = 50
+# Leading words that say nothing about which entity a name refers to
+NAME_PREFIXES = STOPWORDS | frozenset(
+    "old young little great lady lord sir dame master mistress captain king "
+    "queen prince princess father mother brother sister saint st mr mrs ms "
+    "dr".split()
+)
+
+# Extraction of a game's turns is serialized so facts are applied in order
+_game_locks = TTLCache(maxsize=1024, ttl=60 * 60)
+# Keeps background extraction tasks referenced until they finish
+_pending: Set["asyncio.Task"] = set()
+
+
+# ============================
+# Extraction
+# ============================
+
+
+def parse_extraction(response: str) -> Optional[Dict[str, Any]]:
+    """
+    Parses the extractor's reply. The payload nests objects in lists, so the
+    whole outermost JSON object is taken rather than the first ``{...}``.
+    """
+    start, end = response.find("{"), response.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(re.sub(r"[\x00-\x1F\x7F]", " ", response[start : end + 1]))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _kind(value) -> EntityKindEnum:
+    try:
+        return EntityKindEnum(str(value).strip().lower())
+    except ValueError:
+        return EntityKindEnum.OTHER
+
+
+def _strings(items) -> List[str]:
+    if not isinstance(items, list):
+        return []
+    return [item.strip() for item in items if isinstance(item, str) and item.strip()]
+
+
+def _entity_key(name: str) -> str:
+    # The name as WorldEntity.validate_name stores it, case-folded
+    return name.strip()[:ENTITY_NAME_LENGTH].lower()
+
+
+def _thread_key(description: str) -> str:
+    # The description as OpenThread.validate_description stores it, case-folded
+    return description.strip()[:THREAD_DESCRIPTION_LENGTH].lower()
+
+
+def known_entities(saved_game_id: int) -> str:
+    with SessionLocal() as db:
+        entities = (
+            db.query(WorldEntity.name, WorldEntity.kind)
+            .filter_by(game_id=saved_game_id)
+            .order_by(WorldEntity.last_seen_turn.desc())
+            .limit(MAX_KNOWN_ENTITIES)
+            .all()
+        )
+    return ", ".join(f"{name} ({kind.value})" for name, kind in entities)
+
+
+def apply_extraction(saved_game_id: int, turn: int, data: Dict[str, Any]) -> None:
+    """Merges one turn's extracted entities, facts and threads (blocking)."""
+    with SessionLocal() as db:
+        entities = {
+            _entity_key(entity.name): entity
+            for entity in db.query(WorldEntity).filter_by(game_id=saved_game_id)
+        }
+
+        def entity_for(name: str, kind=None, description: str = "") -> WorldEntity:
+            entity = entities.get(_entity_key(name))
+            if entity is None:
+                entity = WorldEntity(
+                    game_id=saved_game_id,
+                    name=name,
+                    kind=_kind(kind),
+                    description=description,
+                    first_seen_turn=turn,
+                    last_seen_turn=turn,
+                )
+                db.add(entity)
+                entities[_entity_key(entity.name)] = entity
+            else:
+                entity.last_seen_turn = max(entity.last_seen_turn, turn)
+                if description:
+                    entity.description = description
+                if kind and entity.kind == EntityKindEnum.OTHER:
+                    entity.kind = _kind(kind)
+            return entity
+
+        for item in data.get("entities") or []:
+            if isinstance(item, dict) and str(item.get("name", "")).strip():
+                entity_for(
+                    str(item["name"]),
+                    item.get("kind"),
+                    str(item.get("description") or "").strip(),
+                )
+
+        for item in data.get("facts") or []:
+            if not isinstance(item, dict):
+                continue
+            name = str(item.get("entity", "")).strip()
+            fact = str(item.get("fact", "")).strip()
+            if not name or not fact:
+                continue
+            entity = entity_for(name)
+            if all(existing.fact.lower() != fact.lower() for existing in entity.facts):
+                entity.facts.append(
+                    WorldFact(game_id=saved_game_id, fact=fact, turn=turn)
+                )
+
+        db.flush()
+        existing_relationships = {
+            (rel.source_id, rel.target_id, rel.relation.lower())
+            for rel in db.query(WorldRelationship).filter_by(game_id=saved_game_id)
+        }
+        for item in data.get("relationships") or []:
+            if not isinstance(item, dict):
+                continue
+            names = [str(item.get(k, "")).strip() for k in ("source", "target")]
+            relation = str(item.get("relation", "")).strip()[:100]
+            if not all(names) or not relation:
+                continue
+            source, target = entity_for(names[0]), entity_for(names[1])
+            db.flush()
+            key = (source.id, target.id, relation.lower())
+            if key not in existing_relationships:
+                existing_relationships.add(key)
+                db.add(
+                    WorldRelationship(
+                        game_id=saved_game_id,
+                        source_id=source.id,
+                        target_id=target.id,
+                        relation=relation,
+                        turn=turn,
+                    )
+                )
+
+        threads = {
+            _thread_key(thread.description): thread
+            for thread in db.query(OpenThread).filter_by(game_id=saved_game_id)
+        }
+        for description in _strings(data.get("threads_opened")):
+            if _thread_key(description) not in threads:
+                thread = OpenThread(
+                    game_id=saved_game_id, description=description, opened_turn=turn
+                )
+                db.add(thread)
+                threads[_thread_key(thread.description)] = thread
+        for description in _strings(data.get("threads_resolved")):
+            thread = threads.get(_thread_key(description))
+            if thread is not None and thread.status != ThreadStatusEnum.RESOLVED:
+                thread.status = ThreadStatusEnum.RESOLVED
+                thread.resolved_turn = turn
+
+        db.commit()
+
+
+async def extract_world_state(
+    agent, saved_game_id: int, turn: int, user_input: str, gm_response: str
+) -> None:
+    """Runs the extraction pass for one saved turn."""
+    mark_background()
+    lock = _game_locks.get(saved_game_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _game_locks.set(saved_game_id, lock)
+    async with lock:
+        known = await asyncio.to_thread(known_entities, saved_game_id)
+        msg = extract_world_state_prompt(known, user_input, gm_response)
+        # generate_reply blocks; keep it off the event loop serving requests
+        response = await timed_reply(agent, msg, in_thread=True)
+        if isinstance(response, dict):
+            response = response.get("content") or ""
+        data = parse_extraction(response or "")
+        if data is None:
+            logger.warning(
+                f"{Fore.YELLOW}[WORLD STATE] No valid extraction for turn {turn} "
+                f"of game {saved_game_id}\n{Style.RESET_ALL}"
+            )
+            return
+        await asyncio.to_thread(apply_extraction, saved_game_id, turn, data)
+        logger.info(
+            f"{Fore.GREEN}[WORLD STATE] Updated from turn {turn} of game "
+            f"{saved_game_id}\n{Style.RESET_ALL}"
+        )
+
+
+def schedule_world_state_extraction(
+    agent, saved_game_id: int, turn: int, user_input: str, gm_response: str
+) -> None:
+    """
+    Extracts world state from a saved turn in the background, after the
+    response has been sent. Outside an event loop the turn is skipped.
+    """
+    if agent is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(
+        extract_world_state(agent, saved_game_id, turn, user_input, gm_response)
+    )
+    _pending.add(task)
+    task.add_done_callback(_extraction_done)
+
+
+def _extraction_done(task: "asyncio.Task") -> None:
+    _pending.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(
+            f"{Fore.RED}[WORLD STATE] Extraction failed: "
+            f"{task.exception()}\n{Style.RESET_ALL}"
+        )
+
+
+# ============================
+# Prompt Rendering
+# ============================
+
+
+def _mentioned(entity: WorldEntity, text: str) -> bool:
+    # The full name, the name without a leading article or title ("Whispering
+    # Woods"), and an NPC's given name for names like "Borin Ironfist"
+    words = entity.name.lower().split()
+    candidates = {" ".join(words)}
+    while len(words) > 1 and words[0] in NAME_PREFIXES:
+        words = words[1:]
+    candidates.add(" ".join(words))
+    first = words[0]
+    if (
+        entity.kind == EntityKindEnum.NPC
+        and len(first) >= 3
+        and first not in NAME_PREFIXES
+    ):
+        candidates.add(first)
+    return any(
+        re.search(rf"\b{re.escape(candidate)}\b", text) for candidate in candidates
+    )
+
+
+def relevant_world_state(saved_game_id: int, scene: str) -> str:
+    """
+    Renders the facts about entities mentioned in the current scene, their
+    direct relationships and the newest open threads (blocking).
+
+    :param scene: The latest GM response and the player's input
+    :return: A compact block for prompts, or an empty string
+    """
+    text = scene.lower()
+    with SessionLocal() as db:
+        entities = (
+            db.query(WorldEntity)
+            .filter_by(game_id=saved_game_id)
+            .order_by(WorldEntity.last_seen_turn.desc())
+            .all()
+        )
+        in_scene = [e for e in entities if _mentioned(e, text)][:MAX_SCENE_ENTITIES]
+        threads = (
+            db.query(OpenThread.description)
+            .filter_by(game_id=saved_game_id, status=ThreadStatusEnum.OPEN)
+            .order_by(OpenThread.opened_turn.desc())
+            .limit(MAX_OPEN_THREADS)
+            .all()
+        )
+        if not in_scene and not threads:
+            return ""
+
+        names = {e.id: e.name for e in entities}
+        ids = [e.id for e in in_scene]
+        relationships = (
+            db.query(WorldRelationship)
+            .filter(
+                WorldRelationship.game_id == saved_game_id,
+                WorldRelationship.source_id.in_(ids)
+                | WorldRelationship.target_id.in_(ids),
+            )
+            .order_by(WorldRelationship.turn.desc())
+            .limit(MAX_RELATIONSHIPS)
+            .all()
+        )
+
+        lines = []
+        for entity in in_scene:
+            line = f"- {entity.name} ({entity.kind.value})"
+            if entity.description:
+                line += f": {entity.description}"
+            facts = [fact.fact for fact in entity.facts[-FACTS_PER_ENTITY:]]
+            if facts:
+                line += " " + " ".join(f.rstrip(".") + "." for f in facts)
+            lines.append(line)
+        for rel in relationships:
+            lines.append(
+                f"- {names[rel.source_id]} {rel.relation} {names[rel.target_id]}"
+            )
+        if threads:
+            lines.append("Open threads:")
+            lines.extend(f"- {description}" for (description,) in threads)
+    return "\n".join(lines)
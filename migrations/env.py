@@ -16,8 +16,15 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from db.database import Base
 from models.character_models import Character, Race, Class, Background
 from models.game_preferences_models import GamePreferences
+from models.opening_pool_models import PooledOpening
 from models.save_game_models import SavedGame, ConversationPair
 from models.user_models import User  # Import the User model
+from models.world_state_models import (
+    WorldEntity,
+    WorldFact,
+    WorldRelationship,
+    OpenThread,
+)
 
 # this is the Alembic Config object, which provides access to the values within the .ini file in use.
 config = context.config
@@ -0,0 +1,26 @@
+"""Add version column to characters
+
+Revision ID: 3f1c2d7a9e10
+Revises: 9b6c9ebbaf0a
+Create Date: 2026-10-19 09:12:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2d7a9e10'
+down_revision = '9b6c9ebbaf0a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('characters', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('characters', schema=None) as batch_op:
+        batch_op.drop_column('version')
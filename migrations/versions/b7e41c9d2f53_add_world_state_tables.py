@@ -0,0 +1,112 @@
+"""Add world state tables
+
+Revision ID: b7e41c9d2f53
+Revises: 3f1c2d7a9e10
+Create Date: 2026-10-19 14:02:17.540813
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e41c9d2f53'
+down_revision = '3f1c2d7a9e10'
+branch_labels = None
+depends_on = None
+
+entity_kind = sa.Enum(
+    'NPC', 'LOCATION', 'ITEM', 'QUEST', 'FACTION', 'OTHER', name='entitykindenum'
+)
+thread_status = sa.Enum('OPEN', 'RESOLVED', name='threadstatusenum')
+
+
+def upgrade():
+    op.create_table(
+        'world_entities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('kind', entity_kind, nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('first_seen_turn', sa.Integer(), nullable=False),
+        sa.Column('last_seen_turn', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['saved_games.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('game_id', 'name', name='uq_game_entity'),
+    )
+    op.create_index(
+        'ix_world_entities_game_id', 'world_entities', ['game_id'], unique=False
+    )
+
+    op.create_table(
+        'world_facts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('fact', sa.Text(), nullable=False),
+        sa.Column('turn', sa.Integer(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['entity_id'], ['world_entities.id']),
+        sa.ForeignKeyConstraint(['game_id'], ['saved_games.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_world_facts_game_id', 'world_facts', ['game_id'], unique=False
+    )
+    op.create_index(
+        'ix_world_facts_entity_id', 'world_facts', ['entity_id'], unique=False
+    )
+
+    op.create_table(
+        'world_relationships',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('source_id', sa.Integer(), nullable=False),
+        sa.Column('target_id', sa.Integer(), nullable=False),
+        sa.Column('relation', sa.String(length=100), nullable=False),
+        sa.Column('turn', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['saved_games.id']),
+        sa.ForeignKeyConstraint(['source_id'], ['world_entities.id']),
+        sa.ForeignKeyConstraint(['target_id'], ['world_entities.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'source_id', 'target_id', 'relation', name='uq_world_relationship'
+        ),
+    )
+    op.create_index(
+        'ix_world_relationships_game_id',
+        'world_relationships',
+        ['game_id'],
+        unique=False,
+    )
+
+    op.create_table(
+        'open_threads',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=False),
+        sa.Column('status', thread_status, nullable=False),
+        sa.Column('opened_turn', sa.Integer(), nullable=False),
+        sa.Column('resolved_turn', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['game_id'], ['saved_games.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('game_id', 'description', name='uq_game_thread'),
+    )
+    op.create_index(
+        'ix_open_threads_game_id', 'open_threads', ['game_id'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_open_threads_game_id', table_name='open_threads')
+    op.drop_table('open_threads')
+    op.drop_index(
+        'ix_world_relationships_game_id', table_name='world_relationships'
+    )
+    op.drop_table('world_relationships')
+    op.drop_index('ix_world_facts_entity_id', table_name='world_facts')
+    op.drop_index('ix_world_facts_game_id', table_name='world_facts')
+    op.drop_table('world_facts')
+    op.drop_index('ix_world_entities_game_id', table_name='world_entities')
+    op.drop_table('world_entities')
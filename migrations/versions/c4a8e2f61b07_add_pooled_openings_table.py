@@ -0,0 +1,62 @@
+"""Add pooled openings table
+
+Revision ID: c4a8e2f61b07
+Revises: b7e41c9d2f53
+Create Date: 2026-10-19 16:41:05.218334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e2f61b07'
+down_revision = 'b7e41c9d2f53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'pooled_openings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column(
+            'game_style',
+            sa.Enum(
+                'NARRATIVE', 'COMBAT', 'EXPLORATION', 'MIXED', name='gamestyleenum'
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            'tone',
+            sa.Enum('LIGHTHEARTED', 'SERIOUS', 'DARK', 'HUMOROUS', name='toneenum'),
+            nullable=False,
+        ),
+        sa.Column(
+            'difficulty',
+            sa.Enum('EASY', 'MEDIUM', 'HARD', 'EXPERT', name='difficultyenum'),
+            nullable=False,
+        ),
+        sa.Column(
+            'theme',
+            sa.Enum(
+                'FANTASY', 'SCIFI', 'HORROR', 'MODERN', 'HISTORICAL', name='themeenum'
+            ),
+            nullable=False,
+        ),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_pooled_openings_combination',
+        'pooled_openings',
+        ['model', 'game_style', 'tone', 'difficulty', 'theme'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_pooled_openings_combination', table_name='pooled_openings')
+    op.drop_table('pooled_openings')
@@ -0,0 +1,49 @@
+"""Never reuse saved game ids
+
+Revision ID: d91f3b6c2a48
+Revises: c4a8e2f61b07
+Create Date: 2026-10-20 10:05:31.604127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91f3b6c2a48'
+down_revision = 'c4a8e2f61b07'
+branch_labels = None
+depends_on = None
+
+# Rows left behind by games deleted in bulk, children before parents
+orphaned_tables = [
+    'world_facts',
+    'world_relationships',
+    'open_threads',
+    'world_entities',
+    'conversation_pairs',
+]
+
+
+def upgrade():
+    for table in orphaned_tables:
+        op.execute(
+            f'DELETE FROM {table} WHERE game_id NOT IN (SELECT id FROM saved_games)'
+        )
+    # SQLite only keeps ids from being reused with AUTOINCREMENT, which
+    # takes rebuilding the table
+    with op.batch_alter_table(
+        'saved_games',
+        recreate='always',
+        table_kwargs={'sqlite_autoincrement': True},
+    ) as batch_op:
+        batch_op.alter_column('id', existing_type=sa.Integer())
+
+
+def downgrade():
+    with op.batch_alter_table(
+        'saved_games',
+        recreate='always',
+        table_kwargs={'sqlite_autoincrement': False},
+    ) as batch_op:
+        batch_op.alter_column('id', existing_type=sa.Integer())
@@ -0,0 +1,36 @@
+"""Never reuse character ids
+
+Revision ID: e3b72d58f1c9
+Revises: d91f3b6c2a48
+Create Date: 2026-10-20 10:48:12.377915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b72d58f1c9'
+down_revision = 'd91f3b6c2a48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite only keeps ids from being reused with AUTOINCREMENT, which
+    # takes rebuilding the table
+    with op.batch_alter_table(
+        'characters',
+        recreate='always',
+        table_kwargs={'sqlite_autoincrement': True},
+    ) as batch_op:
+        batch_op.alter_column('id', existing_type=sa.Integer())
+
+
+def downgrade():
+    with op.batch_alter_table(
+        'characters',
+        recreate='always',
+        table_kwargs={'sqlite_autoincrement': False},
+    ) as batch_op:
+        batch_op.alter_column('id', existing_type=sa.Integer())
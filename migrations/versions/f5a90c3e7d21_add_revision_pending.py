@@ -0,0 +1,33 @@
+"""Add revision_pending to conversation_pairs
+
+Revision ID: f5a90c3e7d21
+Revises: e3b72d58f1c9
+Create Date: 2026-10-20 11:32:05.918244
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5a90c3e7d21'
+down_revision = 'e3b72d58f1c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversation_pairs', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                'revision_pending',
+                sa.Boolean(),
+                nullable=False,
+                server_default='0',
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('conversation_pairs', schema=None) as batch_op:
+        batch_op.drop_column('revision_pending')
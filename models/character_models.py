@@ -17,6 +17,11 @@ from sqlalchemy.orm import relationship, validates, Session
 
 from db.database import Base  # Import Base from your database module
 
+# Version of the default reference data written by populate_defaults. Bump it
+# whenever races, classes, backgrounds, skills or conditions change so cached
+# copies (services/reference_data.py) are reloaded.
+SEED_VERSION = 1
+
 # Association tables
 character_inventory = Table(
     "character_inventory",
@@ -62,6 +67,9 @@ class AlignmentEnum(Enum):
 
 class Character(Base):
     __tablename__ = "characters"
+    # Ids of deleted characters are never handed out again: cached snapshots
+    # and context text are keyed by (id, version) in every worker
+    __table_args__ = {"sqlite_autoincrement": True}
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     race_id = Column(Integer, ForeignKey("races.id"), nullable=True)
@@ -95,6 +103,10 @@ class Character(Base):
     death_saves_successes = Column(Integer, default=0)
     death_saves_failures = Column(Integer, default=0)
 
+    # Row version, bumped by SQLAlchemy on every UPDATE; keys cached snapshots
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     # Relationships
     race = relationship("Race", backref="characters")
     background = relationship("Background", backref="characters")
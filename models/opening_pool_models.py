@@ -0,0 +1,47 @@
+# models/opening_pool_models.py
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, func
+from sqlalchemy.types import Enum as SQLEnum
+
+from db.database import Base  # Import Base from your database module
+from models.game_preferences_models import (
+    GameStyleEnum,
+    ToneEnum,
+    DifficultyEnum,
+    ThemeEnum,
+)
+
+
+class PooledOpening(Base):
+    """
+    A validated campaign opening written ahead for one combination of game
+    preferences, with placeholders for the character's name, race and class.
+    """
+
+    __tablename__ = "pooled_openings"
+    __table_args__ = (
+        Index(
+            "ix_pooled_openings_combination",
+            "model",
+            "game_style",
+            "tone",
+            "difficulty",
+            "theme",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # Narration model the opening was written by
+    model = Column(String(100), nullable=False)
+    game_style = Column(SQLEnum(GameStyleEnum), nullable=False)
+    tone = Column(SQLEnum(ToneEnum), nullable=False)
+    difficulty = Column(SQLEnum(DifficultyEnum), nullable=False)
+    theme = Column(SQLEnum(ThemeEnum), nullable=False)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<PooledOpening {self.game_style.value}/{self.tone.value}/"
+            f"{self.difficulty.value}/{self.theme.value} on {self.model}>"
+        )
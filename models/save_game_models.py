@@ -1,6 +1,7 @@
 # models/save_game_models.py
 
 from sqlalchemy import (
+    Boolean,
     Column,
     Integer,
     String,
@@ -16,7 +17,12 @@ from db.database import Base  # Import Base from your database module
 
 class SavedGame(Base):
     __tablename__ = "saved_games"
-    __table_args__ = (UniqueConstraint("user_id", "game_name", name="uq_user_game"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "game_name", name="uq_user_game"),
+        # Ids of deleted games are never handed out again, so nothing keyed by
+        # game id (world state, caches in other workers) reaches a new game
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True)
     game_name = Column(String(100), nullable=False)
@@ -53,6 +59,10 @@ class ConversationPair(Base):
     user_input = Column(Text, nullable=False)
     gm_response = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=func.now(), nullable=False)
+    # Set while a progressive refinement may still replace gm_response
+    revision_pending = Column(
+        Boolean, nullable=False, default=False, server_default="0"
+    )
 
     game = relationship("SavedGame", back_populates="conversation_pairs")
 
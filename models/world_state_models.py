@@ -0,0 +1,160 @@
+# models/world_state_models.py
+
+from enum import Enum
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    Text,
+    func,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import backref, relationship, validates
+from sqlalchemy.types import Enum as SQLEnum
+
+from db.database import Base  # Import Base from your database module
+
+# Longest stored entity name and thread description; longer ones are cut
+ENTITY_NAME_LENGTH = 100
+THREAD_DESCRIPTION_LENGTH = 255
+
+
+class EntityKindEnum(Enum):
+    NPC = "npc"
+    LOCATION = "location"
+    ITEM = "item"
+    QUEST = "quest"
+    FACTION = "faction"
+    OTHER = "other"
+
+
+class ThreadStatusEnum(Enum):
+    OPEN = "open"
+    RESOLVED = "resolved"
+
+
+class WorldEntity(Base):
+    __tablename__ = "world_entities"
+    __table_args__ = (UniqueConstraint("game_id", "name", name="uq_game_entity"),)
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(
+        Integer, ForeignKey("saved_games.id"), nullable=False, index=True
+    )
+    name = Column(String(ENTITY_NAME_LENGTH), nullable=False)
+    kind = Column(SQLEnum(EntityKindEnum), nullable=False, default=EntityKindEnum.OTHER)
+    description = Column(Text, nullable=False, default="")
+    first_seen_turn = Column(Integer, nullable=False)
+    last_seen_turn = Column(Integer, nullable=False)
+
+    game = relationship(
+        "SavedGame",
+        backref=backref("world_entities", cascade="all, delete-orphan"),
+    )
+    facts = relationship(
+        "WorldFact",
+        back_populates="entity",
+        cascade="all, delete-orphan",
+        order_by="WorldFact.turn",
+    )
+
+    @validates("name")
+    def validate_name(self, key, value):
+        if not value or not value.strip():
+            raise ValueError("Entity name cannot be empty")
+        return value.strip()[:ENTITY_NAME_LENGTH]
+
+    def __repr__(self):
+        return f"<WorldEntity {self.name} ({self.kind}) for Game ID {self.game_id}>"
+
+
+class WorldFact(Base):
+    __tablename__ = "world_facts"
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(
+        Integer, ForeignKey("saved_games.id"), nullable=False, index=True
+    )
+    entity_id = Column(
+        Integer, ForeignKey("world_entities.id"), nullable=False, index=True
+    )
+    fact = Column(Text, nullable=False)
+    turn = Column(Integer, nullable=False)
+    timestamp = Column(DateTime, default=func.now(), nullable=False)
+
+    entity = relationship("WorldEntity", back_populates="facts")
+
+    def __repr__(self):
+        return f"<WorldFact turn {self.turn} for Entity ID {self.entity_id}>"
+
+
+class WorldRelationship(Base):
+    __tablename__ = "world_relationships"
+    __table_args__ = (
+        UniqueConstraint(
+            "source_id", "target_id", "relation", name="uq_world_relationship"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(
+        Integer, ForeignKey("saved_games.id"), nullable=False, index=True
+    )
+    source_id = Column(Integer, ForeignKey("world_entities.id"), nullable=False)
+    target_id = Column(Integer, ForeignKey("world_entities.id"), nullable=False)
+    relation = Column(String(100), nullable=False)
+    turn = Column(Integer, nullable=False)
+
+    source = relationship(
+        "WorldEntity",
+        foreign_keys=[source_id],
+        backref=backref("outgoing", cascade="all, delete-orphan"),
+    )
+    target = relationship(
+        "WorldEntity",
+        foreign_keys=[target_id],
+        backref=backref("incoming", cascade="all, delete-orphan"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<WorldRelationship {self.source_id} {self.relation} {self.target_id}>"
+        )
+
+
+class OpenThread(Base):
+    __tablename__ = "open_threads"
+    __table_args__ = (
+        UniqueConstraint("game_id", "description", name="uq_game_thread"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(
+        Integer, ForeignKey("saved_games.id"), nullable=False, index=True
+    )
+    description = Column(String(THREAD_DESCRIPTION_LENGTH), nullable=False)
+    status = Column(
+        SQLEnum(ThreadStatusEnum), nullable=False, default=ThreadStatusEnum.OPEN
+    )
+    opened_turn = Column(Integer, nullable=False)
+    resolved_turn = Column(Integer, nullable=True)
+
+    game = relationship(
+        "SavedGame",
+        backref=backref("open_threads", cascade="all, delete-orphan"),
+    )
+
+    @validates("description")
+    def validate_description(self, key, value):
+        if not value or not value.strip():
+            raise ValueError("Thread description cannot be empty")
+        return value.strip()[:THREAD_DESCRIPTION_LENGTH]
+
+    def __repr__(self):
+        return (
+            f"<OpenThread {self.description!r} ({self.status}) "
+            f"for Game ID {self.game_id}>"
+        )
@@ -0,0 +1,108 @@
+# services/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# Sentinel used to distinguish "missing" from a cached ``None``
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe, bounded LRU cache with an optional per-entry time-to-live.
+
+    Entries are evicted least-recently-used first once ``maxsize`` is reached,
+    and lazily expired on access once they are older than ``ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param maxsize: Maximum number of entries kept in the cache
+        :param ttl: Seconds an entry stays valid, or None to never expire
+        :param timer: Monotonic clock, injectable for benchmarks
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._timer():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._timer() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def touch(self, key: Hashable) -> bool:
+        """
+        Refreshes the expiry of an existing entry (sliding expiration).
+
+        :return: True if the entry existed and was refreshed
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return False
+            value, expires_at = entry
+            now = self._timer()
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+                return False
+            if self.ttl is not None:
+                self._data[key] = (value, now + self.ttl)
+            self._data.move_to_end(key)
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Drops every entry for which ``predicate(key, value)`` is true.
+
+        :return: Number of entries removed
+        """
+        with self._lock:
+            doomed = [
+                key for key, (value, _) in self._data.items() if predicate(key, value)
+            ]
+            for key in doomed:
+                del self._data[key]
+        return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,193 @@
+# services/character_snapshot.py
+
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from models.character_models import Character
+from services.cache import TTLCache
+
+# ============================
+# Constants
+# ============================
+
+SNAPSHOT_CACHE_SIZE = 1024
+
+# Character fields that are not rendered into the LLM conversation context
+EXCLUDED_CONTEXT_FIELDS = {
+    "id",
+    "version",
+    "experience_points",
+    "max_hit_points",
+    "current_hit_points",
+}
+
+# Snapshots and rendered context text, keyed by (character_id, version);
+# character ids are never reused, so a key never outlives its character
+_snapshot_cache = TTLCache(maxsize=SNAPSHOT_CACHE_SIZE)
+_context_text_cache = TTLCache(maxsize=SNAPSHOT_CACHE_SIZE)
+
+
+# ============================
+# Projection
+# ============================
+
+
+@dataclass(frozen=True, slots=True)
+class CharacterSnapshot:
+    """
+    Immutable projection of a Character as stored in the session and used to
+    build prompts. ``version`` mirrors ``Character.version`` so a snapshot is
+    never served for a character that has since been updated.
+    """
+
+    id: int
+    version: int
+    name: str
+    race: Optional[str]
+    character_class: str
+    background: Optional[str]
+    level: int
+    experience_points: int
+    strength: int
+    dexterity: int
+    constitution: int
+    intelligence: int
+    wisdom: int
+    charisma: int
+    max_hit_points: int
+    current_hit_points: int
+    armor_class: int
+    speed: int
+
+    @classmethod
+    def from_character(cls, character: Character) -> "CharacterSnapshot":
+        return cls(
+            id=character.id,
+            version=character.version,
+            name=character.name,
+            race=character.race.name if character.race else None,
+            character_class=character.character_class.name,
+            background=character.background.name if character.background else None,
+            level=character.level,
+            experience_points=character.experience_points,
+            strength=character.strength,
+            dexterity=character.dexterity,
+            constitution=character.constitution,
+            intelligence=character.intelligence,
+            wisdom=character.wisdom,
+            charisma=character.charisma,
+            max_hit_points=character.max_hit_points,
+            current_hit_points=character.current_hit_points,
+            armor_class=character.armor_class,
+            speed=character.speed,
+        )
+
+    def to_session_dict(self) -> Dict[str, Any]:
+        """
+        Returns the session representation of the character.
+
+        Key names and order match the dictionary the routes used to build by
+        hand, plus ``version``.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "race": self.race,
+            "class": self.character_class,
+            "background": self.background,
+            "level": self.level,
+            "experience_points": self.experience_points,
+            "strength": self.strength,
+            "dexterity": self.dexterity,
+            "constitution": self.constitution,
+            "intelligence": self.intelligence,
+            "wisdom": self.wisdom,
+            "charisma": self.charisma,
+            "max_hit_points": self.max_hit_points,
+            "current_hit_points": self.current_hit_points,
+            "armor_class": self.armor_class,
+            "speed": self.speed,
+            "version": self.version,
+        }
+
+
+# ============================
+# Snapshot Service
+# ============================
+
+
+def get_character_snapshot(
+    db: Session, character_id: int
+) -> Optional[CharacterSnapshot]:
+    """
+    Returns the snapshot for a character, loading it at most once per version.
+
+    A cache hit costs a single primary-key lookup of the version column; a miss
+    loads the character together with its race, class and background in one
+    joined query.
+
+    :param db: Database session
+    :param character_id: ID of the character
+    :return: The character snapshot, or None if the character does not exist
+    """
+    version = db.query(Character.version).filter(Character.id == character_id).scalar()
+    if version is None:
+        return None
+
+    snapshot = _snapshot_cache.get((character_id, version))
+    if snapshot is not None:
+        return snapshot
+
+    character = (
+        db.query(Character)
+        .options(
+            joinedload(Character.race),
+            joinedload(Character.character_class),
+            joinedload(Character.background),
+        )
+        .filter(Character.id == character_id)
+        .first()
+    )
+    if character is None:
+        return None
+
+    snapshot = CharacterSnapshot.from_character(character)
+    _snapshot_cache.set((snapshot.id, snapshot.version), snapshot)
+    return snapshot
+
+
+def invalidate_character(character_id: int) -> None:
+    """Drops every cached snapshot and context text for a character."""
+    _snapshot_cache.invalidate(lambda key, _: key[0] == character_id)
+    _context_text_cache.invalidate(lambda key, _: key[0] == character_id)
+
+
+def render_character_details(current_character: Mapping[str, Any]) -> str:
+    """
+    Renders the character core details block of the conversation context.
+
+    The text is memoized per (character_id, version); session dictionaries
+    written before characters were versioned are rendered without caching.
+
+    :param current_character: Session representation of the character
+    :return: One "- Field: value" line per rendered field
+    """
+    key = (current_character.get("id"), current_character.get("version"))
+    cacheable = None not in key
+    if cacheable:
+        cached = _context_text_cache.get(key)
+        if cached is not None:
+            return cached
+
+    text = "\n".join(
+        [
+            f"- {field.capitalize()}: {value}"
+            for field, value in current_character.items()
+            if field.lower() not in EXCLUDED_CONTEXT_FIELDS
+        ]
+    )
+    if cacheable:
+        _context_text_cache.set(key, text)
+    return text
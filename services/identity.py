@@ -0,0 +1,86 @@
+# services/identity.py
+
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models.user_models import User
+from services.cache import TTLCache
+
+# ============================
+# Constants
+# ============================
+
+# Until real authentication exists every request acts as this user
+DEFAULT_USERNAME = "default_user"
+
+# Session key holding the identity token once login is implemented
+SESSION_IDENTITY_KEY = "username"
+
+PRINCIPAL_TTL = 300  # seconds
+PRINCIPAL_CACHE_SIZE = 4096
+
+# Resolved principals, keyed by identity token
+_principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_TTL)
+
+
+@dataclass(frozen=True, slots=True)
+class UserPrincipal:
+    """Immutable view of the authenticated user, safe to share between requests."""
+
+    id: int
+    username: str
+    email: str
+
+
+# ============================
+# Identity Resolution
+# ============================
+
+
+def identity_token(session: dict) -> str:
+    """
+    Returns the identity token for a request session.
+
+    :param session: The request session
+    :return: The token; the username of the default user while there is no login
+    """
+    return session.get(SESSION_IDENTITY_KEY) or DEFAULT_USERNAME
+
+
+def resolve_principal(db: Session, token: str) -> Optional[UserPrincipal]:
+    """
+    Maps an identity token to a user principal.
+
+    Principals are cached for ``PRINCIPAL_TTL`` seconds, so the hot path does
+    not touch the database. Unknown tokens are not cached.
+
+    :param db: Database session, used only on a cache miss
+    :param token: Identity token (currently the username)
+    :return: The principal, or None if no user matches the token
+    """
+    principal = _principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    user = db.query(User).filter_by(username=token).first()
+    if user is None:
+        return None
+
+    principal = UserPrincipal(id=user.id, username=user.username, email=user.email)
+    _principal_cache.set(token, principal)
+    return principal
+
+
+def invalidate_principal(token: Optional[str] = None, user_id: Optional[int] = None):
+    """
+    Drops cached principals, e.g. after a user is renamed, deleted or logs out.
+
+    :param token: Identity token to drop
+    :param user_id: Drop every token resolving to this user
+    """
+    if token is not None:
+        _principal_cache.pop(token)
+    if user_id is not None:
+        _principal_cache.invalidate(lambda _, principal: principal.id == user_id)
@@ -0,0 +1,134 @@
+# services/listings.py
+
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from sqlalchemy.orm import Query, Session, joinedload
+
+from models.character_models import Character, Class, Race
+from models.save_game_models import SavedGame
+
+# ============================
+# Constants
+# ============================
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+# ============================
+# Pagination
+# ============================
+
+
+@dataclass(frozen=True)
+class Page:
+    """One page of a listing plus what the template needs to navigate it."""
+
+    items: List[Any]
+    page: int
+    per_page: int
+    total: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.per_page))
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+    @property
+    def has_next(self) -> bool:
+        return self.page < self.pages
+
+
+def paginate(
+    count_query: Query, items_query: Query, page: int, per_page: int
+) -> Page:
+    """
+    Runs a listing as exactly two statements: a COUNT and one page of rows.
+
+    :param count_query: Filtered query without loader options, used for the total
+    :param items_query: The same query with ordering and eager-loading options
+    :param page: 1-based page number; clamped to the last page
+    :param per_page: Page size; clamped to MAX_PAGE_SIZE
+    :return: The requested page
+    """
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+    total = count_query.order_by(None).count()
+    page = max(1, min(page, max(1, -(-total // per_page))))
+    items = items_query.limit(per_page).offset((page - 1) * per_page).all()
+    return Page(items=items, page=page, per_page=per_page, total=total)
+
+
+# ============================
+# Listings
+# ============================
+
+
+def list_characters(
+    db: Session,
+    page: int = 1,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    name: Optional[str] = None,
+    race: Optional[str] = None,
+    character_class: Optional[str] = None,
+) -> Page:
+    """
+    Lists characters with race, class and background loaded in the same query.
+
+    :param db: Database session
+    :param page: 1-based page number
+    :param per_page: Page size
+    :param name: Case-insensitive substring filter on the character name
+    :param race: Exact race name filter
+    :param character_class: Exact class name filter
+    :return: One page of Character rows
+    """
+    query = db.query(Character)
+    if name:
+        query = query.filter(Character.name.ilike(f"%{name}%"))
+    if race:
+        query = query.filter(Character.race.has(Race.name == race))
+    if character_class:
+        query = query.filter(Character.character_class.has(Class.name == character_class))
+
+    items_query = query.options(
+        joinedload(Character.race),
+        joinedload(Character.character_class),
+        joinedload(Character.background),
+    ).order_by(Character.name, Character.id)
+    return paginate(query, items_query, page, per_page)
+
+
+def list_saved_games(
+    db: Session,
+    user_id: int,
+    page: int = 1,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    name: Optional[str] = None,
+    character_id: Optional[int] = None,
+) -> Page:
+    """
+    Lists a user's saved games, newest first, with each game's character
+    loaded in the same query.
+
+    :param db: Database session
+    :param user_id: Owner of the saved games
+    :param page: 1-based page number
+    :param per_page: Page size
+    :param name: Case-insensitive substring filter on the game name
+    :param character_id: Only games played with this character
+    :return: One page of SavedGame rows
+    """
+    query = db.query(SavedGame).filter(SavedGame.user_id == user_id)
+    if name:
+        query = query.filter(SavedGame.game_name.ilike(f"%{name}%"))
+    if character_id:
+        query = query.filter(SavedGame.character_id == character_id)
+
+    items_query = query.options(joinedload(SavedGame.character)).order_by(
+        SavedGame.save_time.desc(), SavedGame.id.desc()
+    )
+    return paginate(query, items_query, page, per_page)
@@ -0,0 +1,162 @@
+# services/reference_data.py
+
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Generic, Mapping, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from models.character_models import (
+    SEED_VERSION,
+    Background,
+    Class,
+    Condition,
+    Race,
+    Skill,
+)
+
+T = TypeVar("T")
+
+
+# ============================
+# Reference Records
+# ============================
+
+
+@dataclass(frozen=True, slots=True)
+class RaceRef:
+    id: int
+    name: str
+    size: Optional[str]
+    speed: Optional[int]
+    darkvision: bool
+
+
+@dataclass(frozen=True, slots=True)
+class ClassRef:
+    id: int
+    name: str
+    hit_die: Optional[int]
+    primary_ability: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class BackgroundRef:
+    id: int
+    name: str
+    feature: Optional[str]
+    skill_proficiencies: Tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class SkillRef:
+    id: int
+    name: str
+    ability: str
+
+
+@dataclass(frozen=True, slots=True)
+class ConditionRef:
+    id: int
+    name: str
+    description: Optional[str]
+
+
+class RefTable(Generic[T]):
+    """Immutable, name-ordered collection of reference records with id and name indexes."""
+
+    __slots__ = ("items", "by_id", "by_name")
+
+    def __init__(self, records):
+        self.items: Tuple[T, ...] = tuple(sorted(records, key=lambda r: r.name))
+        self.by_id: Mapping[int, T] = MappingProxyType({r.id: r for r in self.items})
+        self.by_name: Mapping[str, T] = MappingProxyType(
+            {r.name: r for r in self.items}
+        )
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+@dataclass(frozen=True, slots=True)
+class ReferenceData:
+    seed_stamp: Tuple[int, int]
+    races: RefTable[RaceRef]
+    classes: RefTable[ClassRef]
+    backgrounds: RefTable[BackgroundRef]
+    skills: RefTable[SkillRef]
+    conditions: RefTable[ConditionRef]
+
+
+# ============================
+# Cache
+# ============================
+
+_lock = threading.Lock()
+_generation = 0
+_reference_data: Optional[ReferenceData] = None
+
+
+def current_seed_stamp() -> Tuple[int, int]:
+    """
+    Returns the stamp the cached reference data must match.
+
+    It combines ``SEED_VERSION`` (bumped whenever the default data changes)
+    with a per-process generation bumped by ``invalidate_reference_data``.
+    """
+    return SEED_VERSION, _generation
+
+
+def invalidate_reference_data() -> None:
+    """Marks the cached reference data stale, e.g. after ``populate_defaults`` ran."""
+    global _generation
+    with _lock:
+        _generation += 1
+
+
+def load_reference_data(db: Session) -> ReferenceData:
+    """Reads every reference table once and returns immutable records."""
+    return ReferenceData(
+        seed_stamp=current_seed_stamp(),
+        races=RefTable(
+            RaceRef(r.id, r.name, r.size, r.speed, bool(r.darkvision))
+            for r in db.query(Race)
+        ),
+        classes=RefTable(
+            ClassRef(c.id, c.name, c.hit_die, c.primary_ability)
+            for c in db.query(Class)
+        ),
+        backgrounds=RefTable(
+            BackgroundRef(
+                b.id, b.name, b.feature, tuple(b.skill_proficiencies or ())
+            )
+            for b in db.query(Background)
+        ),
+        skills=RefTable(SkillRef(s.id, s.name, s.ability) for s in db.query(Skill)),
+        conditions=RefTable(
+            ConditionRef(c.id, c.name, c.description) for c in db.query(Condition)
+        ),
+    )
+
+
+def get_reference_data(db: Session) -> ReferenceData:
+    """
+    Returns the per-process reference data, loading it on first use or when the
+    seed stamp changed. Warm calls never touch the database.
+
+    :param db: Database session used only when (re)loading
+    :return: Immutable reference data
+    """
+    global _reference_data
+    data = _reference_data
+    if data is not None and data.seed_stamp == current_seed_stamp():
+        return data
+    with _lock:
+        data = _reference_data
+        if data is None or data.seed_stamp != current_seed_stamp():
+            data = _reference_data = load_reference_data(db)
+    return data
@@ -0,0 +1,270 @@
+# services/session_store.py
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.cache import TTLCache
+
+# ============================
+# Constants
+# ============================
+
+DEFAULT_SESSION_TTL = 14 * 24 * 60 * 60  # 14 days, in seconds
+DEFAULT_MEMORY_MAX_SESSIONS = 10_000
+# An unchanged session's expiry, and its cookie, are refreshed at most this often
+SESSION_REFRESH_INTERVAL = 10 * 60  # seconds
+SESSION_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "sessions.db")
+)
+
+
+# ============================
+# Session Backends
+# ============================
+
+
+class SessionBackend:
+    """
+    Storage interface for server-side sessions.
+
+    Backends persist the session dictionary under an opaque session ID; only
+    that ID ever travels in the cookie. Payloads must be JSON-serializable,
+    matching what the signed-cookie session accepted.
+    """
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def touch(self, session_id: str) -> bool:
+        """
+        Extends the lifetime of an unchanged session (sliding expiration).
+
+        :return: True if the expiry was refreshed, so the cookie's is too
+        """
+        return False
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    In-process LRU session store with a TTL.
+
+    Sessions are stored as serialized JSON so a handler mutating
+    ``request.session`` never aliases the stored copy. Sessions do not survive
+    a restart and are not shared between uvicorn workers.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MEMORY_MAX_SESSIONS,
+        ttl: float = DEFAULT_SESSION_TTL,
+        refresh_interval: float = SESSION_REFRESH_INTERVAL,
+    ):
+        self._cache = TTLCache(maxsize=max_sessions, ttl=ttl)
+        # Sessions whose expiry was refreshed recently; the cookie is not resent
+        self._recently_touched = TTLCache(maxsize=max_sessions, ttl=refresh_interval)
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        payload = self._cache.get(session_id)
+        return json.loads(payload) if payload is not None else None
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        self._cache.set(session_id, json.dumps(data))
+        self._recently_touched.set(session_id, True)
+
+    def delete(self, session_id: str) -> None:
+        self._cache.pop(session_id)
+
+    def touch(self, session_id: str) -> bool:
+        if session_id in self._recently_touched:
+            return False
+        self._recently_touched.set(session_id, True)
+        return self._cache.touch(session_id)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    SQLite-backed session store, shared by every worker on the host.
+
+    Expired rows are filtered on read and purged opportunistically on write.
+    """
+
+    def __init__(
+        self,
+        db_path: str = SESSION_DB_PATH,
+        ttl: float = DEFAULT_SESSION_TTL,
+        purge_interval: float = 600,
+        refresh_interval: float = SESSION_REFRESH_INTERVAL,
+    ):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        # Sessions whose expiry was refreshed recently; avoids a write per read
+        self._recently_touched = TTLCache(
+            maxsize=DEFAULT_MEMORY_MAX_SESSIONS, ttl=refresh_interval
+        )
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND expires_at > ?",
+                (session_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(data), now + self.ttl),
+            )
+            self._recently_touched.set(session_id, True)
+            if now - self._last_purge > self.purge_interval:
+                self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+                self._last_purge = now
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def touch(self, session_id: str) -> bool:
+        if session_id in self._recently_touched:
+            return False
+        self._recently_touched.set(session_id, True)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE sessions SET expires_at = ? WHERE id = ?",
+                (time.time() + self.ttl, session_id),
+            )
+        return cursor.rowcount > 0
+
+
+def get_session_backend(name: str) -> SessionBackend:
+    """
+    Factory function to create a session backend by name.
+
+    :param name: Backend name ('memory' or 'sqlite')
+    :return: Configured SessionBackend instance
+    """
+    if name == "memory":
+        return MemorySessionBackend()
+    elif name == "sqlite":
+        return SQLiteSessionBackend(os.getenv("SESSION_DB_PATH", SESSION_DB_PATH))
+    else:
+        raise ValueError(f"Unknown session backend: {name}")
+
+
+# ============================
+# Middleware
+# ============================
+
+
+class ServerSideSessionMiddleware:
+    """
+    Drop-in replacement for Starlette's ``SessionMiddleware``.
+
+    ``request.session`` behaves exactly as before, but the data lives in a
+    ``SessionBackend`` and the cookie only carries a random session ID. The
+    backend is written only when the session changed, and ``Set-Cookie`` is
+    only emitted when the backend's expiry is set or refreshed, so the cookie
+    expires with the session, or when the session is cleared. Backend calls
+    run in the thread pool, off the event loop.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: SessionBackend,
+        session_cookie: str = "session_id",
+        max_age: Optional[int] = DEFAULT_SESSION_TTL,
+        path: str = "/",
+        same_site: str = "lax",
+        https_only: bool = False,
+    ):
+        self.app = app
+        self.backend = backend
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site
+        if https_only:
+            self.security_flags += "; secure"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        session_id = connection.cookies.get(self.session_cookie)
+        data = (
+            await run_in_threadpool(self.backend.load, session_id)
+            if session_id
+            else None
+        )
+        if data is None:
+            # Unknown, expired or forged IDs are never reused
+            session_id = None
+            data = {}
+        initial_state = json.dumps(data, sort_keys=True)
+        scope["session"] = data
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal session_id
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                if session:
+                    if json.dumps(session, sort_keys=True) != initial_state:
+                        if session_id is None:
+                            session_id = secrets.token_urlsafe(32)
+                        await run_in_threadpool(
+                            self.backend.save, session_id, session
+                        )
+                        refreshed = True
+                    else:
+                        refreshed = await run_in_threadpool(
+                            self.backend.touch, session_id
+                        )
+                    if refreshed:
+                        # Keeps the browser from dropping an active session
+                        self._set_cookie(message, session_id, self.max_age)
+                elif session_id is not None:
+                    # The session has been cleared
+                    await run_in_threadpool(self.backend.delete, session_id)
+                    self._set_cookie(message, "null", 0)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _set_cookie(self, message: Message, value: str, max_age: Optional[int]):
+        headers = MutableHeaders(scope=message)
+        max_age_flag = f"Max-Age={max_age}; " if max_age is not None else ""
+        headers.append(
+            "Set-Cookie",
+            f"{self.session_cookie}={value}; path={self.path}; {max_age_flag}"
+            f"{self.security_flags}",
+        )